@@ -42,6 +42,10 @@ class FrontISTR(Workbench):
         import femcommands.commands
         
         import FISTR_solver
+        import importfistrAvsResults
+
+        # lazy AVS results of reopened documents are filled on selection again
+        importfistrAvsResults.add_lazy_results_observer()
 
         def QT_TRANSLATE_NOOP(scope, text): return text
         #FreeCADGui.addCommand("FEM_SolverFrontISTR",_SolverFrontISTR())
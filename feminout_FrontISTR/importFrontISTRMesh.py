@@ -29,8 +29,16 @@ __url__ = "https://www.frontistr.com/"
 #  \ingroup FEM
 #  \brief FreeCAD INP file reader for FEM workbench
 
-import FreeCAD
+import glob
 import os
+import re
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import FreeCAD
 
 
 # ********* generic FreeCAD import and export methods *********
@@ -63,9 +71,8 @@ def read(filename):
     '''read a FemMesh from a msh mesh file and return the FemMesh
     '''
     # no document object is created, just the FemMesh is returned
-    mesh_data = read_msh_fistr(filename)
-    from feminout import importToolsFem
-    return importToolsFem.make_femmesh(mesh_data)
+    mesh_arrays = read_msh_arrays(filename)
+    return make_femmesh(mesh_arrays)
 
 
 def import_msh_fistr(filename):
@@ -79,187 +86,763 @@ def import_msh_fistr(filename):
         FreeCAD.ActiveDocument.recompute()
 
 
-def read_msh_fistr(filename):
-    '''read .msh file '''
-    # ATM only mesh reading is supported (no boundary conditions, node/element gropus, material definitions)
-
-    class elements():
-
-        tria3 = {}
-        tria6 = {}
-        quad4 = {}
-        quad8 = {}
-        tetra4 = {}
-        tetra10 = {}
-        hexa8 = {}
-        hexa20 = {}
-        penta6 = {}
-        penta15 = {}
-        seg2 = {}
-        seg3 = {}
-    error_seg3 = False  # to print "not supported"
-    nodes = {}
-    model_definition = True
-
-    f = pyopen(filename, "r")
-    line = "\n"
-    include = ""
-    f_include = None
-    while line != "":
-        if include:
-            line = f_include.readline()
-            if line == "":
-                f_include.close()
-                include = ""
-                line = f.readline()
+# FrontISTR element type -> (number of nodes, FreeCAD mesh key,
+# permutation from the FrontISTR to the FreeCAD node order)
+MSH_ELEMENT_TYPES = {
+    "111": (2, "Seg2Elem", (0, 1)),
+    "611": (2, "Seg2Elem", (0, 1)),
+    "112": (3, "Seg3Elem", (0, 2, 1)),
+    "612": (3, "Seg3Elem", (0, 2, 1)),
+    "231": (3, "Tria3Elem", (0, 2, 1)),
+    "731": (3, "Tria3Elem", (0, 2, 1)),
+    "232": (6, "Tria6Elem", (0, 2, 1, 4, 3, 5)),
+    "732": (6, "Tria6Elem", (0, 2, 1, 4, 3, 5)),
+    "241": (4, "Quad4Elem", (0, 3, 2, 1)),
+    "741": (4, "Quad4Elem", (0, 3, 2, 1)),
+    "242": (8, "Quad8Elem", (0, 3, 2, 1, 7, 6, 5, 4)),
+    "742": (8, "Quad8Elem", (0, 3, 2, 1, 7, 6, 5, 4)),
+    "341": (4, "Tetra4Elem", (1, 0, 2, 3)),
+    "342": (10, "Tetra10Elem", (1, 0, 2, 3, 6, 5, 4, 8, 7, 9)),
+    "361": (8, "Hexa8Elem", (5, 6, 7, 4, 1, 2, 3, 0)),
+    "362": (20, "Hexa20Elem", (5, 6, 7, 4, 1, 2, 3, 0,
+                               13, 14, 15, 12, 9, 10, 11, 8,
+                               17, 18, 19, 16)),
+    "351": (6, "Penta6Elem", (4, 5, 3, 1, 2, 0)),
+    "352": (15, "Penta15Elem", (4, 5, 3, 1, 2, 0, 9, 10, 11, 6, 7, 8, 13, 14, 12)),
+}
+
+# FreeCAD mesh keys in the order elements are added to the FemMesh
+MESH_KEYS = (
+    "Seg2Elem", "Seg3Elem", "Tria3Elem", "Tria6Elem", "Quad4Elem", "Quad8Elem",
+    "Tetra4Elem", "Tetra10Elem", "Hexa8Elem", "Hexa20Elem", "Penta6Elem", "Penta15Elem"
+)
+
+# surface number -> corner nodes of the solid element faces, FrontISTR node order
+MSH_SURFACES = {
+    "34": {1: (0, 1, 2), 2: (0, 1, 3), 3: (1, 2, 3), 4: (2, 0, 3)},
+    "35": {1: (0, 1, 2), 2: (3, 4, 5), 3: (0, 1, 4, 3), 4: (1, 2, 5, 4), 5: (2, 0, 3, 5)},
+    "36": {1: (0, 1, 2, 3), 2: (4, 5, 6, 7), 3: (0, 1, 5, 4),
+           4: (1, 2, 6, 5), 5: (2, 3, 7, 6), 6: (3, 0, 4, 7)},
+}
+
+# corner nodes of the edges of the midside nodes, FrontISTR node order
+MSH_MIDSIDE_EDGES = {
+    "342": ((1, 2), (2, 0), (0, 1), (0, 3), (1, 3), (2, 3)),
+    "352": ((1, 2), (2, 0), (0, 1), (4, 5), (5, 3), (3, 4), (0, 3), (1, 4), (2, 5)),
+    "362": ((0, 1), (1, 2), (2, 3), (3, 0), (4, 5), (5, 6), (6, 7), (7, 4),
+            (0, 4), (1, 5), (2, 6), (3, 7)),
+}
+
+# number of bytes read and parsed at once
+MSH_CHUNK_BYTES = 1 << 24
+# included files up to this size are read ahead in parallel
+MSH_PREFETCH_BYTES = 1 << 26
+
+
+def _header_options(line):
+    """Return the keyword and the options of a header line, e.g. !ELEMENT, TYPE=341"""
+    parts = line.decode(errors="replace").split(",")
+    options = {}
+    for part in parts[1:]:
+        name, _, value = part.partition("=")
+        options[name.strip().upper()] = value.strip()
+    return parts[0].strip().upper(), options
+
+
+def _find_line_start(data, marker, pos):
+    # start of the first line at or after pos beginning with marker
+    if data.startswith(marker, pos):
+        return pos
+    i = data.find(b"\n" + marker, pos)
+    return len(data) if i == -1 else i + 1
+
+
+def _include_names(data):
+    """Return the file names of the !INCLUDE lines of data"""
+    names = []
+    for keyword in (b"!INCLUDE", b"!include", b"!Include"):
+        pos = _find_line_start(data, keyword, 0)
+        while pos < len(data):
+            end = data.find(b"\n", pos)
+            if end == -1:
+                end = len(data)
+            name = _header_options(data[pos:end].strip())[1].get("INPUT")
+            if name:
+                names.append(name)
+            pos = _find_line_start(data, keyword, end)
+    return names
+
+
+def _iter_chunks(filename):
+    """Yield the content of a file in chunks of complete lines"""
+    with pyopen(filename, "rb") as f:
+        rest = b""
+        while True:
+            chunk = f.read(MSH_CHUNK_BYTES)
+            data = rest + chunk.replace(b"\r", b"")
+            if chunk:
+                cut = data.rfind(b"\n") + 1
+                rest = data[cut:]
+                data = data[:cut]
+            elif data and not data.endswith(b"\n"):
+                data += b"\n"
+            if data:
+                yield data
+            if not chunk:
+                break
+
+
+class MshBlockReader(object):
+    """Parse the blocks of a .msh file into NumPy arrays.
+
+    The data lines of the !NODE, !ELEMENT, !NGROUP, !EGROUP and !SGROUP
+    blocks are parsed in chunks with np.fromstring. A line may be continued
+    on the next one after a trailing comma, as the number of values per row
+    is known, values left over at the end of a chunk are kept for the next
+    one. Files of !INCLUDE lines are parsed in place, with an executor they
+    are read ahead in parallel while the including file is parsed.
+    """
+
+    def __init__(self, executor=None):
+        self.executor = executor
+        self.prefetched = {}
+        self.lock = threading.Lock()
+        self.files = []
+        self.chunks = {}
+        self.unsupported = set()
+        self.model_definition = True
+        self.block = None
+        self.groups = ()
+        self.n_columns = 0
+        self.dtype = np.int64
+        self.pending = None
+
+    def read_file(self, filename):
+        filename = os.path.abspath(filename)
+        if filename in self.files:
+            FreeCAD.Console.PrintError(
+                "Error: {} includes itself, skipped.\n".format(filename)
+            )
+            return
+        if not os.path.isfile(filename):
+            FreeCAD.Console.PrintError(
+                "Error: included file {} not found.\n".format(filename)
+            )
+            return
+        self.files.append(filename)
+        future = self.prefetched.pop(filename, None)
+        data = future.result() if future else None
+        if data is None and self.executor and len(self.files) == 1:
+            # a small main file is read at once to start reading its includes
+            data = self._prefetch(filename)
+        if data is not None:
+            self.feed(data)
         else:
-            line = f.readline()
-        if line.strip() == '':
-            continue
-        elif line[0] == "#":  # comments
-            continue
-        elif line[0] == "!":
-            if line[:2] == "!!":  # comments
-                continue
-            # elif line[:7].upper() == "!HEADER":
-            #     continue
-            read_node = False
-            elm_category = []
-            elm_2nd_line = False
-
-
-        # reading nodes
-        if (line[:5].upper() == "!NODE") and (model_definition is True):
-            read_node = True
-        elif read_node is True:
-            line_list = line.split(',')
-            number = int(line_list[0])
-            x = float(line_list[1])
-            y = float(line_list[2])
-            z = float(line_list[3])
-            nodes[number] = [x, y, z]
-
-        # reading elements
-        elif line[:8].upper() == "!ELEMENT":
-            line_list = line[8:].upper().split(',')
-            for line_part in line_list:
-                if line_part.lstrip()[:4] == "TYPE":
-                    elm_type = line_part.split('=')[1].strip()
-
-            if elm_type in ["231", "731"]:
-                elm_category = elements.tria3
-                number_of_nodes = 3
-            elif elm_type in ["232", "732"]:
-                elm_category = elements.tria6
-                number_of_nodes = 6
-            elif elm_type in ["241", "741"]:
-                elm_category = elements.quad4
-                number_of_nodes = 4
-            elif elm_type == ["242", "742"]:
-                elm_category = elements.quad8
-                number_of_nodes = 8
-            elif elm_type == "341":
-                elm_category = elements.tetra4
-                number_of_nodes = 4
-            elif elm_type == "342":
-                elm_category = elements.tetra10
-                number_of_nodes = 10
-            elif elm_type == "361":
-                elm_category = elements.hexa8
-                number_of_nodes = 8
-            elif elm_type == "362":
-                elm_category = elements.hexa20
-                number_of_nodes = 20
-            elif elm_type == "351":
-                elm_category = elements.penta6
-                number_of_nodes = 6
-            elif elm_type == "352":
-                elm_category = elements.penta15
-                number_of_nodes = 15
-            elif elm_type in ["111", "611"]:
-                elm_category = elements.seg2
-                number_of_nodes = 2
-            elif elm_type == ["112", "612"]:
-                elm_category = elements.seg3
-                number_of_nodes = 3
-                error_seg3 = True  # to print "not supported"
-
-        elif elm_category != []:
-            line_list = line.split(',')
-            if elm_2nd_line is False:
-                number = int(line_list[0])
-                elm_category[number] = []
-                pos = 1
+            for data in _iter_chunks(filename):
+                self.feed(data)
+        self.finish_block()
+        self.files.pop()
+
+    def prefetch_includes(self, filename, data):
+        """Start reading the files included by data"""
+        directory = os.path.dirname(filename)
+        for name in _include_names(data):
+            path = os.path.abspath(os.path.join(directory, name))
+            with self.lock:
+                if path not in self.prefetched and os.path.isfile(path):
+                    self.prefetched[path] = self.executor.submit(self._prefetch, path)
+
+    def _prefetch(self, filename):
+        if os.path.getsize(filename) > MSH_PREFETCH_BYTES:
+            # streamed when it is parsed
+            return None
+        with pyopen(filename, "rb") as f:
+            data = f.read().replace(b"\r", b"")
+        if data and not data.endswith(b"\n"):
+            data += b"\n"
+        self.prefetch_includes(filename, data)
+        return data
+
+    def feed(self, data):
+        """Parse data, which starts at a line start and ends with a complete line"""
+        pos = 0
+        size = len(data)
+        next_keyword = next_comment = -1
+        while pos < size:
+            if next_keyword < pos:
+                next_keyword = _find_line_start(data, b"!", pos)
+            if next_comment < pos:
+                next_comment = _find_line_start(data, b"#", pos)
+            start = min(next_keyword, next_comment)
+            if start > pos:
+                self.data(data[pos:start])
+            if start >= size:
+                break
+            end = data.find(b"\n", start)
+            if end == -1:
+                end = size
+            self.keyword(data[start:end].strip())
+            pos = end + 1
+
+    def keyword(self, line):
+        if line[:1] == b"#" or line[:2] == b"!!":
+            # comments do not end a block
+            return
+        self.finish_block()
+        name, options = _header_options(line)
+        generate = "GENERATE" in options
+        if name == "!END":
+            self.model_definition = False
+        elif not self.model_definition:
+            return
+        elif name == "!INCLUDE":
+            if options.get("INPUT"):
+                directory = os.path.dirname(self.files[-1])
+                self.read_file(os.path.join(directory, options["INPUT"]))
+        elif name == "!NODE":
+            self.start_block(("node",), 4, np.float64)
+            if options.get("NGRP"):
+                self.groups = (("ngroup", options["NGRP"], False),)
+        elif name == "!ELEMENT":
+            elm_type = options.get("TYPE", "")
+            if elm_type in MSH_ELEMENT_TYPES:
+                n_nodes = MSH_ELEMENT_TYPES[elm_type][0]
+                self.start_block(("element", elm_type), n_nodes + 1, np.int64)
+                if options.get("EGRP"):
+                    self.groups = (("egroup", options["EGRP"], False),)
             else:
-                pos = 0
-                elm_2nd_line = False
-            for en in range(pos, pos + number_of_nodes - len(elm_category[number])):
-                try:
-                    enode = int(line_list[en])
-                    elm_category[number].append(enode)
-                except:
-                    elm_2nd_line = True
-                    break
-
-        elif line[:4].upper() == "!END":
-            model_definition = False
-    if error_seg3 is True:  # to print "not supported"
+                self.unsupported.add(elm_type)
+        elif name == "!NGROUP" and options.get("NGRP"):
+            self.start_block(("ngroup", options["NGRP"], generate), 3 if generate else 1)
+        elif name == "!EGROUP" and options.get("EGRP"):
+            self.start_block(("egroup", options["EGRP"], generate), 3 if generate else 1)
+        elif name == "!SGROUP" and options.get("SGRP"):
+            self.start_block(("sgroup", options["SGRP"]), 2)
+
+    def start_block(self, block, n_columns, dtype=np.int64):
+        self.block = block
+        self.n_columns = n_columns
+        self.dtype = dtype
+
+    def data(self, text):
+        if self.block is None:
+            return
+        values = np.fromstring(text.replace(b",", b" "), dtype=self.dtype, sep=" ")
+        if self.pending is not None:
+            values = np.concatenate((self.pending, values))
+        n_rows = len(values) // self.n_columns
+        rows = values[:n_rows * self.n_columns].reshape(n_rows, self.n_columns)
+        self.pending = values[n_rows * self.n_columns:]
+        self.chunks.setdefault(self.block, []).append(rows)
+        for group in self.groups:
+            self.chunks.setdefault(group, []).append(rows[:, :1].astype(np.int64))
+
+    def finish_block(self):
+        if self.pending is not None and len(self.pending):
+            FreeCAD.Console.PrintError(
+                "Error: incomplete line at the end of a {} block.\n"
+                .format(self.block[0].upper())
+            )
+        self.block = None
+        self.groups = ()
+        self.pending = None
+
+    def arrays(self):
+        """Return nodes, elements in FreeCAD node order and groups"""
+        self.finish_block()
+        if self.unsupported:
+            FreeCAD.Console.PrintWarning(
+                "Element types not supported, skipped: {}\n"
+                .format(", ".join(sorted(self.unsupported)))
+            )
+        node_block = np.empty((0, 4))
+        parts = {}
+        element_types = {}
+        groups = {"ngroup": {}, "egroup": {}, "sgroup": {}}
+        for block, chunks in self.chunks.items():
+            rows = np.concatenate(chunks)
+            if block[0] == "node":
+                node_block = rows
+            elif block[0] == "element":
+                n_nodes, key, order = MSH_ELEMENT_TYPES[block[1]]
+                parts.setdefault(key, []).append((rows[:, 0], rows[:, 1:][:, order]))
+                element_types[block[1]] = rows[:, 0]
+            elif block[0] == "sgroup":
+                groups["sgroup"].setdefault(block[1], []).append(rows)
+            else:
+                if block[2]:
+                    # start, end, step
+                    ids = [np.arange(s, e + 1, max(st, 1)) for s, e, st in rows.tolist()]
+                    rows = np.concatenate(ids) if ids else np.empty(0, np.int64)
+                groups[block[0]].setdefault(block[1], []).append(rows.ravel())
+        elements = {}
+        for key, key_parts in parts.items():
+            elements[key] = (
+                np.concatenate([p[0] for p in key_parts]),
+                np.concatenate([p[1] for p in key_parts])
+            )
+        return {
+            "NodeIds": node_block[:, 0].astype(np.int64),
+            "Coordinates": np.ascontiguousarray(node_block[:, 1:]),
+            "Elements": elements,
+            "ElementTypes": element_types,
+            "NodeGroups": {
+                name: np.unique(np.concatenate(ids)) for name, ids in groups["ngroup"].items()
+            },
+            "ElementGroups": {
+                name: np.unique(np.concatenate(ids)) for name, ids in groups["egroup"].items()
+            },
+            "SurfaceGroups": {
+                name: np.concatenate(rows) for name, rows in groups["sgroup"].items()
+            },
+        }
+
+
+def read_msh_arrays(filename, max_workers=None):
+    """Read the nodes, elements and groups of a .msh file into NumPy arrays.
+
+    Files are read in chunks of MSH_CHUNK_BYTES. Elements are returned per
+    FreeCAD mesh key as element ids and connectivity in FreeCAD node order.
+    Groups are returned as arrays of node or element ids, surface groups as
+    rows of element id and surface number. Included files are read ahead
+    by max_workers threads.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        reader = MshBlockReader(executor)
+        reader.read_file(filename)
+    mesh_arrays = reader.arrays()
+    if "Seg3Elem" in mesh_arrays["Elements"]:  # to print "not supported"
         FreeCAD.Console.PrintError("Error: seg3 (3-node beam element type) not supported, yet.\n")
-    f.close()
-
-    # switch from the FrontISTR node numbering to the FreeCAD node numbering
-    # numbering do not change: seg2
-    for en in elements.tria3:
-        n = elements.tria3[en]
-        elements.tria3[en] = [n[0], n[2], n[1]]
-    for en in elements.tria6:
-        n = elements.tria6[en]
-        elements.tria6[en] = [n[0], n[2], n[1], n[4], n[3], n[5]]
-    for en in elements.quad4:
-        n = elements.quad4[en]
-        elements.quad4[en] = [n[0], n[3], n[2], n[1]]
-    for en in elements.quad8:
-        n = elements.quad8[en]
-        elements.quad8[en] = [n[0], n[3], n[2], n[2], n[7], n[6], n[5], n[4]]
-    for en in elements.tetra4:
-        n = elements.tetra4[en]
-        elements.tetra4[en] = [n[1], n[0], n[2], n[3]]
-    for en in elements.tetra10:
-        n = elements.tetra10[en]
-        elements.tetra10[en] = [n[1], n[0], n[2], n[3], n[6], n[5], n[4],
-                                n[8], n[7], n[9]]
-    for en in elements.hexa8:
-        n = elements.hexa8[en]
-        elements.hexa8[en] = [n[5], n[6], n[7], n[4], n[1], n[2], n[3], n[0]]
-    for en in elements.hexa20:
-        n = elements.hexa20[en]
-        elements.hexa20[en] = [n[5], n[6], n[7], n[4], n[1], n[2], n[3], n[0],
-                               n[13], n[14], n[15], n[12], n[9], n[10], n[11],
-                               n[8], n[17], n[18], n[19], n[16]]
-    for en in elements.penta6:
-        n = elements.penta6[en]
-        elements.penta6[en] = [n[4], n[5], n[3], n[1], n[2], n[0]]
-    for en in elements.penta15:
-        n = elements.penta15[en]
-        elements.penta15[en] = [n[4], n[5], n[3], n[1], n[2], n[0],
-                                n[9], n[10], n[11], n[6], n[7], n[8], n[13],
-                                n[14], n[12]]
-    for en in elements.seg3:
-        n = elements.seg3[en]
-        elements.seg3[en] = [n[0], n[2], n[1]]
+    return mesh_arrays
+
+
+def _surface_nodes(elm_type, surface):
+    # local nodes of a surface in FreeCAD node order, shells use all nodes
+    n_nodes, key, order = MSH_ELEMENT_TYPES[elm_type]
+    faces = MSH_SURFACES.get(elm_type[:2])
+    if faces is None:
+        return list(range(n_nodes))
+    if surface not in faces:
+        return []
+    corners = set(faces[surface])
+    local = list(faces[surface])
+    for i, edge in enumerate(MSH_MIDSIDE_EDGES.get(elm_type, ())):
+        if corners.issuperset(edge):
+            local.append(len(order) - len(MSH_MIDSIDE_EDGES[elm_type]) + i)
+    return [order.index(i) for i in local]
+
+
+def get_surface_group_nodes(mesh_arrays, surfaces):
+    """Return the node ids of the element surfaces of a surface group"""
+    node_ids = []
+    for elm_type, element_ids in mesh_arrays["ElementTypes"].items():
+        key = MSH_ELEMENT_TYPES[elm_type][1]
+        all_ids, nodes = mesh_arrays["Elements"][key]
+        sorter = np.argsort(all_ids)
+        rows = np.searchsorted(all_ids, surfaces[:, 0], sorter=sorter)
+        rows = np.minimum(rows, len(all_ids) - 1)
+        rows = sorter[rows]
+        found = (all_ids[rows] == surfaces[:, 0]) & np.isin(surfaces[:, 0], element_ids)
+        for surface in np.unique(surfaces[found, 1]).tolist():
+            local = _surface_nodes(elm_type, surface)
+            if local:
+                selected = rows[found & (surfaces[:, 1] == surface)]
+                node_ids.append(nodes[selected][:, local].ravel())
+    if not node_ids:
+        return np.empty(0, dtype=np.int64)
+    return np.unique(np.concatenate(node_ids))
+
+
+def _element_group_type(mesh_arrays, element_ids):
+    # FemMesh group type of the elements of a group
+    types = set()
+    for key, (all_ids, nodes) in mesh_arrays["Elements"].items():
+        if np.isin(element_ids, all_ids).any():
+            if key.startswith("Seg"):
+                types.add("Edge")
+            elif key.startswith(("Tria", "Quad")):
+                types.add("Face")
+            else:
+                types.add("Volume")
+    return types.pop() if len(types) == 1 else "All"
+
+
+def make_femmesh(mesh_arrays):
+    """Create a FemMesh with groups from the arrays of read_msh_arrays.
+
+    Surface groups become node groups of the nodes of their element faces.
+    """
+    import Fem
+    femmesh = Fem.FemMesh()
+    node_ids = mesh_arrays["NodeIds"]
+    for nid, (x, y, z) in zip(node_ids.tolist(), mesh_arrays["Coordinates"].tolist()):
+        femmesh.addNode(x, y, z, nid)
+    elements = mesh_arrays["Elements"]
+    for key in MESH_KEYS:
+        if key not in elements:
+            continue
+        if key.startswith("Seg"):
+            add = femmesh.addEdge
+        elif key.startswith(("Tria", "Quad")):
+            add = femmesh.addFace
+        else:
+            add = femmesh.addVolume
+        element_ids, nodes = elements[key]
+        for eid, enodes in zip(element_ids.tolist(), nodes.tolist()):
+            add(enodes, eid)
+
+    groups = []
+    for name, ids in mesh_arrays.get("NodeGroups", {}).items():
+        groups.append((name, "Node", ids))
+    for name, ids in mesh_arrays.get("ElementGroups", {}).items():
+        groups.append((name, _element_group_type(mesh_arrays, ids), ids))
+    for name, surfaces in mesh_arrays.get("SurfaceGroups", {}).items():
+        groups.append((name, "Node", get_surface_group_nodes(mesh_arrays, surfaces)))
+    for name, group_type, ids in groups:
+        group_id = femmesh.addGroup(name, group_type)
+        femmesh.addGroupElements(group_id, ids.tolist())
+
+    FreeCAD.Console.PrintLog(
+        "Mesh by msh file: {} nodes, {} elements, {} groups\n"
+        .format(len(node_ids), sum(len(e[0]) for e in elements.values()), len(groups))
+    )
+    return femmesh
 
+
+def read_msh_fistr(filename):
+    '''read .msh file '''
+    # ATM only mesh reading is supported (no boundary conditions, material definitions)
+    # returns the dicts of nodes and elements used by importToolsFem.make_femmesh,
+    # groups are only part of the arrays of read_msh_arrays
+    mesh_arrays = read_msh_arrays(filename)
+    mesh_data = {
+        "Nodes": dict(zip(
+            mesh_arrays["NodeIds"].tolist(), mesh_arrays["Coordinates"].tolist()
+        ))
+    }
+    for key in MESH_KEYS:
+        mesh_data[key] = {}
+        if key in mesh_arrays["Elements"]:
+            element_ids, nodes = mesh_arrays["Elements"][key]
+            mesh_data[key] = dict(zip(element_ids.tolist(), nodes.tolist()))
+    return mesh_data
+
+
+# ********* distributed meshes of the partitioner (HECMW-DIST) *********
+# A domain file <name>.p.<rank> starts with the header line and the global
+# information of struct hecmwST_local_mesh, one item per line: the
+# hecmw_flag_* values, gridfile, the file names, the header and zero_temp.
+# The sizes and arrays of the node and element information follow as plain
+# numbers. The file version and the flags decide which optional items are
+# present. Only nodes and elements are read.
+
+DIST_HEADER = b"!HECMW-DMD-ASCII"
+
+# bytes of the numeric part of a domain file
+DIST_NUMERIC_BYTES = b"0123456789+-.eE \t\r\n"
+
+# hecmw_flag_parttype: node_internal_list is written for element based,
+# elem_internal_list for node based partitioning
+DIST_PARTTYPE_NODEBASED = 1
+DIST_PARTTYPE_ELEMBASED = 2
+
+# first hecmw_flag_version writing nn_middle and n_dof_tot
+DIST_NN_MIDDLE_VERSION = 2
+DIST_N_DOF_TOT_VERSION = 3
+
+# first file version writing hecmw_flag_partcontact
+DIST_PARTCONTACT_FILE_VERSION = 4
+
+
+class DistLayoutError(ValueError):
+    pass
+
+
+class _DistLines(object):
+    # the global information of a domain file read one line after the other
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def string(self):
+        if self.pos >= len(self.data):
+            raise DistLayoutError("end of data in the global information")
+        end = self.data.find(b"\n", self.pos)
+        end = len(self.data) if end == -1 else end + 1
+        line = self.data[self.pos:end]
+        self.pos = end
+        return line.strip().decode("utf-8", "replace")
+
+    def number(self, cast, name):
+        line = self.string()
+        try:
+            return cast(line)
+        except ValueError:
+            raise DistLayoutError("{} expected, found '{}'".format(name, line))
+
+
+class _DistValues(object):
+    # the numbers of a domain file read one item after the other
+
+    def __init__(self, values):
+        self.values = values
+        self.pos = 0
+
+    def count(self, name):
+        if self.pos >= len(self.values):
+            raise DistLayoutError("end of data at {}".format(name))
+        value = self.values[self.pos]
+        self.pos += 1
+        if value < 0 or value != int(value):
+            raise DistLayoutError("{} is not a size".format(name))
+        return int(value)
+
+    def array(self, n, name):
+        if self.pos + n > len(self.values):
+            raise DistLayoutError("end of data at {}".format(name))
+        values = self.values[self.pos:self.pos + n]
+        self.pos += n
+        return values
+
+    def ids(self, n, low, high, name):
+        values = self.array(n, name)
+        if n and (values.min() < low or values.max() > high or (values != np.round(values)).any()):
+            raise DistLayoutError("{} out of range".format(name))
+        return values.astype(np.int64)
+
+
+def _read_dist_global(data):
+    """Return the hecmw flags and the offset of the node information"""
+    lines = _DistLines(data)
+    header = lines.string()
+    if not header.startswith(DIST_HEADER.decode()):
+        raise DistLayoutError("not an ASCII HECMW-DIST file")
+    match = re.search(r"version\s*=\s*(\d+)", header)
+    if not match:
+        raise DistLayoutError("no file version in '{}'".format(header))
+    flags = {"file_version": int(match.group(1))}
+    for name in ("adapt", "initcon", "parttype", "partdepth", "version"):
+        flags[name] = lines.number(int, "hecmw_flag_" + name)
+    if flags["file_version"] >= DIST_PARTCONTACT_FILE_VERSION:
+        flags["partcontact"] = lines.number(int, "hecmw_flag_partcontact")
+    lines.string()  # gridfile
+    for i in range(lines.number(int, "hecmw_n_file")):
+        lines.string()
+    if lines.number(int, "header flag"):
+        lines.string()
+    lines.number(float, "zero_temp")
+    return flags, lines.pos
+
+
+def _dist_numeric_end(data, start):
+    """Return the end of the lines holding only numbers from start"""
+    table = np.ones(256, dtype=bool)
+    table[np.frombuffer(DIST_NUMERIC_BYTES, dtype=np.uint8)] = False
+    other = np.flatnonzero(table[np.frombuffer(data, dtype=np.uint8, offset=start)])
+    if not len(other):
+        return len(data)
+    # material and group names follow the numbers of the mesh
+    return data.rfind(b"\n", start, start + other[0]) + 1
+
+
+def _parse_dist_mesh(values, flags, n_domains):
+    v = _DistValues(values)
+    version = flags["version"]
+
+    # node information
+    n_node = v.count("n_node")
+    n_node_gross = v.count("n_node_gross")
+    if n_node_gross == 0 or n_node > n_node_gross:
+        raise DistLayoutError("n_node {} of n_node_gross {}".format(n_node, n_node_gross))
+    if version >= DIST_NN_MIDDLE_VERSION:
+        v.count("nn_middle")
+    nn_internal = v.count("nn_internal")
+    if nn_internal > n_node_gross:
+        raise DistLayoutError("nn_internal {} of n_node_gross {}".format(nn_internal, n_node_gross))
+    if flags["parttype"] == DIST_PARTTYPE_ELEMBASED and nn_internal:
+        v.ids(nn_internal, 1, n_node_gross, "node_internal_list")
+    node_id = v.ids(2 * n_node_gross, 0, np.inf, "node_ID").reshape(-1, 2)
+    if node_id[:, 0].min() < 1 or node_id[:, 1].max() >= n_domains:
+        raise DistLayoutError("node_ID out of range")
+    global_node_id = v.ids(n_node_gross, 1, np.inf, "global_node_ID")
+    coords = v.array(3 * n_node_gross, "node").reshape(-1, 3)
+    v.count("n_dof")
+    n_dof_grp = v.count("n_dof_grp")
+    if version >= DIST_N_DOF_TOT_VERSION:
+        v.count("n_dof_tot")
+    dof_index = v.ids(n_dof_grp + 1, 0, n_node_gross, "node_dof_index")
+    if dof_index[0] != 0 or dof_index[-1] != n_node_gross or (np.diff(dof_index) < 0).any():
+        raise DistLayoutError("node_dof_index does not cover n_node_gross")
+    v.ids(n_dof_grp, 1, 6, "node_dof_item")
+    if flags["initcon"]:
+        init_index = v.ids(n_node_gross + 1, 0, np.inf, "node_init_val_index")
+        v.array(int(init_index[-1]), "node_init_val_item")
+
+    # element information
+    n_elem = v.count("n_elem")
+    n_elem_gross = v.count("n_elem_gross")
+    if n_elem_gross == 0 or n_elem > n_elem_gross:
+        raise DistLayoutError("n_elem {} of n_elem_gross {}".format(n_elem, n_elem_gross))
+    ne_internal = v.count("ne_internal")
+    if ne_internal > n_elem_gross:
+        raise DistLayoutError("ne_internal {} of n_elem_gross {}".format(ne_internal, n_elem_gross))
+    if flags["parttype"] == DIST_PARTTYPE_NODEBASED and ne_internal:
+        v.ids(ne_internal, 1, n_elem_gross, "elem_internal_list")
+    elem_id = v.ids(2 * n_elem_gross, 0, np.inf, "elem_ID").reshape(-1, 2)
+    if elem_id[:, 0].min() < 1 or elem_id[:, 1].max() >= n_domains:
+        raise DistLayoutError("elem_ID out of range")
+    global_elem_id = v.ids(n_elem_gross, 1, np.inf, "global_elem_ID")
+    elem_type = v.ids(n_elem_gross, 0, np.inf, "elem_type")
+    unsupported = sorted(set(np.unique(elem_type).tolist()) - set(map(int, MSH_ELEMENT_TYPES)))
+    if unsupported:
+        raise DistLayoutError("element type {} is not supported".format(
+            ", ".join(map(str, unsupported))
+        ))
+    n_elem_type = v.count("n_elem_type")
+    v.ids(n_elem_type + 1, 0, n_elem_gross, "elem_type_index")
+    v.ids(n_elem_type, 0, np.inf, "elem_type_item")
+    node_index = v.ids(n_elem_gross + 1, 0, np.inf, "elem_node_index")
+    n_nodes = np.zeros(1000, dtype=np.int64)
+    for code, (n, key, order) in MSH_ELEMENT_TYPES.items():
+        n_nodes[int(code)] = n
+    if node_index[0] != 0 or (np.diff(node_index) != n_nodes[elem_type]).any():
+        raise DistLayoutError("elem_node_index does not match the element types")
+    node_item = v.ids(int(node_index[-1]), 1, n_node_gross, "elem_node_item")
+    return {
+        "node_ID": node_id,
+        "global_node_ID": global_node_id,
+        "node": coords,
+        "elem_ID": elem_id,
+        "global_elem_ID": global_elem_id,
+        "elem_type": elem_type,
+        "elem_node_index": node_index,
+        "elem_node_item": node_item,
+    }
+
+
+def read_dist_domain(filename, rank, n_domains):
+    """Read the nodes and elements owned by one domain of a HECMW-DIST mesh.
+
+    Overlap and external nodes and elements, owned by other domains, are
+    dropped. Connectivity refers to global node ids, in FrontISTR node order.
+    """
+    with pyopen(filename, "rb") as f:
+        data = f.read()
+    try:
+        flags, start = _read_dist_global(data)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            values = np.fromstring(
+                data[start:_dist_numeric_end(data, start)], dtype=np.float64, sep=" "
+            )
+        del data
+        local = _parse_dist_mesh(values, flags, n_domains)
+    except DistLayoutError as e:
+        raise DistLayoutError("{}: {}".format(filename, e))
+
+    own_nodes = local["node_ID"][:, 1] == rank
+    own_elems = np.flatnonzero(local["elem_ID"][:, 1] == rank)
+    global_node_id = local["global_node_ID"]
+    elements = {}
+    for code in np.unique(local["elem_type"][own_elems]).tolist():
+        rows = own_elems[local["elem_type"][own_elems] == code]
+        n_nodes = MSH_ELEMENT_TYPES[str(code)][0]
+        items = local["elem_node_index"][rows][:, None] + np.arange(n_nodes)
+        elements[str(code)] = (
+            local["global_elem_ID"][rows],
+            global_node_id[local["elem_node_item"][items] - 1]
+        )
     return {
-        'Nodes': nodes,
-        'Seg2Elem': elements.seg2,
-        'Seg3Elem': elements.seg3,
-        'Tria3Elem': elements.tria3,
-        'Tria6Elem': elements.tria6,
-        'Quad4Elem': elements.quad4,
-        'Quad8Elem': elements.quad8,
-        'Tetra4Elem': elements.tetra4,
-        'Tetra10Elem': elements.tetra10,
-        'Hexa8Elem': elements.hexa8,
-        'Hexa20Elem': elements.hexa20,
-        'Penta6Elem': elements.penta6,
-        'Penta15Elem': elements.penta15
+        "NodeIds": global_node_id[own_nodes],
+        "Coordinates": local["node"][own_nodes],
+        "Elements": elements,
     }
+
+
+def get_dist_files(filename):
+    """Return the domain files of a HECMW-DIST mesh, sorted by rank.
+
+    filename is the mesh name given in hecmw_ctrl.dat, e.g. Mesh.p,
+    or one of its domain files.
+    """
+    base = filename
+    match = re.match(r"(.*\.p)\.\d+$", filename)
+    if match:
+        base = match.group(1)
+    files = {}
+    for name in glob.glob(glob.escape(base) + ".*"):
+        suffix = name[len(base) + 1:]
+        if suffix.isdigit():
+            files[int(suffix)] = name
+    return [files[rank] for rank in sorted(files)]
+
+
+def read_dist_arrays(filename, max_workers=None, keep_domains=False):
+    """Read all domains of a HECMW-DIST mesh and stitch the global mesh.
+
+    The domain files are read in max_workers threads, forking the FreeCAD
+    process is not safe. The parsing holds the GIL, so the threads only
+    overlap the file reads with it. The returned arrays are those of
+    read_msh_arrays. With keep_domains every domain becomes an element
+    group Domain<rank>, the domain of every element is in ElementDomains.
+    """
+    files = get_dist_files(filename)
+    if not files:
+        raise OSError("No HECMW-DIST domain files found for {}".format(filename))
+    n_domains = len(files)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        domains = list(executor.map(
+            read_dist_domain, files, range(n_domains), [n_domains] * n_domains
+        ))
+
+    node_ids = np.concatenate([d["NodeIds"] for d in domains])
+    node_ids, first = np.unique(node_ids, return_index=True)
+    coords = np.concatenate([d["Coordinates"] for d in domains])[first]
+    parts = {}
+    element_types = {}
+    for rank, domain in enumerate(domains):
+        for code, (element_ids, nodes) in domain["Elements"].items():
+            n_nodes, key, order = MSH_ELEMENT_TYPES[code]
+            parts.setdefault(key, []).append(
+                (element_ids, nodes[:, order], np.full(len(element_ids), rank))
+            )
+            element_types.setdefault(code, []).append(element_ids)
+    elements = {}
+    element_domains = {}
+    for key, key_parts in parts.items():
+        element_ids = np.concatenate([p[0] for p in key_parts])
+        element_ids, first = np.unique(element_ids, return_index=True)
+        elements[key] = (element_ids, np.concatenate([p[1] for p in key_parts])[first])
+        element_domains[key] = np.concatenate([p[2] for p in key_parts])[first]
+    element_groups = {}
+    if keep_domains:
+        for rank, domain in enumerate(domains):
+            ids = [e[0] for e in domain["Elements"].values()]
+            if ids:
+                element_groups["Domain{}".format(rank)] = np.unique(np.concatenate(ids))
+    return {
+        "NodeIds": node_ids,
+        "Coordinates": coords,
+        "Elements": elements,
+        "ElementTypes": {
+            code: np.unique(np.concatenate(ids)) for code, ids in element_types.items()
+        },
+        "ElementDomains": element_domains,
+        "NodeGroups": {},
+        "ElementGroups": element_groups,
+        "SurfaceGroups": {},
+    }
+
+
+def import_dist_fistr(filename, keep_domains=True, doc=None):
+    '''read all domains of a HECMW-DIST mesh and insert a FreeCAD FEM Mesh object
+    '''
+    mesh_arrays = read_dist_arrays(filename, keep_domains=keep_domains)
+    femmesh = make_femmesh(mesh_arrays)
+    doc = doc or FreeCAD.ActiveDocument
+    mesh_name = os.path.basename(get_dist_files(filename)[0]).rsplit(".", 2)[0] + "_partitioned"
+    mesh_object = doc.addObject('Fem::FemMeshObject', mesh_name)
+    mesh_object.FemMesh = femmesh
+    doc.recompute()
+    return mesh_object
@@ -0,0 +1,334 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 FrontISTR Commons <https://www.frontistr.com/>     *
+# *                                                                         *
+# *   This file is part of the FreeCAD CAx development system.              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__title__ = "FreeCAD FEM solver FrontISTR mesh writer"
+__author__ = "FrontISTR Commons"
+__url__ = "https://www.frontistr.com/"
+
+## \addtogroup FEM
+#  @{
+
+# Writes the nodes and the highest dimension elements of a FemMesh as
+# ABAQUS input for the FrontISTR partitioner, like FemMesh.writeABAQUS
+# but from NumPy arrays in large chunks and with floats FrontISTR reads
+# as they are, i.e. always with a decimal point in the mantissa. The
+# arrays are collected with one getElementNodes call per element, so
+# FemMesh.writeABAQUS stays the default, see MESH_FROM_ARRAYS.
+# write_ids and write_node_values format the node sets and node loads of
+# the input writer the same way, whole arrays at once.
+
+import os
+import re
+import shutil
+
+import numpy as np
+
+import FreeCAD
+
+
+# write the mesh from get_femmesh_arrays instead of FemMesh.writeABAQUS,
+# compare both with sample/benchmarks/bench_mesh_writer.py before enabling
+MESH_FROM_ARRAYS = False
+
+# number of lines formatted at once
+MESH_CHUNK_LINES = 65536
+
+# numbers per line of an element, the ABAQUS limit is 16
+MESH_NUMBERS_PER_LINE = 15
+
+# ids per line of node sets, the ABAQUS limit is 16
+SET_IDS_PER_LINE = 16
+
+# float format of the node coordinates, 13 significant digits as writeABAQUS
+MESH_FLOAT_FORMAT = "%.12E"
+
+# bytes read at once by fix_fp_expression
+FP_BLOCK_BYTES = 1 << 24
+
+# a number without decimal point in front of its exponent, e.g. 1e-05,
+# within one line as the former line by line substitution
+FP_EXPRESSION = re.compile(rb"([+\-,\t\r\f\v ][0-9]+)([eE])")
+
+# number of nodes -> (ABAQUS type, node order) per element dimension,
+# freecad[j] = abaqus[order[j]] as in FemMesh.writeABAQUS
+ABAQUS_VOLUME_TYPES = {
+    4: ("C3D4", (1, 0, 2, 3)),
+    10: ("C3D10", (1, 0, 2, 3, 4, 6, 5, 8, 7, 9)),
+    8: ("C3D8", (0, 3, 2, 1, 4, 7, 6, 5)),
+    20: ("C3D20", (0, 3, 2, 1, 4, 7, 6, 5, 11, 10, 9, 8, 15, 14, 13, 12, 16, 19, 18, 17)),
+    6: ("C3D6", (0, 2, 1, 3, 5, 4)),
+    15: ("C3D15", (0, 2, 1, 3, 5, 4, 8, 7, 6, 11, 10, 9, 12, 14, 13)),
+}
+ABAQUS_FACE_TYPES = {
+    3: ("S3", (0, 1, 2)),
+    6: ("S6", (0, 1, 2, 3, 4, 5)),
+    4: ("S4", (0, 1, 2, 3)),
+    8: ("S8", (0, 1, 2, 3, 4, 5, 6, 7)),
+}
+ABAQUS_EDGE_TYPES = {
+    2: ("B31", (0, 1)),
+    3: ("B32", (0, 2, 1)),
+}
+
+
+def get_femmesh_arrays(femmesh):
+    """Return the nodes and the highest dimension elements of a FemMesh.
+
+    Returns node ids, coordinates, the element set name (Evolumes, Efaces
+    or Eedges) and {number of nodes: (element ids, connectivity)} with the
+    connectivity in FreeCAD node order.
+    """
+    nodes = femmesh.Nodes
+    node_ids = np.fromiter(nodes.keys(), dtype=np.int64, count=len(nodes))
+    coords = np.array([(v.x, v.y, v.z) for v in nodes.values()], dtype=np.float64)
+    coords = coords.reshape(-1, 3)
+    order = np.argsort(node_ids, kind="stable")
+
+    if femmesh.VolumeCount:
+        elset, element_ids = "Evolumes", femmesh.Volumes
+    elif femmesh.FaceCount:
+        elset, element_ids = "Efaces", femmesh.Faces
+    else:
+        elset, element_ids = "Eedges", femmesh.Edges
+    by_size = {}
+    for eid in element_ids:
+        conn = femmesh.getElementNodes(eid)
+        by_size.setdefault(len(conn), ([], []))
+        by_size[len(conn)][0].append(eid)
+        by_size[len(conn)][1].append(conn)
+    elements = {
+        n_nodes: (np.array(ids, dtype=np.int64), np.array(conns, dtype=np.int64))
+        for n_nodes, (ids, conns) in sorted(by_size.items())
+    }
+    return node_ids[order], coords[order], elset, elements
+
+
+def _write_rows(f, row_format, rows):
+    # printf formatting of MESH_CHUNK_LINES rows at once
+    for start in range(0, len(rows), MESH_CHUNK_LINES):
+        chunk = rows[start:start + MESH_CHUNK_LINES]
+        f.write((row_format * len(chunk)) % tuple(chunk.ravel().tolist()))
+
+
+def _element_row_format(n_numbers):
+    # element id and nodes, continued lines end with a comma
+    fields = ["%d"] * n_numbers
+    lines = [
+        ", ".join(fields[start:start + MESH_NUMBERS_PER_LINE])
+        for start in range(0, n_numbers, MESH_NUMBERS_PER_LINE)
+    ]
+    return ",\n".join(lines) + "\n"
+
+
+def _abaqus_types(elset):
+    return {
+        "Evolumes": ABAQUS_VOLUME_TYPES,
+        "Efaces": ABAQUS_FACE_TYPES,
+        "Eedges": ABAQUS_EDGE_TYPES,
+    }[elset]
+
+
+def get_unmapped_elements(elset, elements):
+    """Numbers of nodes of the elements without an ABAQUS element type,
+    e.g. 5 and 13 of pyramids, as sorted list.
+    """
+    types = _abaqus_types(elset)
+    return sorted(n_nodes for n_nodes in elements if n_nodes not in types)
+
+
+def write_abaqus_mesh(f, node_ids, coords, elset, elements):
+    """Write nodes and elements of get_femmesh_arrays to the open file f.
+
+    The element set Eall of writeABAQUS is not written, FrontISTR sets
+    are added by the input writer. Elements without an ABAQUS element
+    type raise a ValueError, see get_unmapped_elements.
+    """
+    types = _abaqus_types(elset)
+    description = {
+        "Evolumes": "Volume",
+        "Efaces": "Face",
+        "Eedges": "Edge",
+    }[elset]
+    unmapped = get_unmapped_elements(elset, elements)
+    if unmapped:
+        raise ValueError(
+            "{} elements with {} nodes have no ABAQUS element type.".format(
+                description, ", ".join(str(n_nodes) for n_nodes in unmapped)
+            )
+        )
+    f.write("** written by FrontISTR mesh writer\n")
+    f.write("** highest dimension mesh elements only.\n\n")
+    f.write("** Nodes\n*Node, NSET=Nall\n")
+    # ids are exact in the float rows, %d prints them as integers
+    _write_rows(
+        f,
+        "%d, {0}, {0}, {0}\n".format(MESH_FLOAT_FORMAT),
+        np.column_stack((node_ids, coords))
+    )
+
+    f.write("\n\n** {} elements\n".format(description))
+    for n_nodes, (element_ids, conn) in elements.items():
+        abaqus_type, order = types[n_nodes]
+        f.write("*Element, TYPE={}, ELSET={}\n".format(abaqus_type, elset))
+        _write_rows(
+            f,
+            _element_row_format(n_nodes + 1),
+            np.column_stack((element_ids, conn[:, np.argsort(order)]))
+        )
+    f.write("\n")
+
+
+def write_femmesh_abaqus(femmesh, filename):
+    """Write a FemMesh with FemMesh.writeABAQUS, as the input writer did
+    before the array writer, for meshes write_abaqus_mesh can not write.
+
+    The trailing element set Eall is cut off. The floats of writeABAQUS
+    still need fix_fp_expression.
+    """
+    # highest element order only, no mesh group data
+    femmesh.writeABAQUS(filename, 1, False)
+    # delete **Define element set Eall
+    with open(filename, "r+b") as f:
+        f.seek(-56, os.SEEK_END)
+        f.truncate()
+
+
+def write_femmesh(femmesh, filename, from_arrays=None):
+    """Write a FemMesh to an ABAQUS mesh file for FrontISTR.
+
+    The mesh is written by write_abaqus_mesh if from_arrays is true
+    (default: MESH_FROM_ARRAYS) and all element types have an ABAQUS
+    type, otherwise by write_femmesh_abaqus. Returns True if the floats
+    still need fix_fp_expression, i.e. the mesh was written by
+    write_femmesh_abaqus.
+    """
+    if from_arrays is None:
+        from_arrays = MESH_FROM_ARRAYS
+    if from_arrays:
+        node_ids, coords, elset, elements = get_femmesh_arrays(femmesh)
+        unmapped = get_unmapped_elements(elset, elements)
+        if not unmapped:
+            with open(filename, "w", buffering=1 << 20) as f:
+                write_abaqus_mesh(f, node_ids, coords, elset, elements)
+            return False
+        FreeCAD.Console.PrintWarning(
+            "Elements with {} nodes have no ABAQUS element type, "
+            "the mesh is written by FemMesh.writeABAQUS.\n".format(
+                ", ".join(str(n_nodes) for n_nodes in unmapped)
+            )
+        )
+    write_femmesh_abaqus(femmesh, filename)
+    return True
+    with open(filename, "w", buffering=1 << 20) as f:
+        write_abaqus_mesh(f, node_ids, coords, elset, elements)
+    return elset
+
+
+def write_ids(f, ids, per_line=SET_IDS_PER_LINE):
+    """Write ids as data lines of a set, per_line ids on a line."""
+    ids = np.asarray(ids, dtype=np.int64).ravel()
+    n_full = len(ids) - len(ids) % per_line
+    _write_rows(f, ", ".join(["%d"] * per_line) + "\n", ids[:n_full].reshape(-1, per_line))
+    if n_full < len(ids):
+        f.write(", ".join(map(str, ids[n_full:].tolist())) + "\n")
+
+
+def write_node_values(f, node_ids, values, dofs, value_format):
+    """Write a line "node,dof,value" per node and dof, e.g. for !CLOAD.
+
+    values has a column per dof of dofs, value_format is the printf format
+    of the values.
+    """
+    if not len(dofs) or not len(node_ids):
+        return
+    row_format = "".join("%d,{},{}\n".format(dof, value_format) for dof in dofs)
+    rows = np.empty((len(node_ids), 2 * len(dofs)), dtype=np.float64)
+    # ids are exact in the float rows, %d prints them as integers
+    rows[:, 0::2] = np.asarray(node_ids, dtype=np.float64)[:, None]
+    rows[:, 1::2] = np.asarray(values, dtype=np.float64).reshape(len(node_ids), len(dofs))
+    _write_rows(f, row_format, rows)
+
+
+def fix_fp_expression(filename, start=0, offsets=None):
+    """Insert a decimal point in front of the exponent of numbers like 1e-05.
+
+    FrontISTR does not read these. The file is processed in blocks of
+    FP_BLOCK_BYTES from byte start on, the bytes in front of start are
+    known to be fine, e.g. the mesh of write_abaqus_mesh. Only if something
+    has to be fixed, the file is rewritten to a temporary file which then
+    replaces it. offsets, a list of positions at line starts, are moved in
+    place by the inserted bytes. Returns True if the file was changed.
+    """
+    positions = list(offsets or ())
+    inserted = 0
+    tmp_file = None
+    out = None
+    with open(filename, "rb") as f:
+        f.seek(start)
+        block_start = start
+        rest = b""
+        while True:
+            block = f.read(FP_BLOCK_BYTES)
+            data = rest + block
+            if block:
+                # complete lines only, the last one is continued by the next block
+                end = data.rfind(b"\n") + 1
+                data, rest = data[:end], data[end:]
+            if out is None and FP_EXPRESSION.search(data):
+                tmp_file = filename + ".tmp"
+                out = open(tmp_file, "wb")
+                f_prefix = open(filename, "rb")
+                shutil.copyfileobj(_LimitedReader(f_prefix, block_start), out)
+                f_prefix.close()
+            if out is not None:
+                fixed = FP_EXPRESSION.sub(rb"\1.\2", data)
+                out.write(fixed)
+                for i, position in enumerate(positions):
+                    if block_start < position <= block_start + len(data):
+                        head = data[:position - block_start]
+                        offsets[i] = position + inserted + len(FP_EXPRESSION.sub(rb"\1.\2", head)) - len(head)
+                inserted += len(fixed) - len(data)
+            block_start += len(data)
+            if not block:
+                break
+    if out is None:
+        return False
+    out.close()
+    os.replace(tmp_file, filename)
+    return True
+
+
+class _LimitedReader(object):
+    # file like object of the first size bytes of f for shutil.copyfileobj
+    def __init__(self, f, size):
+        self.f = f
+        self.size = size
+
+    def read(self, n=-1):
+        if n < 0 or n > self.size:
+            n = self.size
+        data = self.f.read(n)
+        self.size -= len(data)
+        return data
+
+##  @}
@@ -218,6 +218,53 @@ def add_attributes(obj, fistr_prefs):
     output_format = fistr_prefs.GetInt("OutputFileFormat", 0)
     obj.OutputFileFormat = known_fistr_output_format[output_format]
 
+    choices_result_source = ["visualizer", "result files"]
+    obj.addProperty(
+        "App::PropertyEnumeration",
+        "ResultSource",
+        "General",
+        "Load the merged visualizer output or the result files of all ranks"
+    )
+    obj.ResultSource = choices_result_source
+    result_source = fistr_prefs.GetString("ResultSource", "visualizer")
+    obj.ResultSource = result_source
+
+    choices_result_increments = ["all", "on demand", "last"]
+    obj.addProperty(
+        "App::PropertyEnumeration",
+        "ResultIncrements",
+        "General",
+        "Load the results of all increments, all increments filled on selection "
+        "(AVS output only), or only the last one"
+    )
+    obj.ResultIncrements = choices_result_increments
+    result_increments = fistr_prefs.GetString("ResultIncrements", "all")
+    obj.ResultIncrements = result_increments
+
+    obj.addProperty(
+        "App::PropertyBool",
+        "TimingReport",
+        "General",
+        "Write the timings of write, partition, solve and import to fistr_timing.json"
+    )
+    obj.TimingReport = fistr_prefs.GetBool("TimingReport", False)
+
+    obj.addProperty(
+        "App::PropertyBool",
+        "PartitionCache",
+        "General",
+        "Reuse the domain files of the partitioner if mesh and number of domains are unchanged"
+    )
+    obj.PartitionCache = fistr_prefs.GetBool("PartitionCache", True)
+
+    obj.addProperty(
+        "App::PropertyBool",
+        "IncrementalInput",
+        "General",
+        "Keep the parts of the mesh file whose inputs are unchanged, e.g. the mesh"
+    )
+    obj.IncrementalInput = fistr_prefs.GetBool("IncrementalInput", True)
+
     choices_increment_type = ["auto", "fixed"]
     obj.addProperty(
         "App::PropertyEnumeration",
@@ -39,7 +39,10 @@ import FreeCAD
 from . import writer
 from femsolver import run
 from femsolver import settings
+import fistrtiming
 import importfistrAvsResults
+import importfistrResResults
+import importfistrVtkResults
 from femtools import femutils
 from femtools import membertools
 
@@ -60,6 +63,7 @@ class Prepare(run.Prepare):
     def run(self):
         global _inputFileName
         self.pushStatus("Preparing input files...\n")
+        fistrtiming.begin_run(self.directory, self.solver)
         w = writer.FemInputWriterfistr(
             self.analysis,
             self.solver,
@@ -67,7 +71,8 @@ class Prepare(run.Prepare):
             membertools.AnalysisMember(self.analysis),
             self.directory
         )
-        path = w.write_FrontISTR_input_file()
+        with fistrtiming.span("write input"):
+            path = w.write_FrontISTR_input_file()
         # report to user if task succeeded
         if path != "":
             self.pushStatus("Write completed!")
@@ -92,7 +97,8 @@ class Solve(run.Solve):
             stderr=subprocess.PIPE)
         self.signalAbort.add(self._process.terminate)
         # output = self._observeSolver(self._process)
-        self._process.communicate()
+        with fistrtiming.span("solve"):
+            self._process.communicate()
         self.signalAbort.remove(self._process.terminate)
         # if not self.aborted:
         #     self._updateOutput(output)
@@ -110,24 +116,77 @@ class Results(run.Results):
             "User parameter:BaseApp/Preferences/Mod/Fem/General")
         if not prefs.GetBool("KeepResultsOnReRun", False):
             self.purge_results()
-        self.load_results_fistravs()
+        try:
+            if getattr(self.solver, "ResultSource", "visualizer") == "result files":
+                self.load_results_fistrres()
+            elif self.solver.OutputFileFormat != "AVS":
+                self.load_results_fistrvtk()
+            else:
+                self.load_results_fistravs()
+        finally:
+            # the results are the last step of the run
+            fistrtiming.end_run()
 
     def purge_results(self):
         for m in membertools.get_member(self.analysis, "Fem::FemResultObject"):
             if m.Mesh and femutils.is_of_type(m.Mesh, "Fem::MeshResult"):
                 self.analysis.Document.removeObject(m.Mesh.Name)
             self.analysis.Document.removeObject(m.Name)
+        importfistrAvsResults.refresh_lazy_results(self.analysis.Document)
         self.analysis.Document.recompute()
 
     def load_results_fistravs(self):
-        avs_result_file = os.path.join(
-            self.directory, _inputFileName + ".avs")
-        if os.path.isfile(avs_result_file):
+        visfiles = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(_inputFileName + "_vis_psf.") and name.endswith(".inp")
+        )
+        if not visfiles and os.path.isfile(os.path.join(self.directory, _inputFileName + ".avs")):
+            visfiles = [_inputFileName + ".avs"]
+        # the visfiles of all increments or only the one of the last increment
+        result_increments = getattr(self.solver, "ResultIncrements", "last")
+        if result_increments == "last":
+            visfiles = visfiles[-1:]
+        if visfiles:
             result_name_prefix = "FrontISTR_" + self.solver.AnalysisType + "_"
             importfistrAvsResults.importAvs(
-                avs_result_file, self.analysis, result_name_prefix)
+                [os.path.join(self.directory, name) for name in visfiles],
+                self.analysis, result_name_prefix, self.directory,
+                lazy=(result_increments == "on demand"))
+        else:
+            raise Exception(
+                "FEM: No results found in {}!".format(self.directory))
+
+    def load_results_fistrvtk(self):
+        vtk_result_files = importfistrVtkResults.get_vtk_files(self.directory)
+        if vtk_result_files:
+            if getattr(self.solver, "ResultIncrements", "last") == "last":
+                vtk_result_files = vtk_result_files[-1:]
+            result_name_prefix = "FrontISTR_" + self.solver.AnalysisType + "_"
+            importfistrVtkResults.importVtk(
+                vtk_result_files, self.analysis, result_name_prefix)
+        else:
+            raise Exception(
+                "FEM: No VTK results found in {}!".format(self.directory))
+
+    def load_results_fistrres(self):
+        res_name = os.path.join(self.directory, _inputFileName + ".res")
+        res_files = importfistrResResults.get_res_files(res_name)
+        if res_files:
+            steps = None
+            result_increments = getattr(self.solver, "ResultIncrements", "last")
+            if result_increments == "last":
+                steps = [max(res_files)]
+            elif result_increments == "on demand":
+                FreeCAD.Console.PrintWarning(
+                    "ResultIncrements 'on demand' is only supported for the AVS "
+                    "output of the visualizer, the results of all increments "
+                    "are loaded.\n")
+            result_name_prefix = "FrontISTR_" + self.solver.AnalysisType + "_"
+            importfistrResResults.importRes(
+                res_name, self.analysis, result_name_prefix,
+                membertools.get_mesh_to_solve(self.analysis)[0], steps)
         else:
             raise Exception(
-                "FEM: No results found at {}!".format(avs_result_file))
+                "FEM: No results found at {}!".format(res_name))
 
 ##  @}
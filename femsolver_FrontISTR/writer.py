@@ -31,21 +31,47 @@ __url__ = "https://www.frontistr.com/"
 ## \addtogroup FEM
 #  @{
 
-# import io
 import codecs
+import hashlib
+import io
 import os
 import six
 import sys
 import time
 from os.path import join
 
+import numpy as np
+
 import FreeCAD
 
+import fistrcache
+import fistrtiming
+from . import meshwriter
 from femsolver import writerbase
 from femmesh import meshtools
 from femtools import geomtools
 
 
+# parts of the mesh file in the order they are written
+INPUT_PARTS = ("mesh", "sets", "materials")
+
+# writer attributes with the objects of the element, node and surface sets
+INPUT_SET_OBJECTS = (
+    "fixed_objects",
+    "displacement_objects",
+    "planerotation_objects",
+    "contact_objects",
+    "tie_objects",
+    "sectionprint_objects",
+    "transform_objects",
+    "temperature_objects",
+    "beamsection_objects",
+    "beamrotation_objects",
+    "fluidsection_objects",
+    "shellthickness_objects",
+)
+
+
 # Interesting forum topic: https://forum.freecadweb.org/viewtopic.php?&t=48451
 # TODO somehow set units at beginning and every time a value is retrieved use this identifier
 # this would lead to support of unit system, force might be retrieved in base writer!
@@ -94,6 +120,9 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
 
         self.isactive_load = False
         self.isactive_boundary = False
+        self.fp_checked_bytes = 0
+        self.lookup_cache = None
+        self.volumes_by_face = {}
 
         self.temperature_fistr_objects = member.cons_temperature_fistr
         self.material_hyper_objects = member.mats_hyper_fistr
@@ -136,8 +165,22 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
 
     def write_FrontISTR_input(self):
 
+        # parts of the mesh file with unchanged inputs are kept
+        digests = {}
+        if self.use_incremental_input():
+            digests = self.get_input_digests()
+        kept, state = self.get_kept_input_parts(digests)
+        part_ends = []
+        if self.use_incremental_input():
+            analysis = getattr(self, "analysis", None)
+            self.lookup_cache = fistrcache.LookupCache(
+                self.dir_name, getattr(analysis, "Name", "Analysis"), digests["mesh"]
+            )
+
         # mesh file and cntfile
-        mshfile = self.write_mesh()
+        with fistrtiming.span("write mesh"):
+            mshfile = self.write_mesh(max(kept.values(), default=0))
+        part_ends.append(["mesh", digests.get("mesh"), kept.get("mesh", mshfile.tell())])
         cntfile = self.write_cnt()
         self.write_dat()
         
@@ -147,22 +190,34 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
         # eigen settings
         self.write_eigen_setting(cntfile)
 
-        # element and material sets
-        self.write_element_sets_material_and_femelement_type(mshfile)
-
-        # node sets and surface sets
-        self.write_node_sets_constraints_fixed(mshfile)
-        self.write_node_sets_constraints_displacement(mshfile)
-        self.write_node_sets_constraints_planerotation(mshfile)
-        self.write_surfaces_constraints_contact(mshfile)
-        self.write_surfaces_constraints_tie(mshfile)
-        self.write_surfaces_constraints_sectionprint(mshfile)
-        self.write_node_sets_constraints_transform(mshfile)
-        self.write_node_sets_constraints_temperature(mshfile)
-
-        # materials and fem element types
-        self.write_materials(mshfile,cntfile)
-        self.write_femelementsets(mshfile)
+        fistrtiming.start("write sets")
+        if "sets" in kept:
+            self.set_input_state(state)
+            if "materials" not in kept:
+                self.get_fistr_elsets()
+        else:
+            # element and material sets
+            self.write_element_sets_material_and_femelement_type(mshfile)
+
+            # node sets and surface sets
+            self.write_node_sets_constraints_fixed(mshfile)
+            self.write_node_sets_constraints_displacement(mshfile)
+            self.write_node_sets_constraints_planerotation(mshfile)
+            self.write_surfaces_constraints_contact(mshfile)
+            self.write_surfaces_constraints_tie(mshfile)
+            self.write_surfaces_constraints_sectionprint(mshfile)
+            self.write_node_sets_constraints_transform(mshfile)
+            self.write_node_sets_constraints_temperature(mshfile)
+        part_ends.append(["sets", digests.get("sets"), kept.get("sets", mshfile.tell())])
+
+        # materials and fem element types, the control file part is always written
+        if "materials" in kept:
+            self.write_materials(io.StringIO(), cntfile)
+        else:
+            self.write_materials(mshfile, cntfile)
+            self.write_femelementsets(mshfile)
+        part_ends.append(["materials", digests.get("materials"), kept.get("materials", mshfile.tell())])
+        fistrtiming.stop("write sets")
 
         # Fluid sections:
         # not supported yet
@@ -203,6 +258,7 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
         ## self.write_constraints_contact(cntfile)
         ## self.write_constraints_tie(cntfile)
 
+        fistrtiming.start("write cnt")
         # constraints dependent from steps
         self.write_constraints_fixed(cntfile)
         self.write_constraints_displacement(cntfile)
@@ -218,28 +274,238 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
 
         # output
         self.write_outputs_types(cntfile)
+        fistrtiming.stop("write cnt")
 
         mshfile.close()
         cntfile.close()
 
+        # floating point expressions FrontISTR does not read, before the
+        # manifest is saved as the fix changes the file and its part ends
+        with fistrtiming.span("fp expression"):
+            ends = [end for name, digest, end in part_ends]
+            meshwriter.fix_fp_expression(self.msh_name, self.fp_checked_bytes, ends)
+            for part, end in zip(part_ends, ends):
+                part[2] = end
+
+        if self.use_incremental_input():
+            fistrcache.save_input_manifest(
+                self.dir_name, self.mesh_name, self.msh_name, part_ends, self.get_input_state()
+            )
+            self.lookup_cache.save()
+            if self.lookup_cache.hits or self.lookup_cache.misses:
+                FreeCAD.Console.PrintMessage(
+                    "Constraint lookups reused: {}, searched: {}\n".format(
+                        self.lookup_cache.hits, self.lookup_cache.misses
+                    )
+                )
+        FreeCAD.Console.PrintMessage(
+            "Input parts kept: {}, written: {}\n".format(
+                ", ".join(kept) or "none",
+                ", ".join([p for p in INPUT_PARTS if p not in kept] + ["control"])
+            )
+        )
+
     # ********************************************************************************************
-    # mesh
-    def write_mesh(self):
-        # write mesh to file
-        element_param = 1  # highest element order only
-        group_param = False  # do not write mesh group data
-
-        self.femmesh.writeABAQUS(
-            self.msh_name,
-            element_param,
-            group_param
+    # incremental input
+    def use_incremental_input(self):
+        return getattr(self.solver_obj, "IncrementalInput", True)
+
+    def get_input_digests(self):
+        """Return the content hashes of the inputs of the parts of the mesh file.
+
+        Every part is written behind the former ones and depends on them,
+        thus the hash of a part includes the hashes of the former parts.
+        """
+        digest = hashlib.sha1()
+        fistrcache.update_digest(digest, self.fc_ver)
+        fistrcache.update_digest(digest, fistrcache.mesh_key(self.femmesh))
+        digests = {"mesh": digest.hexdigest()}
+
+        # element sets of mesh groups, node sets and surfaces of the constraints
+        fistrcache.update_digest(digest, self.analysis_type)
+        for group in getattr(self.femmesh, "Groups", ()):
+            fistrcache.update_digest(digest, (
+                self.femmesh.getGroupName(group), self.femmesh.getGroupElements(group)
+            ))
+        for name in INPUT_SET_OBJECTS:
+            for femobj in getattr(self, name, None) or []:
+                fistrcache.update_object_digest(digest, femobj["Object"])
+        if int(self.fc_ver[0]) > 0 or int(self.fc_ver[1]) > 19:
+            for femobj in self.member.cons_sectionprint:
+                fistrcache.update_object_digest(digest, femobj["Object"])
+        # the element sets depend on the references of the materials only
+        for femobj in self.material_objects:
+            fistrcache.update_object_digest(digest, femobj["Object"], ("References",))
+        digests["sets"] = digest.hexdigest()
+
+        # the densities are written for self weight only
+        fistrcache.update_digest(digest, bool(self.selfweight_objects))
+        for femobj in self.material_objects:
+            fistrcache.update_object_digest(digest, femobj["Object"])
+        digests["materials"] = digest.hexdigest()
+        return digests
+
+    def get_kept_input_parts(self, digests):
+        """Return the leading parts of the mesh file with unchanged inputs.
+
+        Returns {name: end offset} of the parts and the state saved with them.
+        """
+        kept = {}
+        if not self.use_incremental_input() or not os.path.isfile(self.msh_name):
+            return kept, {}
+        manifest = fistrcache.load_input_manifest(self.dir_name, self.mesh_name, self.msh_name)
+        if manifest is None:
+            return kept, {}
+        for name, digest, end in manifest["parts"]:
+            if digests.get(name) != digest:
+                break
+            kept[name] = end
+        return kept, manifest["state"]
+
+    def get_input_state(self):
+        # node lists of the node sets needed by the control file
+        state = {"fixed": {}}
+        for femobj in self.fixed_objects:
+            state["fixed"][femobj["Object"].Name] = {
+                key: [int(n) for n in femobj[key]]
+                for key in ("NodesSolid", "NodesFaceEdge") if key in femobj
+            }
+        return state
+
+    def set_input_state(self, state):
+        for femobj in self.fixed_objects:
+            femobj.update(state.get("fixed", {}).get(femobj["Object"].Name, {}))
+
+    # ********************************************************************************************
+    # cached geometric searches of the constraints
+    def get_constraint_lookups(self):
+        """Return the geometric searches of the constraints by kind.
+
+        Every kind has the femobj dicts, the keys the search sets in them,
+        the search, a value added to the cache key and the functions to
+        encode and decode the data of one femobj for the lookup cache.
+        """
+        shell_or_beam = bool(
+            self.femmesh.Volumes and (self.shellthickness_objects or self.beamsection_objects)
         )
+        base = super(FemInputWriterfistr, self)
+        return {
+            "fixed nodes": (
+                self.fixed_objects, ("Nodes", "NodesSolid", "NodesFaceEdge"),
+                base.get_constraints_fixed_nodes, shell_or_beam, None, None
+            ),
+            "displacement nodes": (
+                self.displacement_objects, ("Nodes",),
+                base.get_constraints_displacement_nodes, None, None, None
+            ),
+            "temperature nodes": (
+                self.temperature_objects, ("Nodes",),
+                base.get_constraints_temperature_nodes, None, None, None
+            ),
+            "force node loads": (
+                self.force_objects, ("NodeLoadTable",),
+                base.get_constraints_force_nodeloads, None,
+                encode_nodeload_table, decode_nodeload_table
+            ),
+            "pressure faces": (
+                self.pressure_objects, ("PressureFaces",),
+                base.get_constraints_pressure_faces, None, None, None
+            ),
+        }
+
+    def load_cached_lookup(self, kind):
+        # set the data of all femobjs of kind from the lookup cache if all are there
+        femobjs, keys, search, extra, encode, decode = self.get_constraint_lookups()[kind]
+        if self.lookup_cache is None or not femobjs:
+            return False
+        cached = [
+            self.lookup_cache.get(self.get_lookup_key(kind, femobj, extra)) for femobj in femobjs
+        ]
+        if any(data is None for data in cached):
+            return False
+        for femobj, data in zip(femobjs, cached):
+            femobj.update(decode(femobj, data) if decode else data)
+        return True
+
+    def save_cached_lookup(self, kind):
+        femobjs, keys, search, extra, encode, decode = self.get_constraint_lookups()[kind]
+        if self.lookup_cache is None:
+            return
+        for femobj in femobjs:
+            data = {k: femobj[k] for k in keys if k in femobj}
+            data = encode(femobj, data) if encode else _to_json(data)
+            if data is not None:
+                self.lookup_cache.put(self.get_lookup_key(kind, femobj, extra), data)
+
+    def get_lookup_key(self, kind, femobj, extra):
+        return self.lookup_cache.key(kind, fistrcache.references_key(femobj["Object"]), extra)
+
+    def get_cached_lookup(self, kind):
+        """Set the data of the femobjs of kind from the lookup cache or by the search."""
+        if not self.load_cached_lookup(kind):
+            self.get_constraint_lookups()[kind][2]()
+            self.save_cached_lookup(kind)
+
+    def get_constraints_fixed_nodes(self):
+        self.get_cached_lookup("fixed nodes")
+
+    def get_constraints_displacement_nodes(self):
+        self.get_cached_lookup("displacement nodes")
+
+    def get_constraints_temperature_nodes(self):
+        self.get_cached_lookup("temperature nodes")
+
+    def get_constraints_force_nodeloads(self):
+        self.get_cached_lookup("force node loads")
+
+    def get_constraints_pressure_faces(self):
+        self.get_cached_lookup("pressure faces")
+
+    def get_cached_volumes_by_face(self, ref_obj, sub):
+        volumes = self.volumes_by_face.get((ref_obj.Name, sub))
+        if volumes is None and self.lookup_cache is not None:
+            volumes = self.lookup_cache.get(self.lookup_cache.key(
+                "volumes by face", ref_obj, sub, fistrcache.shape_key(ref_obj, sub)
+            ))
+            if volumes is not None:
+                self.volumes_by_face[(ref_obj.Name, sub)] = volumes
+        return volumes
+
+    def set_cached_volumes_by_face(self, ref_obj, sub, volumes):
+        volumes = _to_json(volumes)
+        self.volumes_by_face[(ref_obj.Name, sub)] = volumes
+        if self.lookup_cache is not None:
+            self.lookup_cache.put(self.lookup_cache.key(
+                "volumes by face", ref_obj, sub, fistrcache.shape_key(ref_obj, sub)
+            ), volumes)
+        return volumes
+
+    def get_fistr_volumes_by_face(self, ref_obj, sub, ref_shape):
+        # volume elements and face numbers of the mesh at face sub of ref_obj
+        volumes = self.get_cached_volumes_by_face(ref_obj, sub)
+        if volumes is None:
+            volumes = self.set_cached_volumes_by_face(
+                ref_obj, sub, self.mesh_object.FemMesh.getfistrVolumesByFace(ref_shape)
+            )
+        return volumes
 
-        mshfile = codecs.open(self.msh_name, "a", encoding="utf-8")
-        # delete **Define element set Eall 
-        mshfile.seek(-56, os.SEEK_END)
-        mshfile.truncate()
+    # ********************************************************************************************
+    # mesh
+    def write_mesh(self, kept_bytes=0):
+        # write mesh to file, highest element order only, no mesh group data
+        # and no element set Eall
+        if kept_bytes:
+            # the parts in front of kept_bytes are unchanged and checked already
+            with open(self.msh_name, "r+b") as f:
+                f.truncate(kept_bytes)
+            fp_fix = False
+        else:
+            fp_fix = meshwriter.write_femmesh(self.femmesh, self.msh_name)
+        # bytes needing no floating point expression fix,
+        # the floats of writeABAQUS need it
+        self.fp_checked_bytes = 0 if fp_fix else os.path.getsize(self.msh_name)
 
+        mshfile = codecs.open(self.msh_name, "a", encoding="utf-8")
         return mshfile
 
     def write_cnt(self):
@@ -299,16 +565,13 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
                     and (len(self.shellthickness_objects) > 0 or len(self.beamsection_objects) > 0):
                 if len(femobj["NodesSolid"]) > 0:
                     f.write("*NSET,NSET=" + fix_obj.Name + "Solid\n")
-                    for n in femobj["NodesSolid"]:
-                        f.write(str(n) + ",\n")
+                    meshwriter.write_ids(f, femobj["NodesSolid"])
                 if len(femobj["NodesFaceEdge"]) > 0:
                     f.write("*NSET,NSET=" + fix_obj.Name + "FaceEdge\n")
-                    for n in femobj["NodesFaceEdge"]:
-                        f.write(str(n) + ",\n")
+                    meshwriter.write_ids(f, femobj["NodesFaceEdge"])
             else:
                 f.write("*NSET,NSET=" + fix_obj.Name + "\n")
-                for n in femobj["Nodes"]:
-                    f.write(str(n) + ",\n")
+                meshwriter.write_ids(f, femobj["Nodes"])
 
     def write_constraints_fixed(self, f):
         if not self.fixed_objects:
@@ -375,8 +638,7 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
             disp_obj = femobj["Object"]
             f.write("** " + disp_obj.Label + "\n")
             f.write("*NSET,NSET=" + disp_obj.Name + "\n")
-            for n in femobj["Nodes"]:
-                f.write(str(n) + ",\n")
+            meshwriter.write_ids(f, femobj["Nodes"])
 
     def write_constraints_displacement(self, f):
         if not self.displacement_objects:
@@ -642,7 +904,7 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
                         name = "SECTIONFACE" + str(obj)
                         f.write("*SURFACE, NAME=" + name + "\n")
 
-                        v = self.mesh_object.FemMesh.getfistrVolumesByFace(ref_shape)
+                        v = self.get_fistr_volumes_by_face(o, elem, ref_shape)
                         if len(v) > 0:
                             # volume elements found
                             FreeCAD.Console.PrintLog(
@@ -698,8 +960,7 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
             temp_obj = femobj["Object"]
             f.write("** " + temp_obj.Label + "\n")
             f.write("*NSET,NSET=" + temp_obj.Name + "\n")
-            for n in femobj["Nodes"]:
-                f.write(str(n) + ",\n")
+            meshwriter.write_ids(f, femobj["Nodes"])
 
     def write_constraints_temperature(self, f):
         # if not self.temperature_objects:
@@ -825,31 +1086,26 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
             # femobj --> dict, FreeCAD document object is femobj["Object"]
             f.write("## " + femobj["Object"].Label + "\n")
             direction_vec = femobj["Object"].DirectionVector
-            dir_zero_tol = 1e-15  # TODO: should this be more generally for more values?
+            direction = (direction_vec.x, direction_vec.y, direction_vec.z)
+            if int(self.fc_ver[0]) >= 1:
+                dir_zero_tol = 1e-15  # TODO: should this be more generally for more values?
+                dofs = [dof for dof in (1, 2, 3) if abs(direction[dof - 1]) > dir_zero_tol]
+                value_format = "%.13G"
+            else:
+                dofs = [dof for dof in (1, 2, 3) if direction[dof - 1] != 0.0]
+                value_format = "%.13E"
+            components = np.array([direction[dof - 1] for dof in dofs])
             for ref_shape in femobj["NodeLoadTable"]:
                 f.write(f"## {ref_shape[0]}\n")
-                for n in sorted(ref_shape[1]):
-                    node_load = ref_shape[1][n]
-                    if int(self.fc_ver[0]) >= 1:
-                        if abs(direction_vec.x) > dir_zero_tol:
-                            v1 = f"{(direction_vec.x * node_load).Value:.13G}"
-                            f.write(f"{n},1,{v1}\n")
-                        if abs(direction_vec.y) > dir_zero_tol:
-                            v2 = f"{(direction_vec.y * node_load).Value:.13G}"
-                            f.write(f"{n},2,{v2}\n")
-                        if abs(direction_vec.z) > dir_zero_tol:
-                            v3 = f"{(direction_vec.z * node_load).Value:.13G}"
-                            f.write(f"{n},3,{v3}\n")
-                    else:
-                        if (direction_vec.x != 0.0):
-                            v1 = "{:.13E}".format(direction_vec.x * node_load)
-                            f.write(str(n) + ",1," + v1 + "\n")
-                        if (direction_vec.y != 0.0):
-                            v2 = "{:.13E}".format(direction_vec.y * node_load)
-                            f.write(str(n) + ",2," + v2 + "\n")
-                        if (direction_vec.z != 0.0):
-                            v3 = "{:.13E}".format(direction_vec.z * node_load)
-                            f.write(str(n) + ",3," + v3 + "\n")
+                node_ids = sorted(ref_shape[1])
+                # node loads are quantities since FreeCAD 1.0
+                node_loads = np.array(
+                    [getattr(ref_shape[1][n], "Value", ref_shape[1][n]) for n in node_ids],
+                    dtype=np.float64
+                )
+                meshwriter.write_node_values(
+                    f, node_ids, node_loads[:, None] * components, dofs, value_format
+                )
                 f.write("\n")
             f.write("\n")
 
@@ -885,21 +1141,25 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
             else:
                 press_rev = rev * prs_obj.Pressure
             f.write("!DLOAD,GRPID=1\n")
+            press_pos = f"{press_rev}"
+            press_neg = f"{-1 * press_rev}"
             for ref_shape in femobj["PressureFaces"]:
                 # the loop is needed for compatibility reason
                 # in deprecated method get_pressure_obj_faces_depreciated
                 # the face ids where per ref_shape
+                lines = []
                 for face, fno in ref_shape[1]:
                     if fno > 0:  # solid mesh face
-                        f.write(f"{face},P{fno},{press_rev}\n")
+                        lines.append(f"{face},P{fno},{press_pos}\n")
                     # on shell mesh face: fno == 0
                     # normal of element face == face normal
                     elif fno == 0:
-                        f.write(f"{face},S,{press_rev}\n")
+                        lines.append(f"{face},S,{press_pos}\n")
                     # on shell mesh face: fno == -1
                     # normal of element face opposite direction face normal
                     elif fno == -1:
-                        f.write(f"{face},S,{-1 * press_rev}\n")
+                        lines.append(f"{face},S,{press_neg}\n")
+                f.write("".join(lines))
 
     # ********************************************************************************************
     # constraints heatflux
@@ -927,7 +1187,7 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
                     for elem in elem_tup:
                         ho = o.Shape.getElement(elem)
                         if ho.ShapeType == "Face":
-                            v = self.mesh_object.FemMesh.getfistrVolumesByFace(ho)
+                            v = self.get_fistr_volumes_by_face(o, elem, ho)
                             f.write("** Heat flux on face {}\n".format(elem))
                             for i in v:
                                 # SvdW: add factor to force heatflux to units system of t/mm/s/K
@@ -944,7 +1204,7 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
                     for elem in elem_tup:
                         ho = o.Shape.getElement(elem)
                         if ho.ShapeType == "Face":
-                            v = self.mesh_object.FemMesh.getfistrVolumesByFace(ho)
+                            v = self.get_fistr_volumes_by_face(o, elem, ho)
                             f.write("** Heat flux on face {}\n".format(elem))
                             for i in v:
                                 f.write("{},S{},{}\n".format(
@@ -1072,7 +1332,12 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
     # output types
     def write_outputs_types(self, f):
         f.write("### OUTPUT Control ###\n")
-        #f.write("!WRITE,RESULT"+"\n")
+        if getattr(self.solver_obj, "ResultSource", "visualizer") == "result files":
+            # result files of every rank, no visualizer output
+            f.write("!WRITE,RESULT,FREQUENCY=9999"+"\n")
+            f.write("!OUTPUT_RES"+"\n")
+            f.write("PRINC_NSTRESS,ON"+"\n\n")
+            return
         f.write("!WRITE,VISUAL,FREQUENCY=9999"+"\n")
         f.write("!OUTPUT_VIS"+"\n")
         f.write("PRINC_NSTRESS,ON"+"\n")
@@ -1151,6 +1416,23 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
         f.write("** Element sets for materials and FEM element type (solid, shell, beam)\n")
         f.write("** written by {} function\n".format(sys._getframe().f_code.co_name))
 
+        self.get_fistr_elsets()
+
+        # write fistr_elsets to file
+        for fistr_elset in self.fistr_elsets:
+            # use six to be sure to be Python 2.7 and 3.x compatible
+            if isinstance(fistr_elset["fistr_elset"], six.string_types):
+                elsetname = fistr_elset["fistr_elset"]
+                if elsetname in fistr_elset.keys():
+                    f.write("*ELSET,ELSET=" + fistr_elset["fistr_elset_name"] + "\n")
+                    for elid in fistr_elset[elsetname]:
+                        f.write(str(elid) + ",\n")
+            else:
+                f.write("*ELSET,ELSET=" + fistr_elset["fistr_elset_name"] + "\n")
+                for elid in fistr_elset["fistr_elset"]:
+                    f.write(str(elid) + ",\n")
+
+    def get_fistr_elsets(self):
         # in any case if we have beams, we're going to need the element ids for the rotation elsets
         if self.beamsection_objects:
             # we will need to split the beam even for one beamobj
@@ -1204,20 +1486,6 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
             elif len(self.beamsection_objects) > 1:
                 self.get_fistr_elsets_multiple_mat_multiple_beam()
 
-        # write fistr_elsets to file
-        for fistr_elset in self.fistr_elsets:
-            # use six to be sure to be Python 2.7 and 3.x compatible
-            if isinstance(fistr_elset["fistr_elset"], six.string_types):
-                elsetname = fistr_elset["fistr_elset"]
-                if elsetname in fistr_elset.keys():
-                    f.write("*ELSET,ELSET=" + fistr_elset["fistr_elset_name"] + "\n")
-                    for elid in fistr_elset[elsetname]:
-                        f.write(str(elid) + ",\n")
-            else:
-                f.write("*ELSET,ELSET=" + fistr_elset["fistr_elset_name"] + "\n")
-                for elid in fistr_elset["fistr_elset"]:
-                    f.write(str(elid) + ",\n")
-
     # self.fistr_elsets = [ {
     #                        "fistr_elset" : [e1, e2, e3, ... , en] or elements set name strings
     #                        "fistr_elset_name" : "fistr_identifier_elset"
@@ -1832,6 +2100,40 @@ class FemInputWriterfistr(writerbase.FemInputWriter):
 
 # ************************************************************************************************
 # Helpers
+def _to_json(value):
+    # tuples and sets of the lookups as lists
+    if isinstance(value, dict):
+        return {k: _to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_to_json(v) for v in value]
+    return value
+
+
+def _force_value(frc_obj):
+    # the force is a float before FreeCAD 1.0
+    return getattr(frc_obj.Force, "Value", frc_obj.Force)
+
+
+def encode_nodeload_table(femobj, data):
+    """Node loads of a force constraint per unit force, None for zero force."""
+    force = _force_value(femobj["Object"])
+    if not force or "NodeLoadTable" not in data:
+        return None
+    return {"NodeLoadTable": [
+        [ref_name, [[n, getattr(load, "Value", load) / force] for n, load in loads.items()]]
+        for ref_name, loads in data["NodeLoadTable"]
+    ]}
+
+
+def decode_nodeload_table(femobj, data):
+    # the block writer takes the values of the loads
+    force = _force_value(femobj["Object"])
+    return {"NodeLoadTable": [
+        (ref_name, {n: ratio * force for n, ratio in loads})
+        for ref_name, loads in data["NodeLoadTable"]
+    ]}
+
+
 # fistr elset names:
 # M .. Material
 # B .. Beam
@@ -0,0 +1,408 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 FrontISTR Commons <https://www.frontistr.com/>     *
+# *                                                                         *
+# *   This file is part of the FreeCAD CAx development system.              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__title__ = "FrontISTR run cache"
+__author__ = "FrontISTR Commons"
+__url__ = "https://www.frontistr.com/"
+
+## @package fistrcache
+#  \ingroup FEM
+#  \brief reuse of intermediate files of former runs in the working directory
+#
+#  The partition cache stores the domain files <mesh>.p.<rank> of the
+#  partitioner in fistr_cache/partition/<digest>/ together with a
+#  manifest.json. The digest is built from the mesh file, the partition
+#  settings (hecmw_part_ctrl.dat) and the mesh lines of hecmw_ctrl.dat,
+#  so a run with a changed .cnt only reuses the domain files.
+#
+#  The input manifest fistr_cache/input/<mesh>.json records the content
+#  hashes of the inputs of the parts of the mesh file written by
+#  FemInputWriterfistr and where the parts end, so parts with unchanged
+#  inputs are kept in the file instead of being written again.
+#
+#  The lookup cache fistr_cache/lookup/<analysis>.json holds the results of
+#  the geometric searches of constraint nodes and faces in the mesh, keyed
+#  by the constraint type and the references. It is valid for one mesh only
+#  and is dropped as soon as the mesh hash changes.
+
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+
+import FreeCAD
+
+
+CACHE_DIR = "fistr_cache"
+PARTITION_CACHE_VERSION = 1
+PARTITION_CACHE_MAX_ENTRIES = 4
+
+# bytes hashed at once
+DIGEST_BLOCK_BYTES = 1 << 24
+
+# elements whose nodes are added to mesh_key
+MESH_KEY_SAMPLES = 4096
+
+INPUT_MANIFEST_VERSION = 1
+LOOKUP_CACHE_VERSION = 1
+
+# properties without influence on the input files, Proxy has no stable repr
+DIGEST_SKIP_PROPERTIES = ("Proxy", "Label2", "Visibility", "ExpressionEngine")
+
+PART_CTRL_FILE = "hecmw_part_ctrl.dat"
+HECMW_CTRL_FILE = "hecmw_ctrl.dat"
+
+
+def file_digest(filename, digest=None):
+    """Update digest (or a new sha1) by the content of filename and return it."""
+    if digest is None:
+        digest = hashlib.sha1()
+    with open(filename, "rb") as f:
+        while True:
+            block = f.read(DIGEST_BLOCK_BYTES)
+            if not block:
+                break
+            digest.update(block)
+    return digest
+
+
+def update_digest(digest, value):
+    """Update digest by a nested value of numbers, strings, arrays and FreeCAD objects.
+
+    Document objects are represented by their name, use update_object_digest
+    for their properties.
+    """
+    if isinstance(value, np.ndarray):
+        digest.update("array{}{}".format(value.dtype.str, value.shape).encode())
+        digest.update(np.ascontiguousarray(value).data)
+    elif isinstance(value, dict):
+        digest.update(b"{")
+        for key in sorted(value, key=str):
+            update_digest(digest, key)
+            update_digest(digest, value[key])
+        digest.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"(")
+        for item in value:
+            update_digest(digest, item)
+        digest.update(b")")
+    elif hasattr(value, "TypeId") and hasattr(value, "Name"):
+        digest.update("<{} {}>".format(value.TypeId, value.Name).encode())
+    else:
+        text = repr(value)
+        if " at 0x" in text:
+            # no content repr, only the type is stable
+            text = type(value).__name__
+        digest.update(text.encode())
+    digest.update(b";")
+
+
+def update_object_digest(digest, obj, properties=None):
+    """Update digest by the properties (default all) of a document object.
+
+    For the references of constraints the bounding boxes of the referenced
+    subelements are added, they change with the geometry.
+    """
+    update_digest(digest, obj)
+    for prop in sorted(properties or obj.PropertiesList):
+        if prop in DIGEST_SKIP_PROPERTIES:
+            continue
+        try:
+            value = getattr(obj, prop)
+        except Exception:
+            continue
+        update_digest(digest, (prop, value))
+    for ref_obj, subs in getattr(obj, "References", []):
+        for sub in subs:
+            update_digest(digest, (sub, shape_key(ref_obj, sub)))
+
+
+def references_key(obj):
+    """Return the references of a constraint with the shape_key of every subelement."""
+    return [
+        (ref_obj, sub, shape_key(ref_obj, sub))
+        for ref_obj, subs in getattr(obj, "References", [])
+        for sub in subs
+    ]
+
+
+def shape_key(obj, sub):
+    """Return a value changing with the geometry of the subelement sub of obj."""
+    try:
+        shape = obj.Shape.getElement(sub)
+        return (shape.ShapeType, shape.BoundBox, shape.Area, shape.Length)
+    except Exception:
+        return None
+
+
+def mesh_key(femmesh):
+    """Return a value changing with a FemMesh, much cheaper than its content.
+
+    It holds the counts, the bounding box, the ids of the highest dimension
+    elements and the nodes and node coordinates of MESH_KEY_SAMPLES evenly
+    spaced ones of them.
+    """
+    if femmesh.VolumeCount:
+        element_ids = femmesh.Volumes
+    elif femmesh.FaceCount:
+        element_ids = femmesh.Faces
+    else:
+        element_ids = femmesh.Edges
+    element_ids = np.array(element_ids, dtype=np.int64)
+    n_samples = min(len(element_ids), MESH_KEY_SAMPLES)
+    samples = element_ids[np.linspace(0, len(element_ids) - 1, n_samples).astype(np.int64)]
+    conns = [femmesh.getElementNodes(int(eid)) for eid in samples]
+    nodes = sorted(set(n for conn in conns for n in conn))
+    coords = np.array([tuple(femmesh.getNodeById(n)) for n in nodes], dtype=np.float64)
+    return (
+        femmesh.NodeCount, femmesh.EdgeCount, femmesh.FaceCount, femmesh.VolumeCount,
+        femmesh.BoundBox, element_ids, conns, coords
+    )
+
+
+def get_input_manifest_path(working_dir, mesh_name):
+    return os.path.join(working_dir, CACHE_DIR, "input", mesh_name + ".json")
+
+
+def _file_stamp(filename):
+    stat = os.stat(filename)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def load_input_manifest(working_dir, mesh_name, inp_file):
+    """Return the input manifest of inp_file, None if there is none or inp_file changed since."""
+    try:
+        with open(get_input_manifest_path(working_dir, mesh_name), "r") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != INPUT_MANIFEST_VERSION:
+            return None
+        if manifest.get("stamp") != _file_stamp(inp_file):
+            return None
+    except (OSError, ValueError):
+        return None
+    return manifest
+
+
+def save_input_manifest(working_dir, mesh_name, inp_file, parts, state=None):
+    """Save the input manifest of the just written inp_file.
+
+    parts is a list of [name, digest, end offset], state holds data of the
+    parts needed to write the control file if the parts are kept.
+    """
+    path = get_input_manifest_path(working_dir, mesh_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    manifest = {
+        "version": INPUT_MANIFEST_VERSION,
+        "stamp": _file_stamp(inp_file),
+        "parts": parts,
+        "state": state or {},
+    }
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+
+def remove_input_manifest(working_dir, mesh_name):
+    path = get_input_manifest_path(working_dir, mesh_name)
+    if os.path.isfile(path):
+        os.remove(path)
+
+
+class LookupCache(object):
+    """Results of geometric searches in one mesh, saved per analysis.
+
+    The keys are sha1 digests of the searched values, the values have to
+    be JSON serializable.
+    """
+
+    def __init__(self, working_dir, analysis_name, mesh_digest):
+        self.path = os.path.join(working_dir, CACHE_DIR, "lookup", analysis_name + ".json")
+        self.mesh_digest = mesh_digest
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.changed = False
+        try:
+            with open(self.path, "r") as f:
+                cache = json.load(f)
+            if cache.get("version") == LOOKUP_CACHE_VERSION and cache.get("mesh") == mesh_digest:
+                self.entries = cache["entries"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    @staticmethod
+    def key(*values):
+        digest = hashlib.sha1()
+        update_digest(digest, values)
+        return digest.hexdigest()
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + ".tmp", "w") as f:
+            json.dump({
+                "version": LOOKUP_CACHE_VERSION,
+                "mesh": self.mesh_digest,
+                "entries": self.entries,
+            }, f)
+        os.replace(self.path + ".tmp", self.path)
+        self.changed = False
+
+
+def _mesh_ctrl_lines(working_dir):
+    # the !MESH blocks of hecmw_ctrl.dat define the partitioner in- and output
+    lines = []
+    with open(os.path.join(working_dir, HECMW_CTRL_FILE), "r") as f:
+        in_mesh = False
+        for line in f:
+            if line.startswith("!"):
+                in_mesh = line.upper().startswith("!MESH")
+            if in_mesh:
+                lines.append(line.strip())
+    return lines
+
+
+def get_partition_files(working_dir, mesh_name):
+    """Return the domain files <mesh_name>.p.<rank> in working_dir sorted by rank."""
+    pattern = re.compile(re.escape(mesh_name) + r"\.p\.(\d+)$")
+    files = []
+    for path in glob.glob(os.path.join(working_dir, glob.escape(mesh_name) + ".p.*")):
+        match = pattern.match(os.path.basename(path))
+        if match:
+            files.append((int(match.group(1)), path))
+    return [path for rank, path in sorted(files)]
+
+
+def partition_digest(working_dir, mesh_name, partitioner=""):
+    """Return the fingerprint of a partitioner run, None if an input file is missing."""
+    mesh_file = os.path.join(working_dir, mesh_name + ".inp")
+    part_ctrl = os.path.join(working_dir, PART_CTRL_FILE)
+    if not (os.path.isfile(mesh_file) and os.path.isfile(part_ctrl)):
+        return None
+    digest = hashlib.sha1()
+    digest.update("{}\n{}\n".format(PARTITION_CACHE_VERSION, os.path.basename(partitioner)).encode())
+    file_digest(part_ctrl, digest)
+    digest.update("\n".join(_mesh_ctrl_lines(working_dir)).encode())
+    file_digest(mesh_file, digest)
+    return digest.hexdigest()
+
+
+def get_partition_cache_dir(working_dir):
+    return os.path.join(working_dir, CACHE_DIR, "partition")
+
+
+def _link_or_copy(src, dst):
+    # hard links cost no space, a copy is needed across file systems
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def restore_partition(working_dir, mesh_name, digest):
+    """Restore the domain files of digest into working_dir.
+
+    Returns the number of restored domains, 0 if there is no valid entry.
+    Domain files of other partitions in working_dir are removed first.
+    """
+    if digest is None:
+        return 0
+    entry_dir = os.path.join(get_partition_cache_dir(working_dir), digest)
+    try:
+        with open(os.path.join(entry_dir, "manifest.json"), "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if manifest.get("version") != PARTITION_CACHE_VERSION or manifest.get("mesh") != mesh_name:
+        return 0
+    files = manifest.get("files", [])
+    for name, size in files:
+        path = os.path.join(entry_dir, name)
+        if not os.path.isfile(path) or os.path.getsize(path) != size:
+            return 0
+    for path in get_partition_files(working_dir, mesh_name):
+        os.remove(path)
+    for name, size in files:
+        _link_or_copy(os.path.join(entry_dir, name), os.path.join(working_dir, name))
+    # the entry is the most recently used one
+    os.utime(entry_dir)
+    return len(files)
+
+
+def store_partition(working_dir, mesh_name, digest):
+    """Store the domain files in working_dir as cache entry digest.
+
+    Only the PARTITION_CACHE_MAX_ENTRIES most recently used entries are kept.
+    """
+    files = get_partition_files(working_dir, mesh_name)
+    if digest is None or not files:
+        return
+    cache_dir = get_partition_cache_dir(working_dir)
+    entry_dir = os.path.join(cache_dir, digest)
+    tmp_dir = entry_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    manifest = {
+        "version": PARTITION_CACHE_VERSION,
+        "mesh": mesh_name,
+        "files": [],
+    }
+    for path in files:
+        name = os.path.basename(path)
+        _link_or_copy(path, os.path.join(tmp_dir, name))
+        manifest["files"].append((name, os.path.getsize(path)))
+    with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.replace(tmp_dir, entry_dir)
+
+    entries = [
+        os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+        if not name.endswith(".tmp")
+    ]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for old_dir in entries[PARTITION_CACHE_MAX_ENTRIES:]:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def clear_partition_cache(working_dir):
+    """Remove all entries of the partition cache."""
+    shutil.rmtree(get_partition_cache_dir(working_dir), ignore_errors=True)
+    FreeCAD.Console.PrintLog("Partition cache in {} removed.\n".format(working_dir))
@@ -0,0 +1,173 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 FrontISTR Commons <https://www.frontistr.com/>     *
+# *                                                                         *
+# *   This file is part of the FreeCAD CAx development system.              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__title__ = "FrontISTR timing report"
+__author__ = "FrontISTR Commons"
+__url__ = "https://www.frontistr.com/"
+
+## @package fistrtiming
+#  \ingroup FEM
+#  \brief named timing spans of the write, partition, solve and import steps
+#
+#  Timing is enabled by the TimingReport property of the solver object
+#  or by setting the environment variable FISTR_TIMING=1.
+#  Every run writes fistr_timing.json into its working directory:
+#
+#      {"version": 1, "started": "...", "working_dir": "...",
+#       "spans": [{"name": "write mesh", "start": 0.01, "duration": 1.2}, ...],
+#       "totals": {"write mesh": 1.2, ...}}
+#
+#  start is the offset in seconds from the beginning of the run.
+
+import contextlib
+import datetime
+import json
+import os
+import time
+
+import FreeCAD
+
+
+TIMING_ENV = "FISTR_TIMING"
+TIMING_REPORT = "fistr_timing.json"
+TIMING_VERSION = 1
+
+
+def is_enabled(solver=None):
+    """Return True if timing is requested by the solver object or the environment."""
+    if os.environ.get(TIMING_ENV, "").lower() in ("1", "true", "yes", "on"):
+        return True
+    return bool(getattr(solver, "TimingReport", False))
+
+
+class TimingReport(object):
+    """Named timing spans of one run of the FrontISTR pipeline."""
+
+    def __init__(self):
+        self.enabled = False
+        self.working_dir = None
+        self.started = None
+        self.run_start = time.perf_counter()
+        self.spans = []
+        self.open_spans = {}
+
+    def begin_run(self, working_dir, solver=None):
+        self.enabled = is_enabled(solver)
+        self.working_dir = working_dir
+        self.started = datetime.datetime.now().isoformat(timespec="seconds")
+        self.run_start = time.perf_counter()
+        self.spans = []
+        self.open_spans = {}
+
+    def end_run(self):
+        """Save the report and forget the run, later spans start a new report."""
+        self.save()
+        self.enabled = False
+        self.working_dir = None
+        self.started = None
+        self.run_start = time.perf_counter()
+        self.spans = []
+        self.open_spans = {}
+
+    def active(self):
+        return self.enabled or is_enabled()
+
+    def start(self, name, **info):
+        if self.active():
+            self.open_spans[name] = (time.perf_counter(), info)
+
+    def stop(self, name):
+        if name not in self.open_spans:
+            return
+        start, info = self.open_spans.pop(name)
+        span = {
+            "name": name,
+            "start": round(start - self.run_start, 6),
+            "duration": round(time.perf_counter() - start, 6),
+        }
+        span.update(info)
+        self.spans.append(span)
+        FreeCAD.Console.PrintLog(
+            "Timing {}: {:.3f} s\n".format(name, span["duration"])
+        )
+        if not self.open_spans:
+            self.save()
+
+    @contextlib.contextmanager
+    def span(self, name, **info):
+        self.start(name, **info)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def save(self, working_dir=None):
+        """Write the report to working_dir, default the working directory of the run."""
+        working_dir = working_dir or self.working_dir
+        if not working_dir or not self.spans:
+            return
+        totals = {}
+        for span in self.spans:
+            totals[span["name"]] = round(totals.get(span["name"], 0.0) + span["duration"], 6)
+        report = {
+            "version": TIMING_VERSION,
+            "started": self.started,
+            "working_dir": working_dir,
+            "spans": self.spans,
+            "totals": totals,
+        }
+        try:
+            with open(os.path.join(working_dir, TIMING_REPORT), "w") as f:
+                json.dump(report, f, indent=1)
+        except OSError as e:
+            FreeCAD.Console.PrintWarning(
+                "Timing report could not be written: {}\n".format(e)
+            )
+
+
+# the report of the current run, shared by writer, tools and result import
+report = TimingReport()
+
+
+def begin_run(working_dir, solver=None):
+    report.begin_run(working_dir, solver)
+
+
+def end_run():
+    report.end_run()
+
+
+def start(name, **info):
+    report.start(name, **info)
+
+
+def stop(name):
+    report.stop(name)
+
+
+def span(name, **info):
+    return report.span(name, **info)
+
+
+def save(working_dir=None):
+    report.save(working_dir)
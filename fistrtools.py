@@ -36,6 +36,8 @@ import subprocess
 
 import FreeCAD
 
+import fistrcache
+import fistrtiming
 from femtools import femutils
 from femtools import membertools
 
@@ -155,7 +157,9 @@ class FemToolsFISTR(QtCore.QRunnable, QtCore.QObject):
         """Remove all result objects and result meshes from an analysis group
         """
         from femresult.resulttools import purge_results as pr
+        import importfistrAvsResults
         pr(self.analysis)
+        importfistrAvsResults.refresh_lazy_results(self.analysis.Document)
 
     def reset_mesh_purge_results_checked(self):
         """Reset mesh color, deformation and removes all result objects
@@ -376,30 +380,13 @@ class FemToolsFISTR(QtCore.QRunnable, QtCore.QObject):
 
     # modify floating point number expression compatible to FrontISTR
     # (should be removed if FrontISTR solver accepts the expression such as 1e-3)
-    def mod_fp_expression(self,FILENAME):
-        import re
-        p = re.compile(r'([+\-,\s][0-9]+)([eE])')
-
-        f = open(FILENAME,"r")
-        dat = f.readlines()
-        f.close()
-
-        found_modfp=False
-        dat2 = []
-        for line in dat:
-            if p.search(line) == None:
-                dat2.append(line)
-            else:
-                dat2.append(p.sub(r'\1.\2',line))
-                found_modfp=True
-
-        if found_modfp:
-            f = open(FILENAME,"w")
-            f.writelines(dat2)
-            f.close()
+    def mod_fp_expression(self, FILENAME, start=0):
+        from femsolver_FrontISTR import meshwriter
+        return meshwriter.fix_fp_expression(FILENAME, start)
 
     def write_inp_file(self):
         import femsolver_FrontISTR.writer as iw
+        fistrtiming.begin_run(self.working_dir, self.solver)
         self.inp_file_name = ""
         try:
             inp_writer = iw.FemInputWriterfistr(
@@ -409,9 +396,10 @@ class FemToolsFISTR(QtCore.QRunnable, QtCore.QObject):
                 self.member,
                 self.working_dir
             )
-            self.inp_file_name = inp_writer.write_FrontISTR_input_file()
-            self.cnt_file_name = self.inp_file_name+".cnt"
-            self.mod_fp_expression(self.inp_file_name+".inp")
+            with fistrtiming.span("write input"):
+                self.inp_file_name = inp_writer.write_FrontISTR_input_file()
+                self.cnt_file_name = self.inp_file_name+".cnt"
+                # the floating point expressions are fixed by the writer
         except Exception as e:
             FreeCAD.Console.PrintError(
                 "Unexpected error when writing FrontISTR input file: {}\n"
@@ -440,15 +428,50 @@ class FemToolsFISTR(QtCore.QRunnable, QtCore.QObject):
             cmd = "unset LD_LIBRARY_PATH; "+self.partitioner_binary
             shellcmd = True
 
-        p = subprocess.Popen(
-            cmd,
-            cwd=self.working_dir,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            shell=shellcmd,
-            startupinfo=startup_info
-        )
-        part_stdout, part_stderr = p.communicate()
+        mesh_name = os.path.basename(self.inp_file_name)
+        use_cache = getattr(self.solver, "PartitionCache", True)
+        digest = None
+        if use_cache:
+            digest = fistrcache.partition_digest(
+                self.working_dir, mesh_name, self.partitioner_binary
+            )
+            with fistrtiming.span("partition cache"):
+                n_domains = fistrcache.restore_partition(self.working_dir, mesh_name, digest)
+            if n_domains:
+                FreeCAD.Console.PrintMessage(
+                    "Mesh and partition settings unchanged, "
+                    "{} domain files of the partition cache reused.\n".format(n_domains)
+                )
+                return
+
+        # the domain files may be hard links into the partition cache
+        for path in fistrcache.get_partition_files(self.working_dir, mesh_name):
+            os.remove(path)
+        with fistrtiming.span("partition", n_process=self.solver.n_process):
+            p = subprocess.Popen(
+                cmd,
+                cwd=self.working_dir,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                shell=shellcmd,
+                startupinfo=startup_info
+            )
+            part_stdout, part_stderr = p.communicate()
+        if use_cache and p.returncode == 0:
+            fistrcache.store_partition(self.working_dir, mesh_name, digest)
+
+    def load_partitioned_mesh(self, keep_domains=True):
+        """Import the domain files of the partitioner as one mesh object.
+
+        With keep_domains the elements of every domain are a mesh group
+        Domain<rank>, to check the quality of the partition. The mesh object
+        is not added to the analysis.
+        """
+        from feminout_FrontISTR import importFrontISTRMesh
+        with fistrtiming.span("import partition"):
+            return importFrontISTRMesh.import_dist_fistr(
+                self.inp_file_name + ".p", keep_domains, self.analysis.Document
+            )
 
     def setup_fistr(self, fistr_binary=None, fistr_binary_sig="FrontISTR"):
         """Set FrontISTR binary path and validate its execution or download FrontISTR.
@@ -680,18 +703,19 @@ class FemToolsFISTR(QtCore.QRunnable, QtCore.QObject):
             cmd = [self.mpiexec_binary,"-n",n_pe,self.fistr_binary]
             shellcmd = False
         elif system() in ("Linux", "Darwin"):
-            cmd = "unset LD_LIBRARY_PATH; "+self.mpiexec_binary+"-n"+n_pe+self.fistr_binary
+            cmd = "unset LD_LIBRARY_PATH; "+" ".join([self.mpiexec_binary,"-n",n_pe,self.fistr_binary])
             shellcmd = True
 
-        p = subprocess.Popen(
-            cmd,
-            cwd=self.working_dir,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            shell=shellcmd,
-            startupinfo=startup_info
-        )
-        self.fistr_stdout, self.fistr_stderr = p.communicate()
+        with fistrtiming.span("solve", n_process=self.solver.n_process):
+            p = subprocess.Popen(
+                cmd,
+                cwd=self.working_dir,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                shell=shellcmd,
+                startupinfo=startup_info
+            )
+            self.fistr_stdout, self.fistr_stderr = p.communicate()
 
         if sys.version_info.major >= 3:
             if system() == "Windows":
@@ -954,7 +978,16 @@ class FemToolsFISTR(QtCore.QRunnable, QtCore.QObject):
     def load_results(self):
         FreeCAD.Console.PrintMessage("We will load the fistr visualized file.\n")
         self.results_present = False
-        self.load_results_fistravs()
+        try:
+            if getattr(self.solver, "ResultSource", "visualizer") == "result files":
+                self.load_results_fistrres()
+            elif self.solver.OutputFileFormat != "AVS":
+                self.load_results_fistrvtk()
+            else:
+                self.load_results_fistravs()
+        finally:
+            # the results are the last step of the run
+            fistrtiming.end_run()
 
     def load_results_fistravs(self):
         """Load results of fistr calculations from .avs file.
@@ -964,15 +997,24 @@ class FemToolsFISTR(QtCore.QRunnable, QtCore.QObject):
         # grep visfiles
         visfiles = []
         for file in os.listdir(self.working_dir):
-            if file.find("_vis_psf.") < 0:
+            if file.find("_vis_psf.") < 0 or not file.endswith(".inp"):
                 continue
             visfiles.append(file)
         visfiles.sort()
 
-        # read only visfile at the last substep
-        avs_result_file = self.working_dir.replace("\\","/")+"/"+visfiles[-1]
+        # read the visfiles of all substeps or only the one at the last substep
+        result_increments = getattr(self.solver, "ResultIncrements", "last")
+        if result_increments == "last":
+            visfiles = visfiles[-1:]
+        avs_result_files = [
+            self.working_dir.replace("\\","/")+"/"+visfile for visfile in visfiles
+        ]
+        avs_result_file = avs_result_files[-1]
         if os.path.isfile(avs_result_file):
-            importfistrAvsResults.importAvs(avs_result_file, self.analysis, "FISTR_")
+            importfistrAvsResults.importAvs(
+                avs_result_files, self.analysis, "FISTR_", self.working_dir,
+                lazy=(result_increments == "on demand")
+            )
             for m in self.analysis.Group:
                 if m.isDerivedFrom("Fem::FemResultObject"):
                     self.results_present = True
@@ -989,6 +1031,54 @@ class FemToolsFISTR(QtCore.QRunnable, QtCore.QObject):
         else:
             raise Exception("FEM: No results found at {}!".format(avs_result_file))
 
+    def load_results_fistrvtk(self):
+        """Load results of fistr calculations from .pvtu/.vtu files.
+        """
+        import importfistrVtkResults
+
+        vtk_result_files = importfistrVtkResults.get_vtk_files(self.working_dir)
+        if not vtk_result_files:
+            raise Exception("FEM: No VTK results found in {}!".format(self.working_dir))
+        # read the files of all substeps or only the one at the last substep
+        if getattr(self.solver, "ResultIncrements", "last") == "last":
+            vtk_result_files = vtk_result_files[-1:]
+        importfistrVtkResults.importVtk(vtk_result_files, self.analysis, "FISTR_")
+        for m in self.analysis.Group:
+            if m.isDerivedFrom("Fem::FemResultObject"):
+                self.results_present = True
+                break
+        else:
+            FreeCAD.Console.PrintError("FEM: No result object in active Analysis.\n")
+
+    def load_results_fistrres(self):
+        """Load results of fistr calculations from the result files of all ranks.
+        """
+        import importfistrResResults
+
+        res_name = os.path.join(self.working_dir, self.mesh.Name + ".res")
+        res_files = importfistrResResults.get_res_files(res_name)
+        if not res_files:
+            raise Exception("FEM: No results found at {}!".format(res_name))
+        steps = None
+        result_increments = getattr(self.solver, "ResultIncrements", "last")
+        if result_increments == "last":
+            steps = [max(res_files)]
+        elif result_increments == "on demand":
+            FreeCAD.Console.PrintWarning(
+                "ResultIncrements 'on demand' is only supported for the AVS output "
+                "of the visualizer, the results of all increments are loaded.\n"
+            )
+        importfistrResResults.importRes(
+            res_name, self.analysis, "FISTR_", self.mesh, steps
+        )
+        for m in self.analysis.Group:
+            if m.isDerivedFrom("Fem::FemResultObject"):
+                self.results_present = True
+                break
+        else:
+            FreeCAD.Console.PrintError("FEM: No result object in active Analysis.\n")
+
+
 class FrontISTRTools(FemToolsFISTR):
 
     def __init__(self, solver=None):
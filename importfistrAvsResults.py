@@ -32,11 +32,23 @@ __url__ = "https://www.frontistr.com/"
 #  \ingroup FEM
 #  \brief FreeCAD FrontISTR AVS Reader for FEM workbench
 
+import collections
+import hashlib
+import itertools
+import json
+import mmap
 import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 
 import FreeCAD
 from FreeCAD import Console
 
+import fistrtiming
+
 
 # ********* generic FreeCAD import and export methods *********
 if open.__module__ == "__builtin__":
@@ -70,33 +82,70 @@ def insert(
 def importAvs(
     filename,
     analysis=None,
-    result_name_prefix=""
+    result_name_prefix="",
+    cache_dir=None,
+    lazy=False,
+    max_loaded=None
 ):
-    import ObjectsFem
-    from feminout import importToolsFem
-
-    TUNE=False
-    if TUNE:
-        import time
-        cur = time.time()
-
     if analysis:
         doc = analysis.Document
     else:
         doc = FreeCAD.ActiveDocument
 
-    m = read_avs_result(filename)
-    
+    fistrtiming.start("import results")
+    with fistrtiming.span("parse AVS"):
+        if lazy:
+            if not isinstance(filename, (list, tuple)):
+                filename = [filename]
+            topology, increments = index_avs_increments(filename, cache_dir)
+            m = _make_result_mesh(topology)
+            # empty result sets, filled on selection
+            m["Results"] = [
+                {
+                    "number": float("NaN"),
+                    "time": increment["Time"],
+                    "increment": increment["Increment"],
+                    "lazy": increment,
+                }
+                for increment in increments
+            ]
+            lazy_results = get_lazy_results(doc, max_loaded)
+            if increments:
+                lazy_results.node_ids[increments[0]["MeshFile"]] = topology["NodeIds"]
+        elif isinstance(filename, (list, tuple)) and cache_dir is not None:
+            m = read_avs_results_cached(filename, cache_dir)
+        elif isinstance(filename, (list, tuple)):
+            m = read_avs_results(filename, cache_dir)
+        else:
+            m = read_avs_result(filename, cache_dir)
+
+    res_obj = make_result_objects(m, doc, analysis, result_name_prefix)
+
+    fistrtiming.stop("import results")
+    if not isinstance(filename, (list, tuple)):
+        filename = [filename]
+    fistrtiming.save(os.path.dirname(os.path.abspath(filename[-1])))
+    return res_obj
+
+
+def make_result_objects(m, doc, analysis=None, result_name_prefix=""):
+    """Create the result mesh and one result object per result set of m.
+
+    m holds the result mesh and the result sets as returned by
+    read_avs_result, other result readers feed their data through here too.
+    Result sets with the key lazy are filled on selection, see LazyAvsResults.
+    Returns the last result object.
+    """
+    import ObjectsFem
+    from feminout import importToolsFem
+
     result_mesh_object = None
     res_obj = None
-
-    if TUNE:
-        new = time.time(); Console.PrintMessage("dtime 1:"+'%8.3f'%(new-cur)+"\n") ; cur = new
+    lazy_results = None
 
     if len(m["Nodes"]) > 0:
-        mesh = importToolsFem.make_femmesh(m)
-        if TUNE:
-            new = time.time(); Console.PrintMessage("dtime 2:"+'%8.3f'%(new-cur)+"\n") ; cur = new
+        with fistrtiming.span("make_femmesh"):
+            mesh = importToolsFem.make_femmesh(m)
 
         result_mesh_object = ObjectsFem.makeMeshResult(
             doc,
@@ -105,13 +154,13 @@ def importAvs(
         result_mesh_object.FemMesh = mesh
         res_mesh_is_compacted = False
         nodenumbers_for_compacted_mesh = []
+        # the result arrays are in the order of the result mesh nodes
+        node_numbers = list(m["Nodes"])
 
         number_of_increments = len(m["Results"])
         Console.PrintLog(
             "Increments: " + str(number_of_increments) + "\n"
         )
-        if TUNE:
-            new = time.time(); Console.PrintMessage("dtime 3:"+'%8.3f'%(new-cur)+"\n") ; cur = new
         if len(m["Results"]) > 0:
             
             for result_set in m["Results"]:
@@ -126,32 +175,31 @@ def importAvs(
                         "{}Mode{}_Results"
                         .format(result_name_prefix, eigenmode_number)
                     )
-                elif number_of_increments > 1:
+                elif number_of_increments > 1 and step_time >= 0:
                     results_name = (
                         "{}Time{}_Results"
                         .format(result_name_prefix, step_time)
                     )
+                elif number_of_increments > 1 and "increment" in result_set:
+                    # no time known, the increment number of the file name
+                    results_name = (
+                        "{}Increment{}_Results"
+                        .format(result_name_prefix, result_set["increment"])
+                    )
                 else:
                     results_name = (
                         "{}Results"
                         .format(result_name_prefix)
                     )
 
-                if TUNE:
-                    new = time.time(); Console.PrintMessage("dtime 4:"+'%8.3f'%(new-cur)+"\n") ; cur = new
                 res_obj = ObjectsFem.makeResultMechanical(doc, results_name)
                 res_obj.Mesh = result_mesh_object
 
-                if TUNE:
-                    new = time.time(); Console.PrintMessage("dtime 5:"+'%8.3f'%(new-cur)+"\n") ; cur = new
-
-                res_obj = importToolsFem.fill_femresult_mechanical(res_obj, result_set)
+                res_obj.NodeNumbers = node_numbers
                 if analysis:
                     # need to be here, becasause later on, the analysis objs are needed
                     # see fill of principal stresses
                     analysis.addObject(res_obj)
-                if TUNE:
-                    new = time.time(); Console.PrintMessage("dtime 6:"+'%8.3f'%(new-cur)+"\n") ; cur = new
 
                 # more result object calculations
                 from femresult import resulttools
@@ -159,48 +207,22 @@ def importAvs(
                 if not res_obj.MassFlowRate:
                     if res_mesh_is_compacted is False:
                         # first result set, compact FemMesh and NodeNumbers
-                        res_obj = resulttools.compact_result(res_obj)
+                        with fistrtiming.span("compact result"):
+                            res_obj = resulttools.compact_result(res_obj)
                         res_mesh_is_compacted = True
                         nodenumbers_for_compacted_mesh = res_obj.NodeNumbers
                     else:
                         # all other result sets, do not compact FemMesh, only set NodeNumbers
                         res_obj.NodeNumbers = nodenumbers_for_compacted_mesh
 
-                if TUNE:
-                    new = time.time(); Console.PrintMessage("dtime 7:"+'%8.3f'%(new-cur)+"\n") ; cur = new
-                # fill DisplacementLengths
-                res_obj = resulttools.add_disp_apps(res_obj)
-
-                if TUNE:
-                    new = time.time(); Console.PrintMessage("dtime 8:"+'%8.3f'%(new-cur)+"\n") ; cur = new
-
-                # fill vonMises
-                if "mises" in result_set:
-                    mstress = []
-                    for nid in res_obj.NodeNumbers:
-                        mstress.append(result_set["mises"][nid])
-                    res_obj.vonMises = mstress
-
-                if TUNE:
-                    new = time.time(); Console.PrintMessage("dtime 9:"+'%8.3f'%(new-cur)+"\n") ; cur = new
-
-                # fill principal stress
-                if "pstress" in result_set:
-                    prinstress1 = []; prinstress2 = []; prinstress3 = []
-                    for nid in res_obj.NodeNumbers:
-                        pstr = result_set["pstress"][nid]
-                        prinstress1.append(pstr[0])
-                        prinstress2.append(pstr[1])
-                        prinstress3.append(pstr[2])
-                    res_obj.PrincipalMax = prinstress1
-                    res_obj.PrincipalMed = prinstress2
-                    res_obj.PrincipalMin = prinstress3
-
-                # fill Stats
-                res_obj = resulttools.fill_femresult_stats(res_obj)
-
-                if TUNE:
-                    new = time.time(); Console.PrintMessage("dtime10:"+'%8.3f'%(new-cur)+"\n") ; cur = new
+                with fistrtiming.span("fill result", result=results_name):
+                    res_obj = fill_result_arrays(res_obj, result_set)
+                with fistrtiming.span("stats", result=results_name):
+                    res_obj = resulttools.fill_femresult_stats(res_obj)
+                if "lazy" in result_set:
+                    lazy_results = get_lazy_results(doc)
+                    lazy_results.add_result(res_obj, result_set["lazy"])
+
         else:
             error_message = (
                 "Nodes, but no results found in avs file. "
@@ -227,15 +249,16 @@ def importAvs(
             if analysis:
                 analysis.addObject(res_obj)
 
+        if lazy_results and res_obj:
+            # the last increment is shown, the others are filled on selection
+            lazy_results.load(res_obj)
+
         if FreeCAD.GuiUp:
             if analysis:
                 import FemGui
                 FemGui.setActiveAnalysis(analysis)
             doc.recompute()
 
-        if TUNE:
-            new = time.time(); Console.PrintMessage("dtime11:"+'%8.3f'%(new-cur)+"\n") ; cur = new
-
     else:
         Console.PrintError(
             "Problem on avs file import. No nodes found in avs file.\n"
@@ -243,485 +266,1174 @@ def importAvs(
         # None will be returned
         # or would it be better to raise an exception if there are not even nodes in avs file?
 
-    return res_obj 
-
-def make_hash_tri(surf):
-    tmp = [surf[0],surf[1],surf[2]]
-    tmp.sort()
-    return str(tmp[0])+"%"+str(tmp[1])+"%"+str(tmp[2])
-
-def make_hash_quad(surf):
-    tmp = [surf[0],surf[1],surf[2],surf[3]]
-    tmp.sort()
-    return str(tmp[0])+"%"+str(tmp[1])+"%"+str(tmp[2])+"%"+str(tmp[3])
-
-def extract_surface(nodes,
-                    elements_tetra10, elements_tetra4,
-                    elements_penta15, elements_penta6,
-                    elements_hexa20, elements_hexa8,
-                    elements_tria6, elements_tria3, elements_quad8, elements_quad4):
-    used_nid = []
-
-    # extract surface of tetra10 elements
-    table_tri6 = {}
-    for eid in elements_tetra10.keys():
-        ve = elements_tetra10[eid]
-        s = []
-        s.append((ve[0],ve[1],ve[2],ve[4],ve[5],ve[6]))
-        s.append((ve[0],ve[3],ve[1],ve[7],ve[8],ve[4]))
-        s.append((ve[1],ve[3],ve[2],ve[8],ve[9],ve[5]))
-        s.append((ve[2],ve[3],ve[0],ve[9],ve[7],ve[6]))
-        for i in range(4):
-            hash = make_hash_tri(s[i])
-            try:
-                table_tri6[hash].append(s[i])
-            except:
-                table_tri6[hash] = [s[i]]
-    count = 0
-    for k in table_tri6.keys():
-        if len(table_tri6[k]) == 1:
-            if len(table_tri6[k][0]) == 6:
-                count += 1
-                elements_tria6[count] = table_tri6[k][0]
-                for nid in elements_tria6[count]:
-                    used_nid.append(nid)
-    
-    # extract surface of tetra4 elements
-    table_tri3 = {}
-    for eid in elements_tetra4.keys():
-        ve = elements_tetra4[eid]
-        s = []
-        s.append((ve[0],ve[1],ve[2]))
-        s.append((ve[0],ve[3],ve[1]))
-        s.append((ve[1],ve[3],ve[2]))
-        s.append((ve[2],ve[3],ve[0]))
-        for i in range(4):
-            hash = make_hash_tri(s[i])
-            try:
-                table_tri3[hash].append(s[i])
-            except:
-                table_tri3[hash] = [s[i]]
-    for k in table_tri3.keys():
-        if len(table_tri3[k]) == 1:
-            count += 1
-            elements_tria3[count] = table_tri3[k][0]
-            for nid in elements_tria3[count]:
-                used_nid.append(nid)
-
-    # extract surface of penta15 elements
-    table_tri6 = {}
-    table_quad8 = {}
-    for eid in elements_penta15.keys():
-        ve = elements_penta15[eid]
-        s = []
-        s.append((ve[0],ve[1],ve[2],ve[6],ve[7],ve[8]))
-        s.append((ve[3],ve[5],ve[4],ve[11],ve[10],ve[9]))
-        s.append((ve[1],ve[0],ve[3],ve[4],ve[6],ve[12],ve[9],ve[13]))
-        s.append((ve[2],ve[1],ve[4],ve[5],ve[7],ve[13],ve[10],ve[14]))
-        s.append((ve[0],ve[2],ve[5],ve[3],ve[8],ve[14],ve[11],ve[12]))
-        for i in range(2):
-            hash = make_hash_tri(s[i])
-            try:
-                table_tri6[hash].append(s[i])
-            except:
-                table_tri6[hash] = [s[i]]
-        for i in range(2, 5):
-            hash = make_hash_quad(s[i])
-            try:
-                table_quad8[hash].append(s[i])
-            except:
-                table_quad8[hash] = [s[i]]
-    count = 0
-    for k in table_tri6.keys():
-        if len(table_tri6[k]) == 1:
-            count += 1
-            elements_tria6[count] = table_tri6[k][0]
-            for nid in elements_tria6[count]:
-                used_nid.append(nid)
-    for k in table_quad8.keys():
-        if len(table_quad8[k]) == 1:
-            count += 1
-            elements_quad8[count] = table_quad8[k][0]
-            for nid in elements_quad8[count]:
-                used_nid.append(nid)
-
-    # extract surface of penta6 elements
-    table_tri3 = {}
-    table_quad4 = {}
-    for eid in elements_penta6.keys():
-        ve = elements_penta6[eid]
-        s = []
-        s.append((ve[0],ve[1],ve[2]))
-        s.append((ve[3],ve[5],ve[4]))
-        s.append((ve[1],ve[0],ve[3],ve[4]))
-        s.append((ve[2],ve[1],ve[4],ve[5]))
-        s.append((ve[0],ve[2],ve[5],ve[3]))
-        for i in range(2):
-            hash = make_hash_tri(s[i])
-            try:
-                table_tri3[hash].append(s[i])
-            except:
-                table_tri3[hash] = [s[i]]
-        for i in range(2, 5):
-            hash = make_hash_quad(s[i])
-            try:
-                table_quad4[hash].append(s[i])
-            except:
-                table_quad4[hash] = [s[i]]
-    count = 0
-    for k in table_tri3.keys():
-        if len(table_tri3[k]) == 1:
-            count += 1
-            elements_tria3[count] = table_tri3[k][0]
-            for nid in elements_tria3[count]:
-                used_nid.append(nid)
-    for k in table_quad4.keys():
-        if len(table_quad4[k]) == 1:
-            count += 1
-            elements_quad4[count] = table_quad4[k][0]
-            for nid in elements_quad4[count]:
-                used_nid.append(nid)
-
-    # extract surface of hexa20 elements
-    table_quad8 = {}
-    for eid in elements_hexa20.keys():
-        ve = elements_hexa20[eid]
-        s = []
-        s.append((ve[0],ve[1],ve[2],ve[3],ve[8],ve[9],ve[10],ve[11]))
-        s.append((ve[1],ve[0],ve[4],ve[5],ve[8],ve[16],ve[12],ve[17]))
-        s.append((ve[2],ve[1],ve[5],ve[6],ve[9],ve[17],ve[13],ve[18]))
-        s.append((ve[3],ve[2],ve[6],ve[7],ve[10],ve[18],ve[14],ve[19]))
-        s.append((ve[0],ve[3],ve[7],ve[4],ve[11],ve[19],ve[15],ve[16]))
-        s.append((ve[5],ve[4],ve[7],ve[6],ve[12],ve[15],ve[14],ve[13]))
-        for i in range(6):
-            hash = make_hash_quad(s[i])
-            try:
-                table_quad8[hash].append(s[i])
-            except:
-                table_quad8[hash] = [s[i]]
-    for k in table_quad8.keys():
-        if len(table_quad8[k]) == 1:
-            count += 1
-            elements_quad8[count] = table_quad8[k][0]
-            for nid in elements_quad8[count]:
-                used_nid.append(nid)
-
-    # extract surface of hexa8 elements
-    table_quad4 = {}
-    for eid in elements_hexa8.keys():
-        ve = elements_hexa8[eid]
-        s = []
-        s.append((ve[0],ve[1],ve[2],ve[3]))
-        s.append((ve[1],ve[0],ve[4],ve[5]))
-        s.append((ve[2],ve[1],ve[5],ve[6]))
-        s.append((ve[3],ve[2],ve[6],ve[7]))
-        s.append((ve[0],ve[3],ve[7],ve[4]))
-        s.append((ve[5],ve[4],ve[7],ve[6]))
-        for i in range(6):
-            hash = make_hash_quad(s[i])
-            try:
-                table_quad4[hash].append(s[i])
-            except:
-                table_quad4[hash] = [s[i]]
-    for k in table_quad4.keys():
-        if len(table_quad4[k]) == 1:
-            count += 1
-            elements_quad4[count] = table_quad4[k][0]
-            for nid in elements_quad4[count]:
-                used_nid.append(nid)
-
-    used_nid = list(set(used_nid))
-    newnodes = {}
-    for nid in used_nid:
-        newnodes[nid] = nodes[nid]
-    nodes = newnodes
-
-def renumber_nid(nodes):
-    Renumbered_nid = {}
-    count = 0
-    nodes_old = nodes.copy()
-    nodes = {}
-    for nid in list(nodes_old.keys()):
-        count += 1
-        Renumbered_nid[nid] = count
-        nodes[count] = nodes_old[nid]
+    return res_obj
+
+
+
+def fill_result_arrays(res_obj, result_set):
+    """Fill a result object from the nodal result arrays of result_set.
+
+    The rows of the arrays belong to the result mesh nodes in their order
+    before compaction, i.e. row i to the i-th entry of the NodeNumbers,
+    which have to be set already.
+    """
+    eigenmode_number = result_set.get("number", 0)
+    step_time = result_set.get("time", float("NaN"))
+    if eigenmode_number > 0:
+        res_obj.Eigenmode = int(eigenmode_number)
+    elif step_time >= 0:
+        res_obj.Time = step_time
+
+    if "disp" in result_set:
+        disp = result_set["disp"]
+        res_obj.DisplacementVectors = list(zip(*disp.T.tolist()))
+        # fill DisplacementLengths
+        res_obj.DisplacementLengths = np.sqrt((disp * disp).sum(axis=1)).tolist()
+
+    if "stress" in result_set:
+        stress = result_set["stress"]
+        res_obj.NodeStressXX = stress[:, 0].tolist()
+        res_obj.NodeStressYY = stress[:, 1].tolist()
+        res_obj.NodeStressZZ = stress[:, 2].tolist()
+        res_obj.NodeStressXY = stress[:, 3].tolist()
+        res_obj.NodeStressXZ = stress[:, 4].tolist()
+        res_obj.NodeStressYZ = stress[:, 5].tolist()
+
+    # fill vonMises
+    if "mises" in result_set:
+        res_obj.vonMises = result_set["mises"].tolist()
+
+    # fill principal stress
+    if "pstress" in result_set:
+        pstress = result_set["pstress"]
+        res_obj.PrincipalMax = pstress[:, 0].tolist()
+        res_obj.PrincipalMed = pstress[:, 1].tolist()
+        res_obj.PrincipalMin = pstress[:, 2].tolist()
+    return res_obj
+
+
+# number of increments kept filled by default in lazy result mode
+AVS_LAZY_MAX_LOADED = 4
+
+# result object properties emptied when an increment is unloaded
+LAZY_RESULT_PROPERTIES = (
+    "DisplacementVectors",
+    "DisplacementLengths",
+    "NodeStressXX",
+    "NodeStressYY",
+    "NodeStressZZ",
+    "NodeStressXY",
+    "NodeStressXZ",
+    "NodeStressYZ",
+    "vonMises",
+    "PrincipalMax",
+    "PrincipalMed",
+    "PrincipalMin",
+    "MaxShear",
+)
+
+# result object property holding the increment of a lazy result object
+LAZY_RESULT_PROPERTY = "LazyResult"
+
+# LazyAvsResults per document name
+lazy_results_by_document = {}
+
+
+def _index_increment(avs_input, n_nodes, n_elems, mesh_file):
+    # the offsets come from the AvsIndex, the nodal data is not parsed
+    avs_index = AvsIndex(avs_input)
+    avs_index.close()
+    index = avs_index.index
+    if (index["NumberOfNodes"], index["NumberOfElements"]) != (n_nodes, n_elems):
+        return None
+    return {
+        "File": os.path.abspath(avs_input),
+        "Offset": index["NodalHeader"],
+        "NumberOfNodes": n_nodes,
+        "MeshFile": mesh_file,
+        "Increment": get_increment_number(avs_input),
+        "Time": get_increment_time(avs_input),
+    }
+
+
+def index_avs_increments(avs_inputs, cache_dir=None, max_workers=None):
+    """Read the mesh of the first file and index the increments of an analysis.
 
-    return nodes, Renumbered_nid
+    Returns the result mesh topology and per increment the file, the
+    offset of its nodal data block, the number of nodes, the file the
+    mesh was read from, the increment number and the time.
+    """
+    avs_inputs = sorted(avs_inputs, key=get_increment_number)
+    Console.PrintMessage(
+        "Index fistr results of {} complete avs files: {} ... {}\n"
+        .format(len(avs_inputs), avs_inputs[0], avs_inputs[-1])
+    )
+    avs_file = pyopen(avs_inputs[0], "rb")
+    sizes = _read_avs_sizes(avs_file)
+    avs_file.seek(0)
+    topology = read_avs_topology(avs_file, cache_dir)
+    avs_file.close()
 
-def renumber_eid(Renumbered_nid, elements_tria6, elements_tria3, elements_quad8, elements_quad4):
-    Renumbered_eid = {}
+    mesh_file = os.path.abspath(avs_inputs[0])
+    with ThreadPoolExecutor(max_workers) as pool:
+        index = list(pool.map(
+            lambda avs_input: _index_increment(avs_input, *sizes, mesh_file),
+            avs_inputs
+        ))
+    increments = []
+    for avs_input, increment in zip(avs_inputs, index):
+        if increment is None:
+            Console.PrintWarning(
+                "Skipping {}, its mesh differs from the one of {}.\n"
+                .format(avs_input, avs_inputs[0])
+            )
+            continue
+        increments.append(increment)
+    return topology, increments
+
+
+class LazyAvsResults(object):
+    """Result objects of a document filled on demand.
+
+    Every lazy result object keeps its increment, i.e. the file, the offset
+    of the nodal data block and the time, in its LazyResult property, so
+    the state is saved with the document and restored when it is reopened.
+    The nodal data of an increment is read when its result object is
+    loaded, which happens on selection in the GUI. At most max_loaded
+    result objects are kept filled, the least recently used one is
+    emptied first.
+    """
+
+    def __init__(self, document, max_loaded=None):
+        self.document = document
+        self.max_loaded = max_loaded or AVS_LAZY_MAX_LOADED
+        # result object name -> increment
+        self.objects = {}
+        # names of the filled result objects, least recently used first
+        self.loaded = collections.OrderedDict()
+        # node ids of the node block per mesh file
+        self.node_ids = {}
+
+    def restore(self):
+        """Collect the lazy result objects of the document, e.g. after it was reopened."""
+        for obj in self.document.Objects:
+            increment = getattr(obj, LAZY_RESULT_PROPERTY, "")
+            if not increment:
+                continue
+            self.objects[obj.Name] = json.loads(increment)
+            if getattr(obj, "DisplacementLengths", None) or getattr(obj, "vonMises", None):
+                self.loaded[obj.Name] = True
+
+    def add_result(self, res_obj, increment):
+        """Assign an increment to an (empty) result object."""
+        if not hasattr(res_obj, LAZY_RESULT_PROPERTY):
+            res_obj.addProperty(
+                "App::PropertyString",
+                LAZY_RESULT_PROPERTY,
+                "Lazy",
+                "Increment filled on selection, saved with the document"
+            )
+            res_obj.setEditorMode(LAZY_RESULT_PROPERTY, 2)
+        setattr(res_obj, LAZY_RESULT_PROPERTY, json.dumps(increment))
+        self.objects[res_obj.Name] = increment
+
+    def get_node_ids(self, increment):
+        mesh_file = increment["MeshFile"]
+        if mesh_file not in self.node_ids:
+            avs_index = AvsIndex(mesh_file)
+            self.node_ids[mesh_file] = avs_index.read_nodes()[0]
+            avs_index.close()
+        return self.node_ids[mesh_file]
+
+    def load(self, res_obj):
+        """Fill a result object with the nodal data of its increment."""
+        if res_obj.Name in self.loaded:
+            self.loaded.move_to_end(res_obj.Name)
+            return res_obj
+        from femresult import resulttools
+
+        increment = self.objects[res_obj.Name]
+        if not os.path.isfile(increment["File"]) or not os.path.isfile(increment["MeshFile"]):
+            Console.PrintError(
+                "Result file {} of {} not found.\n".format(increment["File"], res_obj.Label)
+            )
+            return res_obj
+        avs_file = pyopen(increment["File"], "rb")
+        avs_file.seek(increment["Offset"])
+        avs_data = _read_nodal_block(avs_file, increment["NumberOfNodes"])
+        avs_file.close()
+        avs_data["NodeIds"] = self.get_node_ids(increment)
+        result_set = _make_mode_results(avs_data)
+        result_set["time"] = increment["Time"]
+
+        with fistrtiming.span("fill result", result=res_obj.Name):
+            res_obj = fill_result_arrays(res_obj, result_set)
+        with fistrtiming.span("stats", result=res_obj.Name):
+            res_obj = resulttools.fill_femresult_stats(res_obj)
+        self.loaded[res_obj.Name] = True
+        while len(self.loaded) > self.max_loaded:
+            name = self.loaded.popitem(last=False)[0]
+            obj = self.document.getObject(name)
+            if obj:
+                self.unload(obj)
+        return res_obj
+
+    def unload(self, res_obj):
+        """Empty the nodal result values of a result object."""
+        for prop in LAZY_RESULT_PROPERTIES:
+            if hasattr(res_obj, prop):
+                setattr(res_obj, prop, [])
+        self.loaded.pop(res_obj.Name, None)
+
+
+class _LazyResultsObserver(object):
+    # one observer for the lazy results of all documents: restores them
+    # when a document is reopened, drops them when it is closed and, while
+    # there are lazy results, loads the selected result objects
+
+    def slotFinishRestoreDocument(self, doc):
+        refresh_lazy_results(doc)
+
+    def slotDeletedDocument(self, doc):
+        remove_lazy_results(doc.Name)
+
+    def addSelection(self, doc, obj, sub, pnt):
+        lazy_results = lazy_results_by_document.get(doc)
+        if lazy_results is None or obj not in lazy_results.objects:
+            return
+        res_obj = lazy_results.document.getObject(obj)
+        if res_obj:
+            lazy_results.load(res_obj)
+
+
+_lazy_results_observer = _LazyResultsObserver()
+_observing_documents = False
+
+
+def add_lazy_results_observer():
+    """Observe the documents for lazy results, restores those of the open ones."""
+    global _observing_documents
+    if _observing_documents:
+        return
+    FreeCAD.addDocumentObserver(_lazy_results_observer)
+    _observing_documents = True
+    for doc in FreeCAD.listDocuments().values():
+        refresh_lazy_results(doc)
+
+
+def get_lazy_results(doc, max_loaded=None):
+    """Return the lazy results of a document, created if there are none."""
+    add_lazy_results_observer()
+    lazy_results = lazy_results_by_document.get(doc.Name)
+    if lazy_results is None:
+        lazy_results = LazyAvsResults(doc, max_loaded)
+        if not lazy_results_by_document and FreeCAD.GuiUp:
+            import FreeCADGui
+            FreeCADGui.Selection.addObserver(_lazy_results_observer)
+        lazy_results_by_document[doc.Name] = lazy_results
+    elif max_loaded:
+        lazy_results.max_loaded = max_loaded
+    return lazy_results
+
+
+def remove_lazy_results(doc_name):
+    """Forget the lazy results of a document.
+
+    The selection observer is removed with the lazy results of the last document.
+    """
+    if lazy_results_by_document.pop(doc_name, None) is None:
+        return
+    if not lazy_results_by_document and FreeCAD.GuiUp:
+        import FreeCADGui
+        FreeCADGui.Selection.removeObserver(_lazy_results_observer)
+
+
+def refresh_lazy_results(doc):
+    """Collect the lazy result objects of a document again, e.g. after
+    it was reopened or its results were purged."""
+    remove_lazy_results(doc.Name)
+    if any(getattr(obj, LAZY_RESULT_PROPERTY, "") for obj in doc.Objects):
+        get_lazy_results(doc).restore()
+
+
+# faces of the volume elements in FreeCAD node order, corner nodes first
+VOLUME_FACES = {
+    "Tetra4Elem": (
+        ("Tria3Elem", ((0, 1, 2), (0, 3, 1), (1, 3, 2), (2, 3, 0))),
+    ),
+    "Tetra10Elem": (
+        ("Tria6Elem", ((0, 1, 2, 4, 5, 6), (0, 3, 1, 7, 8, 4),
+                       (1, 3, 2, 8, 9, 5), (2, 3, 0, 9, 7, 6))),
+    ),
+    "Penta6Elem": (
+        ("Tria3Elem", ((0, 1, 2), (3, 5, 4))),
+        ("Quad4Elem", ((1, 0, 3, 4), (2, 1, 4, 5), (0, 2, 5, 3))),
+    ),
+    "Penta15Elem": (
+        ("Tria6Elem", ((0, 1, 2, 6, 7, 8), (3, 5, 4, 11, 10, 9))),
+        ("Quad8Elem", ((1, 0, 3, 4, 6, 12, 9, 13), (2, 1, 4, 5, 7, 13, 10, 14),
+                       (0, 2, 5, 3, 8, 14, 11, 12))),
+    ),
+    "Hexa8Elem": (
+        ("Quad4Elem", ((0, 1, 2, 3), (1, 0, 4, 5), (2, 1, 5, 6),
+                       (3, 2, 6, 7), (0, 3, 7, 4), (5, 4, 7, 6))),
+    ),
+    "Hexa20Elem": (
+        ("Quad8Elem", ((0, 1, 2, 3, 8, 9, 10, 11), (1, 0, 4, 5, 8, 16, 12, 17),
+                       (2, 1, 5, 6, 9, 17, 13, 18), (3, 2, 6, 7, 10, 18, 14, 19),
+                       (0, 3, 7, 4, 11, 19, 15, 16), (5, 4, 7, 6, 12, 15, 14, 13))),
+    ),
+}
+
+# surface element types in the order their ids are assigned
+SURFACE_TYPES = ("Tria6Elem", "Tria3Elem", "Quad8Elem", "Quad4Elem")
+
+
+def face_corners(face_key):
+    return 3 if face_key.startswith("Tria") else 4
+
+
+def boundary_faces(keys):
+    """Return the indices of the rows of keys which occur only once.
+
+    keys holds the sorted corner node ids of one face per row,
+    the indices are returned in ascending order.
+    """
+    if len(keys) == 0:
+        return np.empty(0, dtype=np.int64)
+    order = np.lexsort(keys.T[::-1])
+    keys = keys[order]
+    same = np.all(keys[1:] == keys[:-1], axis=1)
+    single = np.ones(len(keys), dtype=bool)
+    single[1:] &= ~same
+    single[:-1] &= ~same
+    return np.sort(order[single])
+
+
+def extract_surface(volumes):
+    """Extract the boundary faces of volume elements.
+
+    volumes maps FreeCAD volume keys (Tetra4Elem, ...) to (ids, connectivity)
+    arrays. The faces of all element types go into one face index keyed on
+    their sorted corner nodes, thus faces shared between different element
+    types (e.g. tet and prism regions) are found as interior faces.
+    The boundary faces are returned as connectivity arrays per FreeCAD face
+    key (Tria3Elem, Tria6Elem, Quad4Elem, Quad8Elem).
+    """
+    faces = []
+    keys = []
+    for key, (eids, conn) in volumes.items():
+        for face_key, local in VOLUME_FACES[key]:
+            face_conn = conn[:, local].reshape(-1, len(local[0]))
+            n_corners = face_corners(face_key)
+            # triangles keep -1 as fourth corner and never match a quad
+            face_keys = np.full((len(face_conn), 4), -1, dtype=np.int64)
+            face_keys[:, :n_corners] = np.sort(face_conn[:, :n_corners], axis=1)
+            faces.append((face_key, face_conn))
+            keys.append(face_keys)
+    if not keys:
+        return {}
+
+    boundary = boundary_faces(np.concatenate(keys))
+
+    surface = {}
+    start = 0
+    for face_key, face_conn in faces:
+        end = start + len(face_conn)
+        lo, hi = np.searchsorted(boundary, (start, end))
+        surface.setdefault(face_key, []).append(face_conn[boundary[lo:hi] - start])
+        start = end
+    return {
+        face_key: np.concatenate(surface[face_key])
+        for face_key in SURFACE_TYPES if face_key in surface
+    }
+
+
+def renumber_nid(node_ids):
+    """Return a lookup table from avs node ids to consecutive ids starting at 1."""
+    lookup = np.zeros(node_ids.max() + 1 if len(node_ids) else 1, dtype=np.int64)
+    lookup[node_ids] = np.arange(1, len(node_ids) + 1)
+    return lookup
+
+
+def renumber_eid(nid_lookup, surface):
+    """Renumber the surface element nodes and number the surface elements
+    consecutively in the order of SURFACE_TYPES.
+
+    Returns the renumbered connectivity and the element ids per face key.
+    """
+    surface_new = {}
+    eids = {}
     count = 0
-    
-    elements_tria6_new = {}
-    for eid in list(elements_tria6.keys()):
-        count += 1
-        Renumbered_eid[eid] = count
-        nodelist = []
-        for nid in elements_tria6[eid]:
-            nodelist.append(Renumbered_nid[nid])
-        elements_tria6_new[count] = nodelist
-
-    elements_tria3_new = {}
-    for eid in list(elements_tria3.keys()):
-        count += 1
-        Renumbered_eid[eid] = count
-        nodelist = []
-        for nid in elements_tria3[eid]:
-            nodelist.append(Renumbered_nid[nid])
-        elements_tria3_new[count] = nodelist
-
-    elements_quad8_new = {}
-    for eid in list(elements_quad8.keys()):
-        count += 1
-        Renumbered_eid[eid] = count
-        nodelist = []
-        for nid in elements_quad8[eid]:
-            nodelist.append(Renumbered_nid[nid])
-        elements_quad8_new[count] = nodelist
-
-    elements_quad4_new = {}
-    for eid in list(elements_quad4.keys()):
-        count += 1
-        Renumbered_eid[eid] = count
-        nodelist = []
-        for nid in elements_quad4[eid]:
-            nodelist.append(Renumbered_nid[nid])
-        elements_quad4_new[count] = nodelist
-    
-    return elements_tria6_new, elements_tria3_new, elements_quad8_new, elements_quad4_new, Renumbered_eid
+    for face_key in SURFACE_TYPES:
+        if face_key not in surface:
+            continue
+        conn = surface[face_key]
+        surface_new[face_key] = nid_lookup[conn]
+        eids[face_key] = np.arange(count + 1, count + len(conn) + 1)
+        count += len(conn)
+    return surface_new, eids
+
+
+# FrontISTR AVS cell type -> (number of nodes, FreeCAD mesh key,
+# permutation from the FrontISTR to the FreeCAD node order)
+AVS_ELEMENT_TYPES = {
+    "tet": (4, "Tetra4Elem", (1, 0, 3, 2)),
+    "tet2": (10, "Tetra10Elem", (1, 0, 3, 2, 4, 6, 9, 7, 5, 8)),
+    "prism": (6, "Penta6Elem", (4, 3, 5, 1, 0, 2)),
+    "prism2": (15, "Penta15Elem", (4, 3, 5, 1, 0, 2, 9, 11, 10, 6, 8, 7, 13, 12, 14)),
+    "hex": (8, "Hexa8Elem", (5, 4, 7, 6, 1, 0, 3, 2)),
+    "hex2": (20, "Hexa20Elem", (5, 4, 7, 6, 1, 0, 3, 2,
+                                12, 15, 14, 13, 8, 11, 10, 9,
+                                17, 16, 19, 18)),
+}
+
+# number of lines parsed at once, bounds the text held in memory
+AVS_CHUNK_LINES = 262144
+# number of bytes read at once when lines are only skipped
+AVS_CHUNK_BYTES = 1 << 24
+
+# result mesh topology cache, kept in a sub directory of the working directory
+AVS_CACHE_DIR = "fistr_cache"
+# to be increased whenever the content of the cache files changes
+AVS_CACHE_VERSION = 1
+
+
+def _read_lines(avs_file, n_lines):
+    return b"".join(itertools.islice(avs_file, n_lines))
+
+
+def _skip_lines(avs_file, n_lines, digest=None):
+    """Advance avs_file by n_lines lines and feed the skipped bytes to digest."""
+    while n_lines > 0:
+        pos = avs_file.tell()
+        chunk = avs_file.read(AVS_CHUNK_BYTES)
+        if not chunk:
+            break
+        count = chunk.count(b"\n")
+        if count >= n_lines:
+            newlines = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == ord("\n"))
+            end = int(newlines[n_lines - 1]) + 1
+            chunk = chunk[:end]
+            avs_file.seek(pos + end)
+        n_lines -= count
+        if digest is not None:
+            digest.update(chunk)
+
+
+def _read_float_block(avs_file, n_lines, n_columns):
+    block = np.empty((n_lines, n_columns), dtype=np.float64)
+    for start in range(0, n_lines, AVS_CHUNK_LINES):
+        n = min(AVS_CHUNK_LINES, n_lines - start)
+        values = np.fromstring(_read_lines(avs_file, n), dtype=np.float64, sep=" ")
+        block[start:start + n] = values.reshape(n, n_columns)
+    return block
+
+
+def _parse_element_chunk(text, n_lines, elements):
+    for etype, (n_nodes, key, order) in AVS_ELEMENT_TYPES.items():
+        token = " {} ".format(etype).encode()
+        count = text.count(token)
+        if count == 0:
+            continue
+        if count == n_lines:
+            block = text.replace(token, b" ")
+        else:
+            # mixed element types, pick the lines of this type only
+            lines = re.findall(b"^.*" + token + b".*$", text, re.M)
+            block = b"\n".join(lines).replace(token, b" ")
+        values = np.fromstring(block, dtype=np.int64, sep=" ").reshape(-1, n_nodes + 2)
+        # columns: element id, material id, nodes
+        elements.setdefault(key, []).append(
+            (values[:, 0], values[:, 2:][:, order])
+        )
+
+
+def _read_avs_sizes(avs_file, digest=None):
+    # skip the header lines up to "number of nodes, number of elements"
+    line = avs_file.readline()
+    while line:
+        words = line.split()
+        if len(words) == 2 and words[0].isdigit() and words[1].isdigit():
+            break
+        line = avs_file.readline()
+    if digest is not None:
+        digest.update(line)
+    return tuple(map(int, line.split()))
+
+
+def _read_topology_blocks(avs_file, n_nodes, n_elems):
+    # nodes
+    node_block = _read_float_block(avs_file, n_nodes, 4)
+    node_ids = node_block[:, 0].astype(np.int64)
+    coords = np.ascontiguousarray(node_block[:, 1:])
+    del node_block
+
+    # elements
+    chunks = {}
+    for start in range(0, n_elems, AVS_CHUNK_LINES):
+        n = min(AVS_CHUNK_LINES, n_elems - start)
+        _parse_element_chunk(_read_lines(avs_file, n), n, chunks)
+    elements = {}
+    for key, parts in chunks.items():
+        elements[key] = (
+            np.concatenate([p[0] for p in parts]),
+            np.concatenate([p[1] for p in parts])
+        )
+    return node_ids, coords, elements
+
+
+def _read_nodal_block(avs_file, n_nodes):
+    labels = []
+    offsets = [0]
+    nodal_ids = np.empty(0, dtype=np.int64)
+    nodal_data = np.empty((0, 0), dtype=np.float64)
+    line = avs_file.readline()
+    n_noderes = int(line.split()[0]) if line.strip() else 0
+    if n_noderes > 0:
+        dofs = list(map(int, avs_file.readline().split()))
+        for n_comp in dofs[1:dofs[0] + 1]:
+            offsets.append(offsets[-1] + n_comp)
+            labels.append(avs_file.readline().decode().split(",")[0].replace(" ", ""))
+        data_block = _read_float_block(avs_file, n_nodes, n_noderes + 1)
+        nodal_ids = data_block[:, 0].astype(np.int64)
+        nodal_data = np.ascontiguousarray(data_block[:, 1:])
+        del data_block
+    return {
+        "NodalLabels": labels,
+        "NodalOffsets": offsets,
+        "NodalIds": nodal_ids,
+        "NodalData": nodal_data
+    }
+
+
+def read_avs_arrays(
+    avs_input
+):
+    """Read a COMPLETE_AVS file into NumPy arrays.
+
+    The node, element and nodal data blocks are parsed in chunks of
+    AVS_CHUNK_LINES lines, no FreeCAD objects are created.
+    Element connectivity is returned in FreeCAD node order
+    and still refers to the node ids of the avs file.
+    """
+    avs_file = pyopen(avs_input, "rb")
+    n_nodes, n_elems = _read_avs_sizes(avs_file)
+    node_ids, coords, elements = _read_topology_blocks(avs_file, n_nodes, n_elems)
+    avs_data = _read_nodal_block(avs_file, n_nodes)
+    avs_file.close()
+
+    avs_data["NodeIds"] = node_ids
+    avs_data["Coordinates"] = coords
+    avs_data["Elements"] = elements
+    return avs_data
+
+
+def get_nodal_field(avs_data, label):
+    """Return the columns of one nodal field, rows in node block order."""
+    i = avs_data["NodalLabels"].index(label)
+    offsets = avs_data["NodalOffsets"]
+    field = avs_data["NodalData"][:, offsets[i]:offsets[i + 1]]
+    node_ids = avs_data["NodeIds"]
+    nodal_ids = avs_data["NodalIds"]
+    if not np.array_equal(node_ids, nodal_ids):
+        sorter = np.argsort(nodal_ids)
+        field = field[sorter[np.searchsorted(nodal_ids, node_ids, sorter=sorter)]]
+    return field
+
+
+def make_result_topology(node_ids, coords, elements):
+    """Extract the surface and renumber nodes and surface elements.
+
+    Returns the result mesh topology, i.e. the avs node ids (the new node id
+    is the position in this array plus one), the coordinates and the
+    renumbered surface connectivity and element ids per face key.
+    """
+    with fistrtiming.span("extract surface"):
+        surface = extract_surface(elements)
+    nid_lookup = renumber_nid(node_ids)
+    surface, surface_eids = renumber_eid(nid_lookup, surface)
+    return {
+        "NodeIds": node_ids,
+        "Coordinates": coords,
+        "Surface": surface,
+        "SurfaceIds": surface_eids
+    }
+
+
+def get_topology_cache_file(cache_dir, digest):
+    return os.path.join(
+        cache_dir, AVS_CACHE_DIR, "avs_topology_{}.npz".format(digest)
+    )
+
+
+def load_topology_cache(cache_file):
+    if not os.path.isfile(cache_file):
+        return None
+    try:
+        with np.load(cache_file) as npz:
+            topology = {
+                "NodeIds": npz["NodeIds"],
+                "Coordinates": npz["Coordinates"],
+                "Surface": {},
+                "SurfaceIds": {}
+            }
+            for face_key in SURFACE_TYPES:
+                if face_key in npz:
+                    topology["Surface"][face_key] = npz[face_key]
+                    topology["SurfaceIds"][face_key] = npz[face_key + "Ids"]
+    except Exception as e:
+        Console.PrintWarning(
+            "Ignoring broken result topology cache {}: {}\n".format(cache_file, e)
+        )
+        return None
+    return topology
+
+
+def save_topology_cache(cache_file, topology):
+    cache_path = os.path.dirname(cache_file)
+    if not os.path.isdir(cache_path):
+        os.makedirs(cache_path)
+    # keep the topology of the latest mesh only
+    for name in os.listdir(cache_path):
+        if name.startswith("avs_topology_") and name.endswith(".npz"):
+            os.remove(os.path.join(cache_path, name))
+    arrays = {
+        "NodeIds": topology["NodeIds"],
+        "Coordinates": topology["Coordinates"]
+    }
+    for face_key, conn in topology["Surface"].items():
+        arrays[face_key] = conn
+        arrays[face_key + "Ids"] = topology["SurfaceIds"][face_key]
+    tmp_file = cache_file + ".tmp"
+    with pyopen(tmp_file, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_file, cache_file)
+
+
+def read_avs_topology(avs_file, cache_dir=None):
+    """Read the node and element blocks of an opened avs file and return
+    the result mesh topology, see make_result_topology.
+
+    With cache_dir given, the topology is looked up in the cache by a hash of
+    the node and element blocks. On a hit the blocks are only skipped,
+    otherwise they are parsed and the topology is added to the cache.
+    The file is left positioned at the nodal data block.
+    """
+    if cache_dir is None:
+        n_nodes, n_elems = _read_avs_sizes(avs_file)
+        return make_result_topology(*_read_topology_blocks(avs_file, n_nodes, n_elems))
+
+    digest = hashlib.sha1(str(AVS_CACHE_VERSION).encode())
+    n_nodes, n_elems = _read_avs_sizes(avs_file, digest)
+    start = avs_file.tell()
+    _skip_lines(avs_file, n_nodes + n_elems, digest)
+    cache_file = get_topology_cache_file(cache_dir, digest.hexdigest())
+    topology = load_topology_cache(cache_file)
+    if topology is not None and len(topology["NodeIds"]) == n_nodes:
+        Console.PrintLog("Result mesh topology read from {}\n".format(cache_file))
+        return topology
+
+    end = avs_file.tell()
+    avs_file.seek(start)
+    topology = make_result_topology(*_read_topology_blocks(avs_file, n_nodes, n_elems))
+    avs_file.seek(end)
+    try:
+        save_topology_cache(cache_file, topology)
+    except OSError as e:
+        Console.PrintWarning(
+            "Result mesh topology could not be cached: {}\n".format(e)
+        )
+    return topology
+
+
+def get_increment_number(avs_input):
+    """Return the increment number of a xxx_vis_psf.<number>.inp file name."""
+    match = re.search(r"_vis_psf\.(\d+)", os.path.basename(avs_input))
+    return int(match.group(1)) if match else 0
+
+
+def get_increment_time(vis_input):
+    """Return the time of the increment of a xxx_vis_psf.<number>.inp file.
+
+    The visualizer output has no time, it is the TOTALTIME of the result
+    file xxx.res.0.<number> of the same step. NaN if there is none.
+    """
+    match = re.match(r"(.*)_vis_psf\.(\d+)\.[^./\\]+$", vis_input)
+    if match:
+        res_file = "{}.res.0.{}".format(match.group(1), int(match.group(2)))
+        if os.path.isfile(res_file):
+            import importfistrResResults
+            total_time = importfistrResResults.read_res_global(res_file).get("TOTALTIME")
+            if total_time is not None:
+                return float(total_time[0])
+    return float("NaN")
+
+
+def _make_result_mesh(topology):
+    # FreeCAD objects are only created from here on
+    new_nids = list(range(1, len(topology["NodeIds"]) + 1))
+    nodes = dict(zip(
+        new_nids,
+        [FreeCAD.Vector(*xyz) for xyz in topology["Coordinates"].tolist()]
+    ))
+    faces = {}
+    for face_key in SURFACE_TYPES:
+        faces[face_key] = {}
+        if face_key in topology["Surface"]:
+            faces[face_key] = dict(zip(
+                topology["SurfaceIds"][face_key].tolist(),
+                map(tuple, topology["Surface"][face_key].tolist())
+            ))
+    mesh = {
+        "Nodes": nodes,
+        "Seg2Elem": {},
+        "Seg3Elem": {},
+        "Tria3Elem": faces["Tria3Elem"],
+        "Tria6Elem": faces["Tria6Elem"],
+        "Quad4Elem": faces["Quad4Elem"],
+        "Quad8Elem": faces["Quad8Elem"],
+        "Tetra4Elem": {},
+        "Tetra10Elem": {},
+        "Hexa8Elem": {},
+        "Hexa20Elem": {},
+        "Penta6Elem": {},
+        "Penta15Elem": {},
+    }
+    return mesh
+
+
+def _make_mode_results(avs_data):
+    # nodal result arrays, rows in node block order
+    mode_results = {}
+    mode_results["number"] = float("NaN")
+    mode_results["time"] = float("NaN")
+
+    labels = avs_data["NodalLabels"]
+    # displacement
+    if 'DISPLACEMENT' in labels:
+        mode_results["disp"] = get_nodal_field(avs_data, 'DISPLACEMENT')[:, :3]
+
+    # NodalSTRESS
+    if 'NodalSTRESS' in labels:
+        mode_results["stress"] = get_nodal_field(avs_data, 'NodalSTRESS')[:, (0, 1, 2, 3, 5, 4)]
+
+    # NodalMises
+    if 'NodalMISES' in labels:
+        mode_results["mises"] = get_nodal_field(avs_data, 'NodalMISES')[:, 0]
+
+    # NodalPrincipalSTRESS
+    if 'NodalPrincipalSTRESS' in labels:
+        mode_results["pstress"] = get_nodal_field(avs_data, 'NodalPrincipalSTRESS')[:, :3]
+
+    return mode_results
+
+
+def _read_increment_nodal_data(avs_input, n_nodes, n_elems):
+    # nodal data of one increment, the mesh blocks are only skipped
+    avs_file = pyopen(avs_input, "rb")
+    try:
+        if _read_avs_sizes(avs_file) != (n_nodes, n_elems):
+            return None
+        _skip_lines(avs_file, n_nodes + n_elems)
+        return _read_nodal_block(avs_file, n_nodes)
+    finally:
+        avs_file.close()
+
 
 # read a FrontISTR result file and extract the nodes
 # displacement vectors and stress values.
 def read_avs_result(
-    avs_input
+    avs_input,
+    cache_dir=None
 ):
     Console.PrintMessage(
         "Read fistr results from complete avs file: {}\n"
         .format(avs_input)
     )
 
-    if os.path.exists(avs_input):
-        avs_file = pyopen(avs_input, "r")
-    else:
+    if not os.path.exists(avs_input):
         Console.PrintMessage(avs_input+" not found.")
 
-    nodes = {}
-    elements_hexa8 = {}
-    elements_penta6 = {}
-    elements_tetra4 = {}
-    elements_tetra10 = {}
-    elements_penta15 = {}
-    elements_hexa20 = {}
-    elements_tria3 = {}
-    elements_tria6 = {}
-    elements_quad4 = {}
-    elements_quad8 = {}
-    elements_seg2 = {}
-    elements_seg3 = {}
-    results = []
-    mode_results = {}
-    mode_results["number"] = float("NaN")
-    mode_results["time"] = float("NaN")
-    mode_disp = {}
-    mode_stress = {}
-    mode_mises = {}
-    mode_pstress = {}
-    mode_strain = {}
-    mode_peeq = {}
-    mode_temp = {}
-    mode_massflow = {}
-    mode_networkpressure = {}
-
-    dat = avs_file.readlines()
+    avs_file = pyopen(avs_input, "rb")
+    topology = read_avs_topology(avs_file, cache_dir)
+    avs_data = _read_nodal_block(avs_file, len(topology["NodeIds"]))
+    avs_file.close()
+    avs_data["NodeIds"] = topology["NodeIds"]
+
+    m = _make_result_mesh(topology)
+    mode_results = _make_mode_results(avs_data)
+    mode_results["time"] = get_increment_time(avs_input)
+    m["Results"] = [mode_results]
+    return m
+
+
+def _read_avs_increments(avs_inputs, cache_dir=None, max_workers=None):
+    # topology of the first file and (file, nodal data) of all increments
+    avs_file = pyopen(avs_inputs[0], "rb")
+    sizes = _read_avs_sizes(avs_file)
+    avs_file.seek(0)
+    topology = read_avs_topology(avs_file, cache_dir)
+    first_data = _read_nodal_block(avs_file, sizes[0])
     avs_file.close()
-    
-    dat.reverse()
-    
-    for i in range(3):
-        dat.pop()
-    n_nodes, n_elems = map(int, dat.pop().split(" "))
-
-    #read nodes
-    for i in range(n_nodes):
-        line = list(filter(None, dat.pop().split(" ")))
-        nid = int(line[0])
-        nodes_x = float(line[1])
-        nodes_y = float(line[2])
-        nodes_z = float(line[3])
-        nodes[nid] = FreeCAD.Vector(nodes_x, nodes_y, nodes_z)
-
-    #read elements
-    for i in range(n_elems):
-        line = list(filter(None, dat.pop().split(" ")))
-        eid = int(line[0])
-        etype = line[2]
-        if etype == 'tet2':
-            nd1 = int(line[3])
-            nd2 = int(line[4])
-            nd3 = int(line[5])
-            nd4 = int(line[6])
-            nd5 = int(line[7])
-            nd6 = int(line[8])
-            nd7 = int(line[9])
-            nd8 = int(line[10])
-            nd9 = int(line[11])
-            nd10 = int(line[12])
-            elements_tetra10[eid] = (nd2, nd1, nd4, nd3, nd5, nd7, nd10, nd8, nd6, nd9)
-        elif etype == 'tet':
-            nd1 = int(line[3])
-            nd2 = int(line[4])
-            nd3 = int(line[5])
-            nd4 = int(line[6])
-            elements_tetra4[eid] = (nd2, nd1, nd4, nd3)
-        elif etype == 'prism2':
-            nd1 = int(line[3])
-            nd2 = int(line[4])
-            nd3 = int(line[5])
-            nd4 = int(line[6])
-            nd5 = int(line[7])
-            nd6 = int(line[8])
-            nd7 = int(line[9])
-            nd8 = int(line[10])
-            nd9 = int(line[11])
-            nd10 = int(line[12])
-            nd11 = int(line[13])
-            nd12 = int(line[14])
-            nd13 = int(line[15])
-            nd14 = int(line[16])
-            nd15 = int(line[17])
-            elements_penta15[eid] = (nd5, nd4, nd6, nd2, nd1, nd3,
-                                     nd10, nd12, nd11, nd7, nd9, nd8,
-                                     nd14, nd13, nd15)
-        elif etype == 'prism':
-            nd1 = int(line[3])
-            nd2 = int(line[4])
-            nd3 = int(line[5])
-            nd4 = int(line[6])
-            nd5 = int(line[7])
-            nd6 = int(line[8])
-            elements_penta6[eid] = (nd5, nd4, nd6, nd2, nd1, nd3)
-        elif etype == 'hex2':
-            nd1 = int(line[3])
-            nd2 = int(line[4])
-            nd3 = int(line[5])
-            nd4 = int(line[6])
-            nd5 = int(line[7])
-            nd6 = int(line[8])
-            nd7 = int(line[9])
-            nd8 = int(line[10])
-            nd9 = int(line[11])
-            nd10 = int(line[12])
-            nd11 = int(line[13])
-            nd12 = int(line[14])
-            nd13 = int(line[15])
-            nd14 = int(line[16])
-            nd15 = int(line[17])
-            nd16 = int(line[18])
-            nd17 = int(line[19])
-            nd18 = int(line[20])
-            nd19 = int(line[21])
-            nd20 = int(line[22])
-            elements_hexa20[eid] = (nd6, nd5, nd8, nd7, nd2, nd1, nd4, nd3,
-                                    nd13, nd16, nd15, nd14, nd9, nd12, nd11, nd10,
-                                    nd18, nd17, nd20, nd19)
-        elif etype == 'hex':
-            nd1 = int(line[3])
-            nd2 = int(line[4])
-            nd3 = int(line[5])
-            nd4 = int(line[6])
-            nd5 = int(line[7])
-            nd6 = int(line[8])
-            nd7 = int(line[9])
-            nd8 = int(line[10])
-            elements_hexa8[eid] = (nd6, nd5, nd8, nd7, nd2, nd1, nd4, nd3)
-
-    # Extract surface
-    extract_surface(nodes,
-                    elements_tetra10, elements_tetra4,
-                    elements_penta15, elements_penta6,
-                    elements_hexa20, elements_hexa8,
-                    elements_tria6, elements_tria3, elements_quad8, elements_quad4)
-    elements_tetra10 = {}
-    elements_tetra4 = {}
-    elements_penta15 = {}
-    elements_penta6 = {}
-    elements_hexa20 = {}
-    elements_hexa8 = {}
-
-    # Renumber for pipeline view
-    nodes, Renumbered_nid = renumber_nid(nodes)
-    elements_tria6, elements_tria3, elements_quad8, elements_quad4, Renumbered_eid  \
-        = renumber_eid(Renumbered_nid, elements_tria6, elements_tria3, elements_quad8, elements_quad4)
-
-    n_noderes, n_elemres = map(int, list(filter(None, dat.pop().split(" "))))
-    if n_noderes > 0 :
-        dofs = list(map(int, list(filter(None, dat.pop().split(" ")))))
-        n_dofs = dofs[0]
-        dofs[0] = 0
-        for i in range(n_dofs):
-            dofs[i+1] = dofs[i+1]+dofs[i]
 
-        labels = []
-        nresults = {}
-        for i in range(n_dofs):
-            tmp = dat.pop().split(",")[0].replace(" ","")
-            labels.append(tmp)
-            nresults[tmp] = {}
-
-        for i in range(n_nodes):
-            line = list(filter(None, dat.pop().split(" ")))
-            nid = int(line[0])
-            linedat = list(map(float,line[1:n_noderes+1]))
-            for j in range(n_dofs):
-                nresults[labels[j]][Renumbered_nid[nid]] = linedat[dofs[j]:dofs[j+1]]
-
-        # displacement
-        if 'DISPLACEMENT' in nresults:
-            for nid in nodes.keys():
-                disp = nresults['DISPLACEMENT'][nid]
-                mode_disp[nid] = FreeCAD.Vector(disp[0],disp[1],disp[2])
-            mode_results["disp"] = mode_disp
-    
-        # NodalSTRESS
-        if 'NodalSTRESS' in nresults:
-            for nid in nodes.keys():
-                stress = nresults['NodalSTRESS'][nid]
-                mode_stress[nid] = (stress[0],stress[1],stress[2],stress[3],stress[5],stress[4])
-            mode_results["stress"] = mode_stress
-
-        # NodalMises
-        if 'NodalMISES' in nresults:
-            for nid in nodes.keys():
-                mises = nresults['NodalMISES'][nid][0]
-                mode_mises[nid] = mises
-            mode_results["mises"] = mode_mises
-
-        # NodalPrincipalSTRESS
-        if 'NodalPrincipalSTRESS' in nresults:
-            for nid in nodes.keys():
-                pstr = nresults['NodalPrincipalSTRESS'][nid]
-                mode_pstress[nid] = pstr
-            mode_results["pstress"] = mode_pstress
-
-    n_nodes = len(nodes.keys())
-    n_elems = len(elements_tria3.keys()) + len(elements_tria6.keys())  \
-        + len(elements_quad4.keys()) + len(elements_quad8.keys())
-
-    results.append(mode_results)
+    with ThreadPoolExecutor(max_workers) as pool:
+        increments = [first_data] + list(pool.map(
+            lambda avs_input: _read_increment_nodal_data(avs_input, *sizes),
+            avs_inputs[1:]
+        ))
+
+    read_increments = []
+    for avs_input, avs_data in zip(avs_inputs, increments):
+        if avs_data is None:
+            Console.PrintWarning(
+                "Skipping {}, its mesh differs from the one of {}.\n"
+                .format(avs_input, avs_inputs[0])
+            )
+            continue
+        read_increments.append((avs_input, avs_data))
+    return topology, read_increments
 
-    return {
-        "Nodes": nodes,
-        "Seg2Elem": elements_seg2,
-        "Seg3Elem": elements_seg3,
-        "Tria3Elem": elements_tria3,
-        "Tria6Elem": elements_tria6,
-        "Quad4Elem": elements_quad4,
-        "Quad8Elem": elements_quad8,
-        "Tetra4Elem": elements_tetra4,
-        "Tetra10Elem": elements_tetra10,
-        "Hexa8Elem": elements_hexa8,
-        "Hexa20Elem": elements_hexa20,
-        "Penta6Elem": elements_penta6,
-        "Penta15Elem": elements_penta15,
-        "Results": results
+
+def _make_increment_results(topology, increments):
+    m = _make_result_mesh(topology)
+    results = []
+    for avs_input, avs_data in increments:
+        avs_data["NodeIds"] = topology["NodeIds"]
+        mode_results = _make_mode_results(avs_data)
+        mode_results["time"] = get_increment_time(avs_input)
+        mode_results["increment"] = get_increment_number(avs_input)
+        results.append(mode_results)
+    m["Results"] = results
+    return m
+
+
+# read the result files of all increments of a FrontISTR analysis.
+# The mesh is read from the first file only, the nodal data of the
+# increments is read in parallel.
+def read_avs_results(
+    avs_inputs,
+    cache_dir=None,
+    max_workers=None
+):
+    avs_inputs = sorted(avs_inputs, key=get_increment_number)
+    Console.PrintMessage(
+        "Read fistr results from {} complete avs files: {} ... {}\n"
+        .format(len(avs_inputs), avs_inputs[0], avs_inputs[-1])
+    )
+    topology, increments = _read_avs_increments(avs_inputs, cache_dir, max_workers)
+    if cache_dir is not None:
+        try:
+            save_result_cache(get_result_cache_path(cache_dir), avs_inputs, topology, increments)
+        except OSError as e:
+            Console.PrintWarning("Results could not be cached: {}\n".format(e))
+    return _make_increment_results(topology, increments)
+
+
+# to be increased whenever the content of the result cache changes
+AVS_RESULT_CACHE_VERSION = 1
+
+
+def get_result_cache_path(cache_dir):
+    return os.path.join(cache_dir, AVS_CACHE_DIR, "avs_results")
+
+
+def _source_stamps(avs_inputs):
+    stamps = []
+    for avs_input in avs_inputs:
+        stat = os.stat(avs_input)
+        stamps.append([os.path.abspath(avs_input), stat.st_size, stat.st_mtime_ns])
+    return stamps
+
+
+def save_result_cache(cache_path, avs_inputs, topology, increments):
+    """Save the result mesh topology and the nodal data of the increments.
+
+    Every array goes into its own .npy file of the directory cache_path,
+    a manifest.json holds the labels, the increments and the size and
+    modification time of the avs files the data was read from. The
+    arrays are not compressed, so load_result_cache can map them.
+    """
+    tmp_path = cache_path + ".tmp"
+    if os.path.isdir(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+    arrays = {
+        "NodeIds": topology["NodeIds"],
+        "Coordinates": topology["Coordinates"],
     }
+    for face_key, conn in topology["Surface"].items():
+        arrays[face_key] = conn
+        arrays[face_key + "Ids"] = topology["SurfaceIds"][face_key]
+    manifest_increments = []
+    for i, (avs_input, avs_data) in enumerate(increments):
+        arrays["NodalIds{}".format(i)] = avs_data["NodalIds"]
+        arrays["NodalData{}".format(i)] = avs_data["NodalData"]
+        manifest_increments.append({
+            "File": os.path.abspath(avs_input),
+            "NodalLabels": avs_data["NodalLabels"],
+            "NodalOffsets": avs_data["NodalOffsets"],
+        })
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, name + ".npy"), np.ascontiguousarray(array))
+    manifest = {
+        "Version": AVS_RESULT_CACHE_VERSION,
+        "Sources": _source_stamps(avs_inputs),
+        "Surface": sorted(topology["Surface"]),
+        "Increments": manifest_increments,
+    }
+    with pyopen(os.path.join(tmp_path, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    # keep the results of the latest import only
+    if os.path.isdir(cache_path):
+        shutil.rmtree(cache_path)
+    os.replace(tmp_path, cache_path)
+
+
+def load_result_cache(cache_path, avs_inputs):
+    """Return the topology and increments saved by save_result_cache,
+    or None if the cache does not belong to the given avs files.
+
+    The arrays are memory mapped, not read.
+    """
+    manifest_file = os.path.join(cache_path, "manifest.json")
+    if not os.path.isfile(manifest_file):
+        return None
+    try:
+        with pyopen(manifest_file, "r") as f:
+            manifest = json.load(f)
+        if (manifest.get("Version") != AVS_RESULT_CACHE_VERSION
+                or manifest.get("Sources") != _source_stamps(avs_inputs)):
+            return None
+
+        def load(name):
+            return np.load(os.path.join(cache_path, name + ".npy"), mmap_mode="r")
+
+        topology = {
+            "NodeIds": load("NodeIds"),
+            "Coordinates": load("Coordinates"),
+            "Surface": {},
+            "SurfaceIds": {}
+        }
+        for face_key in manifest["Surface"]:
+            topology["Surface"][face_key] = load(face_key)
+            topology["SurfaceIds"][face_key] = load(face_key + "Ids")
+        increments = []
+        for i, increment in enumerate(manifest["Increments"]):
+            increments.append((increment["File"], {
+                "NodalLabels": increment["NodalLabels"],
+                "NodalOffsets": increment["NodalOffsets"],
+                "NodalIds": load("NodalIds{}".format(i)),
+                "NodalData": load("NodalData{}".format(i)),
+            }))
+    except (OSError, ValueError, KeyError) as e:
+        Console.PrintWarning(
+            "Ignoring broken result cache {}: {}\n".format(cache_path, e)
+        )
+        return None
+    return topology, increments
+
+
+def read_avs_results_cached(
+    avs_inputs,
+    cache_dir,
+    max_workers=None
+):
+    """Return the result mesh and result sets as read_avs_results,
+    taken from the result cache in cache_dir if it is up to date."""
+    avs_inputs = sorted(avs_inputs, key=get_increment_number)
+    cache_path = get_result_cache_path(cache_dir)
+    cached = load_result_cache(cache_path, avs_inputs)
+    if cached is None:
+        return read_avs_results(avs_inputs, cache_dir, max_workers)
+    Console.PrintMessage(
+        "Read fistr results of {} avs files from {}\n".format(len(avs_inputs), cache_path)
+    )
+    return _make_increment_results(*cached)
+
+
+# every AVS_INDEX_STRIDE-th row offset of the node and nodal data blocks is indexed
+AVS_INDEX_STRIDE = 4096
+# to be increased whenever the content of the index files changes
+AVS_INDEX_VERSION = 2
+
+
+def _scan_line_offsets(buf, start, lines):
+    """Return the byte offsets of the given ascending line numbers,
+    counted from the line starting at start. Lines behind the end
+    of buf get the offset len(buf)."""
+    lines = np.asarray(lines, dtype=np.int64)
+    offsets = np.full(len(lines), len(buf), dtype=np.int64)
+    found = int(np.searchsorted(lines, 0, side="right"))
+    offsets[:found] = start
+    count = 0
+    pos = start
+    while found < len(lines) and pos < len(buf):
+        chunk = buf[pos:pos + AVS_CHUNK_BYTES]
+        # starts of the lines count + 1 ... count + len(starts)
+        starts = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == ord("\n")) + pos + 1
+        last = int(np.searchsorted(lines, count + len(starts), side="right"))
+        offsets[found:last] = starts[lines[found:last] - count - 1]
+        found = last
+        count += len(starts)
+        pos += len(chunk)
+    return offsets
+
+
+def _read_line(buf, offset):
+    end = buf.find(b"\n", offset)
+    if end < 0:
+        end = len(buf)
+    return buf[offset:end], end + 1
+
+
+class AvsIndex(object):
+    """Random access to the blocks of a COMPLETE_AVS file.
+
+    The file is scanned once for the byte offsets of its header, node,
+    element, label and nodal data blocks and of every AVS_INDEX_STRIDE-th
+    row of the node and nodal data blocks. The index is saved next to the
+    file as <avs file>.idx and reused as long as size and modification time
+    of the file match. Nodes and nodal fields are then read from a mmap of
+    the file, only the requested range of rows is parsed.
+
+        index = AvsIndex("xxx_vis_psf.0010.inp")
+        ids, mises = index.read_nodal_field("NodalMISES")
+        ids, disp = index.read_nodal_field("DISPLACEMENT", 1000, 2000)
+        index.close()
+    """
+
+    def __init__(self, avs_input):
+        self.avs_input = avs_input
+        self.index_file = avs_input + ".idx"
+        self.avs_file = pyopen(avs_input, "rb")
+        self.buf = mmap.mmap(self.avs_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.index = self.load()
+        if self.index is None:
+            self.index = self.build()
+            self.save()
+
+    def close(self):
+        self.buf.close()
+        self.avs_file.close()
+
+    def _file_stamp(self):
+        stat = os.stat(self.avs_input)
+        return stat.st_size, stat.st_mtime_ns
+
+    def load(self):
+        if not os.path.isfile(self.index_file):
+            return None
+        try:
+            with pyopen(self.index_file, "r") as f:
+                index = json.load(f)
+        except ValueError:
+            return None
+        size, mtime = self._file_stamp()
+        if (index.get("Version") != AVS_INDEX_VERSION
+                or index.get("Size") != size or index.get("MTime") != mtime):
+            return None
+        return index
+
+    def save(self):
+        try:
+            with pyopen(self.index_file, "w") as f:
+                json.dump(self.index, f)
+        except OSError as e:
+            Console.PrintWarning(
+                "Index of {} could not be saved: {}\n".format(self.avs_input, e)
+            )
+
+    def build(self):
+        buf = self.buf
+        size, mtime = self._file_stamp()
+        # header lines up to "number of nodes, number of elements"
+        offset = 0
+        while offset < len(buf):
+            line, next_offset = _read_line(buf, offset)
+            words = line.split()
+            if len(words) == 2 and words[0].isdigit() and words[1].isdigit():
+                break
+            offset = next_offset
+        n_nodes, n_elems = map(int, line.split())
+        node_offset = next_offset
+
+        node_rows = list(range(0, n_nodes, AVS_INDEX_STRIDE))
+        offsets = _scan_line_offsets(
+            buf, node_offset, node_rows + [n_nodes, n_nodes + n_elems]
+        ).tolist()
+        element_offset, nodal_header_offset = offsets[-2:]
+
+        labels = []
+        components = [0]
+        n_noderes = 0
+        line, label_offset = _read_line(buf, nodal_header_offset)
+        data_offset = label_offset
+        if line.strip():
+            n_noderes = int(line.split()[0])
+        if n_noderes > 0:
+            dofs = list(map(int, _read_line(buf, label_offset)[0].split()))
+            data_offset = _read_line(buf, label_offset)[1]
+            for n_comp in dofs[1:dofs[0] + 1]:
+                components.append(components[-1] + n_comp)
+                line, data_offset = _read_line(buf, data_offset)
+                labels.append(line.decode().split(",")[0].replace(" ", ""))
+        data_rows = list(range(0, n_nodes, AVS_INDEX_STRIDE)) if n_noderes > 0 else []
+        data_offsets = _scan_line_offsets(buf, data_offset, data_rows + [n_nodes]).tolist()
+
+        return {
+            "Version": AVS_INDEX_VERSION,
+            "Size": size,
+            "MTime": mtime,
+            "NumberOfNodes": n_nodes,
+            "NumberOfElements": n_elems,
+            "Stride": AVS_INDEX_STRIDE,
+            "Header": 0,
+            "Nodes": node_offset,
+            "Elements": element_offset,
+            "NodalHeader": nodal_header_offset,
+            "Labels": label_offset,
+            "NodalData": data_offset,
+            "End": data_offsets[-1],
+            "NodeRows": offsets[:-2],
+            "NodalDataRows": data_offsets[:-1],
+            "NodalLabels": labels,
+            "NodalOffsets": components,
+        }
+
+    @property
+    def labels(self):
+        return self.index["NodalLabels"]
+
+    def _read_rows(self, row_offsets, block_end, n_columns, start, stop):
+        n_rows = self.index["NumberOfNodes"]
+        stop = n_rows if stop is None else min(stop, n_rows)
+        if start >= stop:
+            return np.empty((0, n_columns), dtype=np.float64)
+        stride = self.index["Stride"]
+        sample = start // stride
+        begin, end = _scan_line_offsets(
+            self.buf, row_offsets[sample],
+            [start - sample * stride, stop - sample * stride]
+        ).tolist()
+        end = min(end, block_end)
+        values = np.fromstring(self.buf[begin:end], dtype=np.float64, sep=" ")
+        return values.reshape(stop - start, n_columns)
+
+    def read_nodes(self, start=0, stop=None):
+        """Return node ids and coordinates of the rows start to stop of the node block."""
+        rows = self._read_rows(
+            self.index["NodeRows"], self.index["Elements"], 4, start, stop
+        )
+        return rows[:, 0].astype(np.int64), rows[:, 1:]
+
+    def read_nodal_field(self, label, start=0, stop=None):
+        """Return node ids and the columns of one nodal field of the rows
+        start to stop of the nodal data block."""
+        i = self.labels.index(label)
+        components = self.index["NodalOffsets"]
+        rows = self._read_rows(
+            self.index["NodalDataRows"], self.index["End"],
+            components[-1] + 1, start, stop
+        )
+        return rows[:, 0].astype(np.int64), rows[:, components[i] + 1:components[i + 1] + 1]
@@ -0,0 +1,490 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 FrontISTR Commons <https://www.frontistr.com/>     *
+# *                                                                         *
+# *   This file is part of the FreeCAD CAx development system.              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__title__ = "Result import for FrontISTR res file format"
+__author__ = "FrontISTR Commons"
+__url__ = "https://www.frontistr.com/"
+
+## @package importfistrResResults
+#  \ingroup FEM
+#  \brief FreeCAD FrontISTR result file (.res) reader for FEM workbench
+#
+#  With !WRITE,RESULT every MPI rank writes its part of the results of a
+#  step into <mesh>.res.<rank>.<step>. The ranks of a step are read in
+#  parallel and merged by global node id, so the serial merge of the
+#  visualizer is not needed. Results are on all nodes of the analysis mesh,
+#  interior nodes included, and can be restricted to some fields and steps.
+
+import functools
+import glob
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+import FreeCAD
+from FreeCAD import Console
+
+import fistrtiming
+import importfistrAvsResults
+
+
+# ********* generic FreeCAD import and export methods *********
+if open.__module__ == "__builtin__":
+    # because we'll redefine open below (Python2)
+    pyopen = open
+elif open.__module__ == "io":
+    # because we'll redefine open below (Python3)
+    pyopen = open
+
+
+# bytes of lines holding only numbers
+RES_NUMERIC_BYTES = b"0123456789+-.eE \t\r\n"
+
+# start of result files written with IO type binary
+RES_BINARY_HEADER = b"HECMW_BINARY_RESULT"
+
+# bytes read for the header and global data of a result file
+RES_HEADER_BYTES = 1 << 16
+
+# points and nodes compared at once in probe_res_field without scipy,
+# bounds the distance matrix
+RES_PROBE_CHUNK = 256
+RES_PROBE_NODE_CHUNK = 4096
+
+
+def _next_line(data, pos):
+    # line starting at pos and the start of the following line
+    end = data.find(b"\n", pos)
+    if end == -1:
+        end = len(data)
+    return data[pos:end].strip(), end + 1
+
+
+def _read_numbers(data, pos, count, dtype=np.int64):
+    # count numbers of one or more lines starting at pos
+    values = []
+    while len(values) < count and pos < len(data):
+        line, pos = _next_line(data, pos)
+        values.extend(line.split())
+    return np.array(values[:count], dtype=np.float64).astype(dtype), pos
+
+
+def _read_labels(data, pos, count):
+    labels = []
+    for i in range(count):
+        line, pos = _next_line(data, pos)
+        labels.append(line.decode(errors="replace").split(",")[0].strip())
+    return labels, pos
+
+
+def _next_text_line(data, pos):
+    # start of the first line at or after pos with other than numeric characters
+    table = np.ones(256, dtype=bool)
+    table[np.frombuffer(RES_NUMERIC_BYTES, dtype=np.uint8)] = False
+    other = np.flatnonzero(table[np.frombuffer(data, dtype=np.uint8, offset=pos)])
+    if not len(other):
+        return len(data)
+    return data.rfind(b"\n", 0, pos + int(other[0])) + 1
+
+
+def _read_block(data, pos, n_items, dofs):
+    # rows of item id followed by the values of all components
+    n_columns = 1 + int(sum(dofs))
+    values = np.fromstring(data[pos:], dtype=np.float64, sep=" ", count=n_items * n_columns)
+    values = values.reshape(n_items, n_columns)
+    return values[:, 0].astype(np.int64), np.ascontiguousarray(values[:, 1:])
+
+
+def _select_fields(labels, offsets, data, fields):
+    # labels, offsets and columns of the fields asked for
+    keep = [i for i, label in enumerate(labels) if label in fields]
+    columns = [np.arange(offsets[i], offsets[i + 1]) for i in keep]
+    columns = np.concatenate(columns) if columns else np.empty(0, dtype=np.int64)
+    dofs = [offsets[i + 1] - offsets[i] for i in keep]
+    return (
+        [labels[i] for i in keep],
+        np.concatenate(([0], np.cumsum(dofs))).astype(np.int64).tolist(),
+        np.ascontiguousarray(data[:, columns]),
+    )
+
+
+def _read_global(data, global_data):
+    # header, comment and global data up to *data, returns the line
+    # ending them and the position behind it
+    pos = 0
+    line = b""
+    while pos < len(data):
+        line, pos = _next_line(data, pos)
+        if line.lower().startswith(b"*global"):
+            n_global = int(_next_line(data, pos)[0])
+            pos = _next_line(data, pos)[1]
+            dofs, pos = _read_numbers(data, pos, n_global)
+            labels, pos = _read_labels(data, pos, n_global)
+            values, pos = _read_numbers(data, pos, int(dofs.sum()), np.float64)
+            offsets = np.concatenate(([0], np.cumsum(dofs)))
+            for i, label in enumerate(labels):
+                global_data[label] = values[offsets[i]:offsets[i + 1]]
+        elif line.lower().startswith(b"*data") or (line and line[:1].isdigit()):
+            break
+    return line, pos
+
+
+def read_res_global(filename):
+    """Return the global values of a text result file by label, e.g. TOTALTIME.
+
+    Only the header of the file is read.
+    """
+    with pyopen(filename, "rb") as f:
+        data = f.read(RES_HEADER_BYTES)
+        if b"*data" not in data.lower():
+            data += f.read()
+    global_data = {}
+    if not data.startswith(RES_BINARY_HEADER):
+        _read_global(data.replace(b"\r", b""), global_data)
+    return global_data
+
+
+def read_res_file(filename, fields=None):
+    """Read a FrontISTR text result file into NumPy arrays.
+
+    Returns the global values by label and the nodal and elemental data
+    with the keys of importfistrAvsResults.read_avs_arrays, elemental
+    data with Elemental instead of Nodal. If fields is given, only the
+    nodal and elemental fields with these labels are kept.
+    """
+    with pyopen(filename, "rb") as f:
+        data = f.read().replace(b"\r", b"")
+    if data.startswith(RES_BINARY_HEADER):
+        raise ValueError(
+            "Binary result file {}, only text result files are supported".format(filename)
+        )
+
+    res_data = {"Global": {}}
+    line, pos = _read_global(data, res_data["Global"])
+    if line.lower().startswith(b"*data"):
+        line, pos = _next_line(data, pos)
+    n_nodes, n_elems = map(int, line.split()[:2])
+    (nn_component, ne_component), pos = _read_numbers(data, pos, 2)
+
+    node_dofs, pos = _read_numbers(data, pos, nn_component)
+    node_labels, pos = _read_labels(data, pos, nn_component)
+    elem_dofs = np.empty(0, dtype=np.int64)
+    elem_labels = []
+    node_pos = pos
+    elem_pos = None
+    if ne_component > 0:
+        text_pos = _next_text_line(data, pos)
+        if _skip_numbers(data, pos, ne_component) >= text_pos:
+            # element header in front of the node data
+            elem_dofs, pos = _read_numbers(data, pos, ne_component)
+            elem_labels, pos = _read_labels(data, pos, ne_component)
+            node_pos = pos
+        else:
+            # element header behind the node data, its labels are the next text
+            dof_pos = data.rfind(b"\n", 0, text_pos - 1) + 1
+            elem_dofs = _read_numbers(data, dof_pos, ne_component)[0]
+            elem_labels, elem_pos = _read_labels(data, text_pos, ne_component)
+
+    if nn_component:
+        node_ids, node_data = _read_block(data, node_pos, n_nodes, node_dofs)
+    else:
+        node_ids, node_data = np.empty(0, dtype=np.int64), np.empty((0, 0))
+    elem_ids, elem_data = np.empty(0, dtype=np.int64), np.empty((0, 0))
+    if ne_component:
+        if elem_pos is None:
+            # behind the node data, skipped by counting numbers
+            elem_pos = _skip_numbers(data, node_pos, n_nodes * (1 + int(node_dofs.sum())))
+        elem_ids, elem_data = _read_block(data, elem_pos, n_elems, elem_dofs)
+
+    node_offsets = np.concatenate(([0], np.cumsum(node_dofs))).astype(np.int64).tolist()
+    elem_offsets = np.concatenate(([0], np.cumsum(elem_dofs))).astype(np.int64).tolist()
+    if fields is not None:
+        node_labels, node_offsets, node_data = _select_fields(
+            node_labels, node_offsets, node_data, fields
+        )
+        elem_labels, elem_offsets, elem_data = _select_fields(
+            elem_labels, elem_offsets, elem_data, fields
+        )
+    res_data.update({
+        "NodeIds": node_ids,
+        "NodalLabels": node_labels,
+        "NodalOffsets": node_offsets,
+        "NodalData": node_data,
+        "ElementIds": elem_ids,
+        "ElementalLabels": elem_labels,
+        "ElementalOffsets": elem_offsets,
+        "ElementalData": elem_data,
+    })
+    return res_data
+
+
+def _skip_numbers(data, pos, count):
+    # position behind count numbers starting at pos, numbers do not span lines
+    while count > 0 and pos < len(data):
+        end = data.find(b"\n", pos)
+        if end == -1:
+            end = len(data)
+        count -= len(data[pos:end].split())
+        pos = end + 1
+    return pos
+
+
+def get_res_files(filename):
+    """Return the result files of a result name, e.g. Mesh.res, by step and rank.
+
+    {step: [file of rank 0, file of rank 1, ...]}
+    """
+    steps = {}
+    pattern = re.compile(re.escape(os.path.basename(filename)) + r"\.(\d+)\.(\d+)$")
+    for name in glob.glob(glob.escape(filename) + ".*.*"):
+        match = pattern.match(os.path.basename(name))
+        if match:
+            rank, step = int(match.group(1)), int(match.group(2))
+            steps.setdefault(step, {})[rank] = name
+    return {
+        step: [ranks[rank] for rank in sorted(ranks)] for step, ranks in sorted(steps.items())
+    }
+
+
+def merge_ranks(rank_data):
+    """Merge the nodal and elemental data of all ranks of a step by global id.
+
+    Nodes written by more than one rank get the values of the last one.
+    The fields and their numbers of components have to be the same in
+    all ranks, otherwise a ValueError is raised.
+    """
+    first = rank_data[0]
+    for rank, r in enumerate(rank_data):
+        for kind in ("Nodal", "Elemental"):
+            if (
+                r[kind + "Labels"] != first[kind + "Labels"]
+                or r[kind + "Offsets"] != first[kind + "Offsets"]
+                or r[kind + "Data"].shape[1] != first[kind + "Data"].shape[1]
+            ):
+                raise ValueError(
+                    "{} results of rank {} differ from those of rank 0".format(kind, rank)
+                )
+    node_ids = np.unique(np.concatenate([r["NodeIds"] for r in rank_data]))
+    nodal_data = np.empty((len(node_ids), first["NodalData"].shape[1]))
+    for r in rank_data:
+        nodal_data[np.searchsorted(node_ids, r["NodeIds"])] = r["NodalData"]
+    elem_ids = np.unique(np.concatenate([r["ElementIds"] for r in rank_data]))
+    elem_data = np.empty((len(elem_ids), first["ElementalData"].shape[1]))
+    for r in rank_data:
+        elem_data[np.searchsorted(elem_ids, r["ElementIds"])] = r["ElementalData"]
+    merged = dict(first)
+    merged.update({
+        "NodeIds": node_ids,
+        "NodalIds": node_ids,
+        "NodalData": nodal_data,
+        "ElementIds": elem_ids,
+        "ElementalData": elem_data,
+    })
+    return merged
+
+
+def read_res_results(filename, steps=None, fields=None, max_workers=None):
+    """Read and merge the rank files of the steps of a result name.
+
+    Returns a list of the merged data of the steps, with the step number
+    and the time of the step, NaN if the files have no TOTALTIME. steps
+    and fields restrict the steps read and the nodal and elemental fields
+    kept, see read_res_file. The files are read in max_workers threads,
+    the parsing holds the GIL, so they only overlap the file reads with it.
+    """
+    res_files = get_res_files(filename)
+    if steps is not None:
+        res_files = {step: files for step, files in res_files.items() if step in steps}
+    if not res_files:
+        return []
+    Console.PrintMessage(
+        "Read fistr results from {} steps of {} ranks: {}\n"
+        .format(len(res_files), len(next(iter(res_files.values()))), filename)
+    )
+    all_files = [name for files in res_files.values() for name in files]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        read_file = functools.partial(read_res_file, fields=fields)
+        all_data = iter(list(executor.map(read_file, all_files)))
+    results = []
+    for step, files in res_files.items():
+        merged = merge_ranks([next(all_data) for name in files])
+        merged["Step"] = step
+        total_time = merged["Global"].get("TOTALTIME")
+        merged["Time"] = float(total_time[0]) if total_time is not None else float("NaN")
+        results.append(merged)
+    return results
+
+
+def get_res_field(res_data, label, ids, fill=float("NaN")):
+    """Return the values of a nodal or elemental field for the given ids.
+
+    ids are node ids for nodal fields and element ids for elemental
+    fields, e.g. all nodes of the analysis mesh. Rows of ids missing in
+    the result data are set to fill.
+    """
+    if label in res_data["NodalLabels"]:
+        kind = "Nodal"
+        result_ids = res_data["NodeIds"]
+    elif label in res_data["ElementalLabels"]:
+        kind = "Elemental"
+        result_ids = res_data["ElementIds"]
+    else:
+        raise KeyError("No result field {}".format(label))
+    i = res_data[kind + "Labels"].index(label)
+    offsets = res_data[kind + "Offsets"]
+    field = res_data[kind + "Data"][:, offsets[i]:offsets[i + 1]]
+
+    ids = np.asarray(ids, dtype=np.int64)
+    values = np.full((len(ids), field.shape[1]), fill, dtype=np.float64)
+    if len(result_ids):
+        # result ids are sorted after merge_ranks
+        rows = np.minimum(np.searchsorted(result_ids, ids), len(result_ids) - 1)
+        found = result_ids[rows] == ids
+        values[found] = field[rows[found]]
+    return values
+
+
+def map_to_mesh(res_data, node_ids, fill=0.0):
+    """Return res_data with the nodal data in the order of node_ids.
+
+    node_ids are the nodes of the volume mesh the results are shown on,
+    nodes without results get fill.
+    """
+    node_ids = np.asarray(node_ids, dtype=np.int64)
+    fields = [get_res_field(res_data, label, node_ids, fill) for label in res_data["NodalLabels"]]
+    mapped = dict(res_data)
+    mapped.update({
+        "NodeIds": node_ids,
+        "NodalIds": node_ids,
+        "NodalData": np.hstack(fields) if fields else np.empty((len(node_ids), 0)),
+    })
+    return mapped
+
+
+def probe_res_field(res_data, label, node_ids, coords, points):
+    """Return the values of a nodal field at the nodes nearest to points.
+
+    node_ids and coords are the nodes of the volume mesh, e.g. from
+    importFrontISTRMesh.read_msh_arrays, so interior points can be probed.
+    The nearest nodes are searched with scipy's cKDTree if it is installed,
+    else in blocks of points and nodes. Returns the values and the ids of
+    the probed nodes.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+    if cKDTree is not None:
+        nearest = cKDTree(coords).query(points)[1]
+    else:
+        nearest = np.zeros(len(points), dtype=np.int64)
+        nearest_distances = np.full(len(points), np.inf)
+        for start in range(0, len(points), RES_PROBE_CHUNK):
+            chunk = points[start:start + RES_PROBE_CHUNK]
+            best = nearest[start:start + len(chunk)]
+            best_distances = nearest_distances[start:start + len(chunk)]
+            for node_start in range(0, len(coords), RES_PROBE_NODE_CHUNK):
+                nodes = coords[node_start:node_start + RES_PROBE_NODE_CHUNK]
+                distances = ((nodes[None, :, :] - chunk[:, None, :]) ** 2).sum(axis=2)
+                rows = distances.argmin(axis=1)
+                row_distances = distances[np.arange(len(chunk)), rows]
+                closer = row_distances < best_distances
+                best[closer] = node_start + rows[closer]
+                best_distances[closer] = row_distances[closer]
+    probed_ids = np.asarray(node_ids, dtype=np.int64)[nearest]
+    return get_res_field(res_data, label, probed_ids), probed_ids
+
+
+def importRes(
+    filename,
+    analysis=None,
+    result_name_prefix="",
+    mesh_obj=None,
+    steps=None,
+    fields=None,
+    max_workers=None
+):
+    """Create result objects from the rank files of a result name, e.g. Mesh.res.
+
+    The result mesh is a copy of the FemMesh of mesh_obj, the analysis mesh,
+    whose node ids the result files refer to. The results are mapped onto
+    all its nodes. steps and fields restrict what is read.
+    """
+    import ObjectsFem
+    from femresult import resulttools
+
+    if analysis:
+        doc = analysis.Document
+    else:
+        doc = FreeCAD.ActiveDocument
+
+    fistrtiming.start("import results")
+    with fistrtiming.span("parse res"):
+        results = read_res_results(filename, steps, fields, max_workers)
+
+    res_obj = None
+    if results and mesh_obj:
+        result_mesh_object = ObjectsFem.makeMeshResult(doc, "ResultMesh")
+        result_mesh_object.FemMesh = mesh_obj.FemMesh
+        mesh_node_ids = np.array(sorted(mesh_obj.FemMesh.Nodes), dtype=np.int64)
+        for res_data in results:
+            res_data = map_to_mesh(res_data, mesh_node_ids)
+            if len(results) > 1 and res_data["Time"] >= 0:
+                results_name = "{}Time{}_Results".format(
+                    result_name_prefix, round(res_data["Time"], 2)
+                )
+            elif len(results) > 1:
+                results_name = "{}Step{}_Results".format(result_name_prefix, res_data["Step"])
+            else:
+                results_name = "{}Results".format(result_name_prefix)
+            res_obj = ObjectsFem.makeResultMechanical(doc, results_name)
+            res_obj.Mesh = result_mesh_object
+            res_obj.NodeNumbers = res_data["NodeIds"].tolist()
+            if analysis:
+                analysis.addObject(res_obj)
+            result_set = importfistrAvsResults._make_mode_results(res_data)
+            result_set["time"] = res_data["Time"]
+            with fistrtiming.span("fill result", result=results_name):
+                res_obj = importfistrAvsResults.fill_result_arrays(res_obj, result_set)
+            with fistrtiming.span("stats", result=results_name):
+                res_obj = resulttools.fill_femresult_stats(res_obj)
+        if FreeCAD.GuiUp:
+            if analysis:
+                import FemGui
+                FemGui.setActiveAnalysis(analysis)
+            doc.recompute()
+    elif not results:
+        Console.PrintError(
+            "Problem on res file import. No result files found for {}.\n".format(filename)
+        )
+    else:
+        Console.PrintError("Problem on res file import. No mesh given.\n")
+
+    fistrtiming.stop("import results")
+    fistrtiming.save(os.path.dirname(os.path.abspath(filename)))
+    return res_obj
@@ -0,0 +1,408 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 FrontISTR Commons <https://www.frontistr.com/>     *
+# *                                                                         *
+# *   This file is part of the FreeCAD CAx development system.              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__title__ = "Result import for FrontISTR VTK file format"
+__author__ = "FrontISTR Commons"
+__url__ = "https://www.frontistr.com/"
+
+## @package importfistrVtkResults
+#  \ingroup FEM
+#  \brief FreeCAD FrontISTR VTK (.pvtu/.vtu) result reader for FEM workbench
+#
+#  Reads the visualizer output written with output_type=VTK or BIN_VTK.
+#  Data arrays may be ascii, inline base64 binary or appended raw data,
+#  binary arrays are viewed with numpy.frombuffer without copying.
+#  The pieces of a .pvtu file are read in parallel and merged by the global
+#  node ids written with the point data, the result objects are made as for
+#  the AVS import.
+
+import base64
+import glob
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import FreeCAD
+from FreeCAD import Console
+
+import fistrtiming
+import importfistrAvsResults
+
+
+# ********* generic FreeCAD import and export methods *********
+if open.__module__ == "__builtin__":
+    # because we'll redefine open below (Python2)
+    pyopen = open
+elif open.__module__ == "io":
+    # because we'll redefine open below (Python3)
+    pyopen = open
+
+
+# VTK data array type -> NumPy type without byte order
+VTK_DATA_TYPES = {
+    "Int8": "i1",
+    "UInt8": "u1",
+    "Int16": "i2",
+    "UInt16": "u2",
+    "Int32": "i4",
+    "UInt32": "u4",
+    "Int64": "i8",
+    "UInt64": "u8",
+    "Float32": "f4",
+    "Float64": "f8",
+}
+# names of the point data array with the global node ids, if the PointData
+# element does not name it in its GlobalIds attribute
+VTK_GLOBAL_NODE_ID_NAMES = ("NODE_ID", "GlobalNodeID", "GlobalNodeIds")
+
+# VTK cell type -> (number of nodes, FreeCAD mesh key,
+# node order to get the FreeCAD (SMDS) order from the VTK order)
+VTK_CELL_TYPES = {
+    5: (3, "Tria3Elem", (0, 1, 2)),
+    9: (4, "Quad4Elem", (0, 1, 2, 3)),
+    22: (6, "Tria6Elem", (0, 1, 2, 3, 4, 5)),
+    23: (8, "Quad8Elem", (0, 1, 2, 3, 4, 5, 6, 7)),
+    10: (4, "Tetra4Elem", (0, 2, 1, 3)),
+    24: (10, "Tetra10Elem", (0, 2, 1, 3, 6, 5, 4, 7, 9, 8)),
+    12: (8, "Hexa8Elem", (0, 3, 2, 1, 4, 7, 6, 5)),
+    25: (20, "Hexa20Elem", (0, 3, 2, 1, 4, 7, 6, 5,
+                            11, 10, 9, 8, 15, 14, 13, 12,
+                            16, 19, 18, 17)),
+    13: (6, "Penta6Elem", (0, 2, 1, 3, 5, 4)),
+    26: (15, "Penta15Elem", (0, 2, 1, 3, 5, 4, 8, 7, 6, 11, 10, 9, 12, 14, 13)),
+}
+
+
+def open(filename):
+    "called when freecad opens a file"
+    docname = os.path.splitext(os.path.basename(filename))[0]
+    insert(filename, docname)
+
+
+def insert(
+    filename,
+    docname
+):
+    "called when freecad wants to import a file"
+    try:
+        doc = FreeCAD.getDocument(docname)
+    except NameError:
+        doc = FreeCAD.newDocument(docname)
+    FreeCAD.ActiveDocument = doc
+    importVtk(filename)
+
+
+def _split_appended(data):
+    # the xml part and the raw bytes of the AppendedData element
+    start = data.find(b"<AppendedData")
+    if start == -1:
+        return data, None
+    tag_end = data.find(b">", start)
+    if b"base64" in data[start:tag_end]:
+        raise ValueError("base64 encoded AppendedData is not supported")
+    raw_start = data.find(b"_", tag_end) + 1
+    raw_end = data.rfind(b"</AppendedData>")
+    xml = data[:start] + data[raw_end + len(b"</AppendedData>"):]
+    return xml, memoryview(data)[raw_start:raw_end]
+
+
+def _decode_array(element, appended, byte_order, header_type):
+    """Return the values of a DataArray element, one row per tuple."""
+    dtype = np.dtype(VTK_DATA_TYPES[element.get("type")]).newbyteorder(byte_order)
+    n_components = int(element.get("NumberOfComponents", 1))
+    data_format = element.get("format", "ascii")
+    if data_format == "ascii":
+        values = np.fromstring(element.text or "", dtype=np.float64, sep=" ").astype(dtype)
+    elif data_format == "binary":
+        text = "".join((element.text or "").split())
+        n_header = (header_type.itemsize + 2) // 3 * 4
+        if text[n_header - 1:n_header] == "=":
+            # header and data encoded separately
+            n_bytes = int(np.frombuffer(base64.b64decode(text[:n_header]), header_type)[0])
+            values = np.frombuffer(
+                base64.b64decode(text[n_header:]), dtype, n_bytes // dtype.itemsize
+            )
+        else:
+            raw = base64.b64decode(text)
+            n_bytes = int(np.frombuffer(raw, header_type, 1)[0])
+            values = np.frombuffer(
+                raw, dtype, n_bytes // dtype.itemsize, header_type.itemsize
+            )
+    elif data_format == "appended":
+        if appended is None:
+            raise ValueError("DataArray refers to missing AppendedData")
+        offset = int(element.get("offset", 0))
+        n_bytes = int(np.frombuffer(appended, header_type, 1, offset)[0])
+        values = np.frombuffer(
+            appended, dtype, n_bytes // dtype.itemsize, offset + header_type.itemsize
+        )
+    else:
+        raise ValueError("Unknown DataArray format {}".format(data_format))
+    return values.reshape(-1, n_components) if n_components > 1 else values
+
+
+def read_vtu_piece(filename, with_cells=True):
+    """Read the points, cells and point data of a .vtu file into NumPy arrays.
+
+    Returns the keys Points, Connectivity, Offsets, Types, PointData,
+    a list of (name, values) with one row per point, and GlobalNodeIds,
+    None if the file has no global node ids.
+    """
+    with pyopen(filename, "rb") as f:
+        data = f.read()
+    xml, appended = _split_appended(data)
+    root = ET.fromstring(xml)
+    if root.get("compressor"):
+        raise ValueError("Compressed VTK file {} is not supported".format(filename))
+    byte_order = "<" if root.get("byte_order", "LittleEndian") == "LittleEndian" else ">"
+    header_type = np.dtype(
+        VTK_DATA_TYPES[root.get("header_type", "UInt32")]
+    ).newbyteorder(byte_order)
+
+    def decode(element):
+        return _decode_array(element, appended, byte_order, header_type)
+
+    piece = root.find("UnstructuredGrid/Piece")
+    point_data = piece.find("PointData")
+    global_ids_name = None
+    if point_data is not None:
+        global_ids_name = point_data.get("GlobalIds")
+    vtu_data = {
+        "Points": decode(piece.find("Points/DataArray")).astype(np.float64).reshape(-1, 3),
+        "PointData": [],
+        "GlobalNodeIds": None,
+    }
+    for array in piece.findall("PointData/DataArray"):
+        name = array.get("Name")
+        if name == global_ids_name or (not global_ids_name and name in VTK_GLOBAL_NODE_ID_NAMES):
+            vtu_data["GlobalNodeIds"] = decode(array).astype(np.int64).reshape(-1)
+        else:
+            vtu_data["PointData"].append((name, decode(array)))
+    if with_cells:
+        cells = {array.get("Name"): array for array in piece.findall("Cells/DataArray")}
+        vtu_data["Connectivity"] = decode(cells["connectivity"]).astype(np.int64)
+        vtu_data["Offsets"] = decode(cells["offsets"]).astype(np.int64)
+        vtu_data["Types"] = decode(cells["types"]).astype(np.int64)
+    return vtu_data
+
+
+def get_vtu_files(filename):
+    """Return the piece files of a .pvtu file, or the .vtu file itself."""
+    if not filename.lower().endswith(".pvtu"):
+        return [filename]
+    with pyopen(filename, "rb") as f:
+        root = ET.fromstring(f.read())
+    path = os.path.dirname(os.path.abspath(filename))
+    return [
+        os.path.join(path, piece.get("Source"))
+        for piece in root.findall("PUnstructuredGrid/Piece")
+    ]
+
+
+def _cells_by_type(vtu_data, node_index):
+    # (ids, connectivity in FreeCAD order) per FreeCAD mesh key
+    types = vtu_data["Types"]
+    offsets = vtu_data["Offsets"]
+    starts = np.concatenate(([0], offsets[:-1]))
+    elements = {}
+    for vtk_type in np.unique(types):
+        if vtk_type not in VTK_CELL_TYPES:
+            Console.PrintWarning("Skipping VTK cells of type {}\n".format(vtk_type))
+            continue
+        n_nodes, key, order = VTK_CELL_TYPES[vtk_type]
+        rows = np.flatnonzero(types == vtk_type)
+        conn = vtu_data["Connectivity"][starts[rows][:, None] + np.arange(n_nodes)]
+        elements[key] = (rows, node_index[conn[:, order]])
+    return elements
+
+
+def read_vtk_arrays(filename, with_cells=True, max_workers=None):
+    """Read a .pvtu or .vtu file into NumPy arrays.
+
+    The pieces are read in parallel and merged by their global node ids,
+    by the point coordinates if a piece has none. Returns the keys of
+    importfistrAvsResults.read_avs_arrays, node ids are numbered from 1 in
+    the order of the merged points, elements per FreeCAD mesh key are
+    numbered from 1 in the order of the pieces.
+    """
+    vtu_files = get_vtu_files(filename)
+    with ThreadPoolExecutor(max_workers) as pool:
+        pieces = list(pool.map(lambda name: read_vtu_piece(name, with_cells), vtu_files))
+
+    points = np.concatenate([piece["Points"] for piece in pieces])
+    if len(pieces) == 1:
+        coords, inverse = points, np.arange(len(points))
+    elif all(piece["GlobalNodeIds"] is not None for piece in pieces):
+        global_ids = np.concatenate([piece["GlobalNodeIds"] for piece in pieces])
+        global_ids, first, inverse = np.unique(
+            global_ids, return_index=True, return_inverse=True
+        )
+        coords, inverse = points[first], inverse.reshape(-1)
+    else:
+        Console.PrintWarning(
+            "{} has no global node ids, its pieces are merged on the point coordinates.\n"
+            .format(filename)
+        )
+        coords, inverse = np.unique(points, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+    node_ids = np.arange(1, len(coords) + 1)
+
+    labels = []
+    offsets = [0]
+    fields = []
+    for i, (name, values) in enumerate(pieces[0]["PointData"]):
+        values = np.concatenate([piece["PointData"][i][1] for piece in pieces])
+        values = values.reshape(len(points), -1)
+        field = np.empty((len(coords), values.shape[1]), dtype=np.float64)
+        field[inverse] = values
+        labels.append(name)
+        offsets.append(offsets[-1] + values.shape[1])
+        fields.append(field)
+
+    vtk_data = {
+        "NodeIds": node_ids,
+        "Coordinates": coords,
+        "NodalLabels": labels,
+        "NodalOffsets": offsets,
+        "NodalIds": node_ids,
+        "NodalData": np.hstack(fields) if fields else np.empty((len(coords), 0)),
+    }
+    if with_cells:
+        parts = {}
+        start = 0
+        for piece in pieces:
+            node_index = node_ids[inverse[start:start + len(piece["Points"])]]
+            start += len(piece["Points"])
+            for key, (rows, conn) in _cells_by_type(piece, node_index).items():
+                parts.setdefault(key, []).append(conn)
+        elements = {}
+        count = 0
+        for key, conns in parts.items():
+            conn = np.concatenate(conns)
+            elements[key] = (np.arange(count + 1, count + len(conn) + 1), conn)
+            count += len(conn)
+        vtk_data["Elements"] = elements
+    return vtk_data
+
+
+def make_vtk_topology(vtk_data):
+    """Return the result mesh topology of vtk_data,
+    see importfistrAvsResults.make_result_topology.
+
+    Boundary faces of the volume cells and face cells are both kept.
+    """
+    volumes = {}
+    faces = {}
+    for key, cells in vtk_data["Elements"].items():
+        if key in importfistrAvsResults.SURFACE_TYPES:
+            faces[key] = cells[1]
+        else:
+            volumes[key] = cells
+    topology = importfistrAvsResults.make_result_topology(
+        vtk_data["NodeIds"], vtk_data["Coordinates"], volumes
+    )
+    if faces:
+        surface = dict(topology["Surface"])
+        for key, conn in faces.items():
+            surface[key] = np.concatenate((surface[key], conn)) if key in surface else conn
+        # the node ids are consecutive already, the lookup keeps them
+        nid_lookup = importfistrAvsResults.renumber_nid(vtk_data["NodeIds"])
+        topology["Surface"], topology["SurfaceIds"] = importfistrAvsResults.renumber_eid(
+            nid_lookup, surface
+        )
+    return topology
+
+
+def read_vtk_results(vtk_inputs, max_workers=None):
+    """Read the .pvtu or .vtu files of the increments of an analysis.
+
+    The mesh is taken from the first file, the point data of all.
+    Returns the result mesh and result sets as read_avs_results.
+    """
+    if not isinstance(vtk_inputs, (list, tuple)):
+        vtk_inputs = [vtk_inputs]
+    vtk_inputs = sorted(vtk_inputs, key=importfistrAvsResults.get_increment_number)
+    Console.PrintMessage(
+        "Read fistr results from {} vtk files: {} ... {}\n"
+        .format(len(vtk_inputs), vtk_inputs[0], vtk_inputs[-1])
+    )
+
+    first_data = read_vtk_arrays(vtk_inputs[0], True, max_workers)
+    topology = make_vtk_topology(first_data)
+    m = importfistrAvsResults._make_result_mesh(topology)
+    results = []
+    for i, vtk_input in enumerate(vtk_inputs):
+        if i == 0:
+            vtk_data = first_data
+        else:
+            vtk_data = read_vtk_arrays(vtk_input, False, max_workers)
+            if len(vtk_data["NodeIds"]) != len(first_data["NodeIds"]):
+                Console.PrintWarning(
+                    "Skipping {}, its mesh differs from the one of {}.\n"
+                    .format(vtk_input, vtk_inputs[0])
+                )
+                continue
+        mode_results = importfistrAvsResults._make_mode_results(vtk_data)
+        mode_results["time"] = importfistrAvsResults.get_increment_time(vtk_input)
+        mode_results["increment"] = importfistrAvsResults.get_increment_number(vtk_input)
+        results.append(mode_results)
+    m["Results"] = results
+    return m
+
+
+def get_vtk_files(working_dir):
+    """Return the .pvtu files of the visualizer in working_dir,
+    or its .vtu files if there are no .pvtu files."""
+    for extension in ("pvtu", "vtu"):
+        vtk_files = glob.glob(
+            os.path.join(glob.escape(working_dir), "*_vis_psf.*." + extension)
+        )
+        if vtk_files:
+            return sorted(vtk_files, key=importfistrAvsResults.get_increment_number)
+    return []
+
+
+def importVtk(
+    filename,
+    analysis=None,
+    result_name_prefix="",
+    max_workers=None
+):
+    """Create result objects from one or a list of .pvtu or .vtu files."""
+    if analysis:
+        doc = analysis.Document
+    else:
+        doc = FreeCAD.ActiveDocument
+
+    fistrtiming.start("import results")
+    with fistrtiming.span("parse VTK"):
+        m = read_vtk_results(filename, max_workers)
+    res_obj = importfistrAvsResults.make_result_objects(m, doc, analysis, result_name_prefix)
+
+    fistrtiming.stop("import results")
+    if not isinstance(filename, (list, tuple)):
+        filename = [filename]
+    fistrtiming.save(os.path.dirname(os.path.abspath(filename[-1])))
+    return res_obj
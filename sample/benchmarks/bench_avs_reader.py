@@ -0,0 +1,98 @@
+# Benchmark of the COMPLETE_AVS result reader
+#
+# Compares the line based parser used up to now (readlines, reverse, pop)
+# with the chunked NumPy reader in importfistrAvsResults. The cached reader
+# is timed on reopen, its first call fills the result cache in a temporary
+# directory.
+#
+# usage (FreeCAD's lib directory has to be on PYTHONPATH):
+#   python bench_avs_reader.py path/to/xxx_vis_psf.0001.inp [--repeat 3]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import FreeCAD  # noqa: E402
+import importfistrAvsResults  # noqa: E402
+
+
+def legacy_parse(avs_input):
+    """Node, element and nodal data parsing as done by the former read_avs_result"""
+    avs_file = open(avs_input, "r")
+    dat = avs_file.readlines()
+    avs_file.close()
+    dat.reverse()
+    for i in range(3):
+        dat.pop()
+    n_nodes, n_elems = map(int, dat.pop().split())
+
+    nodes = {}
+    for i in range(n_nodes):
+        line = list(filter(None, dat.pop().split(" ")))
+        nodes[int(line[0])] = FreeCAD.Vector(float(line[1]), float(line[2]), float(line[3]))
+
+    elements = {}
+    for i in range(n_elems):
+        line = list(filter(None, dat.pop().split(" ")))
+        elements[int(line[0])] = (line[2], tuple(int(n) for n in line[3:]))
+
+    n_noderes, n_elemres = map(int, list(filter(None, dat.pop().split(" "))))
+    nresults = {}
+    if n_noderes > 0:
+        dofs = list(map(int, list(filter(None, dat.pop().split(" ")))))
+        for i in range(dofs[0]):
+            dat.pop()
+        for i in range(n_nodes):
+            line = list(filter(None, dat.pop().split(" ")))
+            nresults[int(line[0])] = list(map(float, line[1:n_noderes + 1]))
+    return nodes, elements, nresults
+
+
+def measure(func, filename, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(filename)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    func(filename)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the COMPLETE_AVS result reader")
+    parser.add_argument("files", nargs="+", help="COMPLETE_AVS result files")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp()
+    candidates = [
+        ("legacy parse", legacy_parse),
+        ("read_avs_arrays", importfistrAvsResults.read_avs_arrays),
+        ("read_avs_result", importfistrAvsResults.read_avs_result),
+        ("result cache reopen", lambda avs_input: importfistrAvsResults.read_avs_results_cached(
+            [avs_input], cache_dir
+        )),
+    ]
+    print("{:40s} {:>10s} {:>20s} {:>10s} {:>12s}".format(
+        "file", "size(MB)", "reader", "time(s)", "peak(MB)"
+    ))
+    for filename in args.files:
+        size = os.path.getsize(filename) / 1e6
+        for name, func in candidates:
+            elapsed, peak = measure(func, filename, args.repeat)
+            print("{:40s} {:10.1f} {:>20s} {:10.3f} {:12.1f}".format(
+                os.path.basename(filename), size, name, elapsed, peak / 1e6
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Benchmark of the node set and node load writing of the input writer
+#
+# Compares the former line by line writing (one f.write per node through
+# a codecs UTF-8 writer, f-string and quantity arithmetic per value) with
+# the block writers meshwriter.write_ids and write_node_values, for a node
+# set and a !CLOAD block of a force on the given number of nodes.
+#
+# usage (FreeCAD's lib directory has to be on PYTHONPATH):
+#   python bench_block_writer.py [--nodes 100000 400000] [--repeat 3]
+
+import argparse
+import codecs
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import FreeCAD  # noqa: E402
+from femsolver_FrontISTR import meshwriter  # noqa: E402
+
+
+DIRECTION = (0.6, 0.0, -0.8)
+
+
+def legacy_write(filename, node_ids, node_loads):
+    """Node set and node loads as written by the former writer"""
+    f = codecs.open(filename, "w", encoding="utf-8")
+    f.write("*NSET,NSET=ConstraintFixed\n")
+    for n in node_ids:
+        f.write(str(n) + ",\n")
+    f.write("!CLOAD,GRPID=1\n")
+    for n in sorted(node_loads):
+        node_load = node_loads[n]
+        if abs(DIRECTION[0]) > 1e-15:
+            f.write(f"{n},1,{DIRECTION[0] * node_load:.13G}\n")
+        if abs(DIRECTION[1]) > 1e-15:
+            f.write(f"{n},2,{DIRECTION[1] * node_load:.13G}\n")
+        if abs(DIRECTION[2]) > 1e-15:
+            f.write(f"{n},3,{DIRECTION[2] * node_load:.13G}\n")
+    f.close()
+
+
+def block_write(filename, node_ids, node_loads):
+    f = codecs.open(filename, "w", encoding="utf-8")
+    f.write("*NSET,NSET=ConstraintFixed\n")
+    meshwriter.write_ids(f, node_ids)
+    f.write("!CLOAD,GRPID=1\n")
+    dofs = [dof for dof in (1, 2, 3) if abs(DIRECTION[dof - 1]) > 1e-15]
+    load_ids = sorted(node_loads)
+    loads = np.array([node_loads[n] for n in load_ids], dtype=np.float64)
+    components = np.array([DIRECTION[dof - 1] for dof in dofs])
+    meshwriter.write_node_values(f, load_ids, loads[:, None] * components, dofs, "%.13G")
+    f.close()
+
+
+def measure(func, filename, node_ids, node_loads, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(filename, node_ids, node_loads)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the node set and node load writing")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[100000, 400000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    candidates = [
+        ("legacy line writes", legacy_write),
+        ("block writer", block_write),
+    ]
+    work_dir = tempfile.mkdtemp()
+    rng = np.random.default_rng(0)
+    print("{:>10s} {:>20s} {:>10s} {:>10s}".format("nodes", "writer", "time(s)", "size(MB)"))
+    for n_nodes in args.nodes:
+        node_ids = sorted(rng.choice(10 * n_nodes, n_nodes, replace=False).tolist())
+        node_loads = dict(zip(node_ids, (rng.random(n_nodes) * 10.0).tolist()))
+        for name, func in candidates:
+            filename = os.path.join(work_dir, name.replace(" ", "_") + ".inp")
+            elapsed = measure(func, filename, node_ids, node_loads, args.repeat)
+            print("{:10d} {:>20s} {:10.3f} {:10.1f}".format(
+                n_nodes, name, elapsed, os.path.getsize(filename) / 1e6
+            ))
+    shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
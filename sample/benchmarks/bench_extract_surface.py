@@ -0,0 +1,84 @@
+# Benchmark of the boundary surface extraction of result meshes
+#
+# Compares the former string hash based face tables with the array based
+# extract_surface in importfistrAvsResults. The volume elements are read
+# once from COMPLETE_AVS result files, only the extraction is timed.
+#
+# usage (FreeCAD's lib directory has to be on PYTHONPATH):
+#   python bench_extract_surface.py path/to/xxx_vis_psf.0001.inp [--repeat 3]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import importfistrAvsResults  # noqa: E402
+
+
+def make_hash(surf, n_corners):
+    tmp = sorted(surf[:n_corners])
+    return "%".join(str(n) for n in tmp)
+
+
+def legacy_extract_surface(volumes):
+    """Face tables keyed on strings as done by the former extract_surface"""
+    surface = {}
+    for key, (eids, conn) in volumes.items():
+        elements = dict(zip(eids.tolist(), map(tuple, conn.tolist())))
+        for face_key, local in importfistrAvsResults.VOLUME_FACES[key]:
+            n_corners = importfistrAvsResults.face_corners(face_key)
+            table = {}
+            for eid in elements.keys():
+                ve = elements[eid]
+                for face in local:
+                    s = tuple(ve[i] for i in face)
+                    hash = make_hash(s, n_corners)
+                    try:
+                        table[hash].append(s)
+                    except KeyError:
+                        table[hash] = [s]
+            faces = surface.setdefault(face_key, [])
+            for k in table.keys():
+                if len(table[k]) == 1:
+                    faces.append(table[k][0])
+    return surface
+
+
+def measure(func, volumes, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(volumes)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the boundary surface extraction")
+    parser.add_argument("files", nargs="+", help="COMPLETE_AVS result files")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    candidates = [
+        ("legacy string hash", legacy_extract_surface),
+        ("extract_surface", importfistrAvsResults.extract_surface),
+    ]
+    print("{:40s} {:>10s} {:>10s} {:>20s} {:>10s}".format(
+        "file", "elements", "faces", "method", "time(s)"
+    ))
+    for filename in args.files:
+        volumes = importfistrAvsResults.read_avs_arrays(filename)["Elements"]
+        n_elems = sum(len(eids) for eids, conn in volumes.values())
+        n_faces = sum(len(f) for f in importfistrAvsResults.extract_surface(volumes).values())
+        for name, func in candidates:
+            elapsed = measure(func, volumes, args.repeat)
+            print("{:40s} {:10d} {:10d} {:>20s} {:10.3f}".format(
+                os.path.basename(filename), n_elems, n_faces, name, elapsed
+            ))
+
+
+if __name__ == "__main__":
+    main()
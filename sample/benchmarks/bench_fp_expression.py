@@ -0,0 +1,95 @@
+# Benchmark of the floating point expression fix of the input file
+#
+# Compares the former FemToolsFISTR.mod_fp_expression (readlines, regex
+# per line, rewrite) with the block wise meshwriter.fix_fp_expression.
+# Both run on a copy of every given file, the results are compared.
+# Files written by FemMesh.writeABAQUS contain numbers like 1e-05 and
+# have to be fixed, files of the new mesh writer need no change.
+#
+# usage (FreeCAD's lib directory has to be on PYTHONPATH):
+#   python bench_fp_expression.py path/to/Mesh.inp [--repeat 3]
+
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import FreeCAD  # noqa: E402,F401
+from femsolver_FrontISTR import meshwriter  # noqa: E402
+
+
+def legacy_fix(filename):
+    """The former mod_fp_expression"""
+    p = re.compile(r'([+\-,\s][0-9]+)([eE])')
+    f = open(filename, "r")
+    dat = f.readlines()
+    f.close()
+    found_modfp = False
+    dat2 = []
+    for line in dat:
+        if p.search(line) is None:
+            dat2.append(line)
+        else:
+            dat2.append(p.sub(r'\1.\2', line))
+            found_modfp = True
+    if found_modfp:
+        f = open(filename, "w")
+        f.writelines(dat2)
+        f.close()
+
+
+def measure(func, filename, work_file, repeat):
+    best = None
+    for i in range(repeat):
+        shutil.copyfile(filename, work_file)
+        start = time.perf_counter()
+        func(work_file)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    shutil.copyfile(filename, work_file)
+    tracemalloc.start()
+    func(work_file)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    with open(work_file, "rb") as f:
+        content = f.read()
+    return best, peak, content
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the floating point expression fix")
+    parser.add_argument("files", nargs="+", help="input files (.inp)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    candidates = [
+        ("legacy mod_fp_expression", legacy_fix),
+        ("fix_fp_expression", meshwriter.fix_fp_expression),
+    ]
+    work_dir = tempfile.mkdtemp()
+    print("{:30s} {:>10s} {:>26s} {:>10s} {:>10s} {:>12s}".format(
+        "file", "size(MB)", "fixer", "time(s)", "MB/s", "peak(MB)"
+    ))
+    for filename in args.files:
+        size = os.path.getsize(filename) / 1e6
+        work_file = os.path.join(work_dir, os.path.basename(filename))
+        contents = []
+        for name, func in candidates:
+            elapsed, peak, content = measure(func, filename, work_file, args.repeat)
+            contents.append(content)
+            print("{:30s} {:10.1f} {:>26s} {:10.3f} {:10.1f} {:12.1f}".format(
+                os.path.basename(filename), size, name, elapsed, size / elapsed, peak / 1e6
+            ))
+        if any(content != contents[0] for content in contents):
+            print("{:30s} results differ".format(os.path.basename(filename)))
+    shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# Benchmark of the mesh writing of the input writer
+#
+# Compares FemMesh.writeABAQUS (C++, the default of the input writer) with
+# the array writer of meshwriter (get_femmesh_arrays, one getElementNodes
+# call per element, then write_abaqus_mesh) on the meshes of the benchmark
+# models. The floating point expression fix is included in the time of
+# writeABAQUS, the array writer needs none. The time of get_femmesh_arrays
+# is reported separately. meshwriter.MESH_FROM_ARRAYS should only be
+# enabled if "arrays total" is faster than "writeABAQUS" here.
+#
+# usage (FreeCAD's lib directory has to be on PYTHONPATH, FEM importable):
+#   python bench_mesh_writer.py [01_gear/gear.FCStd ...] [--mesh-sizes 1.0 0.6] [--repeat 3]
+#
+# Without models all *.FCStd files below this directory are run. Without
+# --mesh-sizes the meshes are used as saved.
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, "..", ".."))
+
+import FreeCAD  # noqa: E402
+from femsolver_FrontISTR import meshwriter  # noqa: E402
+from femtools import femutils  # noqa: E402
+
+from run_benchmarks import set_mesh_size  # noqa: E402
+
+
+def find_mesh(doc):
+    for obj in doc.Objects:
+        if femutils.is_derived_from(obj, "Fem::FemMeshObject"):
+            return obj
+    raise Exception("No mesh found in {}".format(doc.FileName))
+
+
+def write_abaqus(femmesh, filename):
+    meshwriter.write_femmesh_abaqus(femmesh, filename)
+    meshwriter.fix_fp_expression(filename)
+
+
+def write_arrays(femmesh, filename):
+    arrays = meshwriter.get_femmesh_arrays(femmesh)
+    with open(filename, "w", buffering=1 << 20) as f:
+        meshwriter.write_abaqus_mesh(f, *arrays)
+
+
+def measure(func, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the mesh writing")
+    parser.add_argument("models", nargs="*", help="benchmark models (.FCStd)")
+    parser.add_argument("--mesh-sizes", type=float, nargs="+", default=[None])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    models = args.models or sorted(glob.glob(os.path.join(BENCHMARK_DIR, "*", "*.FCStd")))
+    work_dir = tempfile.mkdtemp()
+    filename = os.path.join(work_dir, "mesh.inp")
+    print("{:>16s} {:>9s} {:>10s} {:>16s} {:>10s}".format(
+        "model", "size", "nodes", "writer", "time(s)"
+    ))
+    for model in models:
+        doc = FreeCAD.openDocument(os.path.abspath(model))
+        mesh_obj = find_mesh(doc)
+        for mesh_size in args.mesh_sizes:
+            if mesh_size is not None:
+                set_mesh_size(mesh_obj, mesh_size)
+            femmesh = mesh_obj.FemMesh
+            candidates = [
+                ("writeABAQUS", lambda: write_abaqus(femmesh, filename)),
+                ("arrays collect", lambda: meshwriter.get_femmesh_arrays(femmesh)),
+                ("arrays total", lambda: write_arrays(femmesh, filename)),
+            ]
+            for name, func in candidates:
+                print("{:>16s} {:>9s} {:10d} {:>16s} {:10.3f}".format(
+                    os.path.basename(model), str(mesh_size), femmesh.NodeCount, name,
+                    measure(func, args.repeat)
+                ))
+        FreeCAD.closeDocument(doc.Name)
+    shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
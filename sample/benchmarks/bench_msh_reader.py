@@ -0,0 +1,117 @@
+# Benchmark of the FrontISTR .msh mesh reader
+#
+# Compares the line based parser used up to now (readline, split, dicts
+# of lists filled node by node) with the chunked NumPy block reader
+# read_msh_arrays in importFrontISTRMesh. read_msh_fistr is timed as well,
+# it converts the arrays to the dicts of importToolsFem.make_femmesh.
+# Large meshes can be written by make_synthetic_mesh.py.
+#
+# usage (FreeCAD's lib directory has to be on PYTHONPATH):
+#   python bench_msh_reader.py path/to/mesh.msh [--repeat 3]
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import FreeCAD  # noqa: E402,F401
+from feminout_FrontISTR import importFrontISTRMesh  # noqa: E402
+
+
+def legacy_parse(filename):
+    """Node and element parsing as done by the former read_msh_fistr"""
+    nodes = {}
+    elements = {}
+    read_node = False
+    elm_category = None
+    elm_2nd_line = False
+    f = open(filename, "r")
+    line = "\n"
+    while line != "":
+        line = f.readline()
+        if line.strip() == "" or line[0] == "#" or line[:2] == "!!":
+            continue
+        if line[0] == "!":
+            read_node = False
+            elm_category = None
+            elm_2nd_line = False
+        if line[:5].upper() == "!NODE":
+            read_node = True
+        elif read_node:
+            line_list = line.split(",")
+            nodes[int(line_list[0])] = [
+                float(line_list[1]), float(line_list[2]), float(line_list[3])
+            ]
+        elif line[:8].upper() == "!ELEMENT":
+            for line_part in line[8:].upper().split(","):
+                if line_part.lstrip()[:4] == "TYPE":
+                    elm_type = line_part.split("=")[1].strip()
+            if elm_type in importFrontISTRMesh.MSH_ELEMENT_TYPES:
+                number_of_nodes = importFrontISTRMesh.MSH_ELEMENT_TYPES[elm_type][0]
+                elm_category = elements.setdefault(elm_type, {})
+        elif elm_category is not None:
+            line_list = line.split(",")
+            if elm_2nd_line is False:
+                number = int(line_list[0])
+                elm_category[number] = []
+                pos = 1
+            else:
+                pos = 0
+                elm_2nd_line = False
+            for en in range(pos, pos + number_of_nodes - len(elm_category[number])):
+                try:
+                    elm_category[number].append(int(line_list[en]))
+                except (IndexError, ValueError):
+                    elm_2nd_line = True
+                    break
+    f.close()
+    for elm_type, elms in elements.items():
+        order = importFrontISTRMesh.MSH_ELEMENT_TYPES[elm_type][2]
+        for en in elms:
+            n = elms[en]
+            elms[en] = [n[i] for i in order]
+    return nodes, elements
+
+
+def measure(func, filename, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(filename)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    func(filename)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the FrontISTR .msh reader")
+    parser.add_argument("files", nargs="+", help="FrontISTR .msh files")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    candidates = [
+        ("legacy parse", legacy_parse),
+        ("read_msh_arrays", importFrontISTRMesh.read_msh_arrays),
+        ("read_msh_fistr", importFrontISTRMesh.read_msh_fistr),
+    ]
+    print("{:40s} {:>10s} {:>20s} {:>10s} {:>12s}".format(
+        "file", "size(MB)", "reader", "time(s)", "peak(MB)"
+    ))
+    for filename in args.files:
+        size = os.path.getsize(filename) / 1e6
+        for name, func in candidates:
+            elapsed, peak = measure(func, filename, args.repeat)
+            print("{:40s} {:10.1f} {:>20s} {:10.3f} {:12.1f}".format(
+                os.path.basename(filename), size, name, elapsed, peak / 1e6
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# Benchmark of filling result objects from nodal results
+#
+# Compares the former per node dict based filling of importAvs with
+# fill_result_arrays in importfistrAvsResults on random nodal fields.
+# The legacy timing includes building the dicts keyed by node id, which
+# the former read_avs_result did, and the loops over NodeNumbers.
+# A plain Python object stands in for the result object, so only the fill
+# step is timed.
+#
+# usage (FreeCAD's lib directory has to be on PYTHONPATH):
+#   python bench_result_fill.py [--nodes 100000 500000 1000000] [--repeat 3]
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import FreeCAD  # noqa: E402
+import importfistrAvsResults  # noqa: E402
+
+
+class ResultObject(object):
+    pass
+
+
+def make_result_set(n_nodes):
+    rng = np.random.default_rng(0)
+    return {
+        "number": float("NaN"),
+        "time": float("NaN"),
+        "disp": rng.standard_normal((n_nodes, 3)),
+        "stress": rng.standard_normal((n_nodes, 6)),
+        "mises": rng.random(n_nodes),
+        "pstress": rng.standard_normal((n_nodes, 3)),
+    }
+
+
+def make_legacy_result_set(result_set):
+    """Per node dicts as built by the former read_avs_result"""
+    nids = list(range(1, len(result_set["mises"]) + 1))
+    return {
+        "disp": dict(zip(nids, [FreeCAD.Vector(*d) for d in result_set["disp"].tolist()])),
+        "stress": dict(zip(nids, map(tuple, result_set["stress"].tolist()))),
+        "mises": dict(zip(nids, result_set["mises"].tolist())),
+        "pstress": dict(zip(nids, result_set["pstress"].tolist())),
+    }
+
+
+def legacy_fill(res_obj, result_set):
+    """fill_femresult_mechanical, add_disp_apps and the loops of the former importAvs"""
+    result_set = make_legacy_result_set(result_set)
+    disp = result_set["disp"]
+    res_obj.DisplacementVectors = list(disp.values())
+    res_obj.NodeNumbers = list(disp)
+    stress = result_set["stress"]
+    for i, name in enumerate(("XX", "YY", "ZZ", "XY", "XZ", "YZ")):
+        setattr(res_obj, "NodeStress" + name, [s[i] for s in stress.values()])
+    res_obj.DisplacementLengths = [
+        math.sqrt(v.x * v.x + v.y * v.y + v.z * v.z) for v in res_obj.DisplacementVectors
+    ]
+    mstress = []
+    for nid in res_obj.NodeNumbers:
+        mstress.append(result_set["mises"][nid])
+    res_obj.vonMises = mstress
+    prinstress1 = []; prinstress2 = []; prinstress3 = []
+    for nid in res_obj.NodeNumbers:
+        pstr = result_set["pstress"][nid]
+        prinstress1.append(pstr[0])
+        prinstress2.append(pstr[1])
+        prinstress3.append(pstr[2])
+    res_obj.PrincipalMax = prinstress1
+    res_obj.PrincipalMed = prinstress2
+    res_obj.PrincipalMin = prinstress3
+    return res_obj
+
+
+def array_fill(res_obj, result_set):
+    res_obj.NodeNumbers = list(range(1, len(result_set["mises"]) + 1))
+    return importfistrAvsResults.fill_result_arrays(res_obj, result_set)
+
+
+def measure(func, result_set, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(ResultObject(), result_set)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of filling result objects")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[100000, 500000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("{:>10s} {:>20s} {:>10s}".format("nodes", "method", "time(s)"))
+    for n_nodes in args.nodes:
+        result_set = make_result_set(n_nodes)
+        for name, func in (
+            ("legacy dicts", legacy_fill),
+            ("fill_result_arrays", array_fill),
+        ):
+            elapsed = measure(func, result_set, args.repeat)
+            print("{:10d} {:>20s} {:10.3f}".format(n_nodes, name, elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+# Synthetic structured meshes and results for I/O benchmarks
+#
+# Writes COMPLETE_AVS result files, FrontISTR .msh and ABAQUS .inp meshes
+# of a structured box grid of tet4, tet10, hex8, hex20 or prism6/prism15
+# elements, without running the solver. The files can be used to profile
+# and regression-test importfistrAvsResults, importFrontISTRMesh and the
+# input writer at production scale.
+#
+# Nodes and elements are generated and written layer by layer, the memory
+# use depends on the size of one layer only, so grids of tens of millions
+# of nodes can be written on a laptop. Hex cells are split into 6 tets
+# (Kuhn split) or 2 prisms, quadratic elements share their midside nodes.
+# The nodal fields are smooth functions of the coordinates, the von Mises
+# and principal stresses are derived from the stress tensor.
+#
+# usage (NumPy only, FreeCAD is not needed):
+#   python make_synthetic_mesh.py hex8 --cells 100 100 100 [--formats avs msh inp]
+#   python make_synthetic_mesh.py tet10 --nodes 10000000 --output synth_tet10
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+
+# corner offsets of a hex cell in ABAQUS order
+HEX_CORNERS = np.array([
+    (0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0),
+    (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1),
+])
+
+# midside nodes in ABAQUS order as pairs of local corner nodes
+TET_EDGES = ((0, 1), (1, 2), (2, 0), (0, 3), (1, 3), (2, 3))
+HEX_EDGES = ((0, 1), (1, 2), (2, 3), (3, 0), (4, 5), (5, 6), (6, 7), (7, 4),
+             (0, 4), (1, 5), (2, 6), (3, 7))
+PRISM_EDGES = ((0, 1), (1, 2), (2, 0), (3, 4), (4, 5), (5, 3), (0, 3), (1, 4), (2, 5))
+
+# per element type: hex corners of the elements of one cell, midside edges,
+# ABAQUS type, FrontISTR type, AVS type
+ELEMENT_TYPES = {
+    "tet4": (
+        ((0, 1, 2, 6), (0, 2, 3, 6), (0, 3, 7, 6), (0, 7, 4, 6), (0, 4, 5, 6), (0, 5, 1, 6)),
+        (), "C3D4", "341", "tet"),
+    "tet10": (
+        ((0, 1, 2, 6), (0, 2, 3, 6), (0, 3, 7, 6), (0, 7, 4, 6), (0, 4, 5, 6), (0, 5, 1, 6)),
+        TET_EDGES, "C3D10", "342", "tet2"),
+    "hex8": (((0, 1, 2, 3, 4, 5, 6, 7),), (), "C3D8", "361", "hex"),
+    "hex20": (((0, 1, 2, 3, 4, 5, 6, 7),), HEX_EDGES, "C3D20", "362", "hex2"),
+    "prism6": (((0, 1, 2, 4, 5, 6), (0, 2, 3, 4, 6, 7)), (), "C3D6", "351", "prism"),
+    "prism15": (((0, 1, 2, 4, 5, 6), (0, 2, 3, 4, 6, 7)), PRISM_EDGES, "C3D15", "352", "prism2"),
+}
+
+# node order ABAQUS --> FrontISTR, hecmw[i] = abaqus[order[i]]
+HECMW_ORDER = {
+    "tet10": (0, 1, 2, 3, 5, 6, 4, 7, 8, 9),
+    "prism15": (0, 1, 2, 3, 4, 5, 7, 8, 6, 10, 11, 9, 12, 13, 14),
+}
+
+# node order ABAQUS --> FreeCAD as used by FemMesh.writeABAQUS
+FREECAD_ORDER = {
+    "tet4": (1, 0, 2, 3),
+    "tet10": (1, 0, 2, 3, 4, 6, 5, 8, 7, 9),
+    "hex8": (0, 3, 2, 1, 4, 7, 6, 5),
+    "hex20": (0, 3, 2, 1, 4, 7, 6, 5, 11, 10, 9, 8, 15, 14, 13, 12, 16, 19, 18, 17),
+    "prism6": (0, 2, 1, 3, 5, 4),
+    "prism15": (0, 2, 1, 3, 5, 4, 8, 7, 6, 11, 10, 9, 12, 14, 13),
+}
+
+# node order AVS --> FreeCAD, see AVS_ELEMENT_TYPES in importfistrAvsResults
+AVS_TO_FREECAD = {
+    "tet": (1, 0, 3, 2),
+    "tet2": (1, 0, 3, 2, 4, 6, 9, 7, 5, 8),
+    "prism": (4, 3, 5, 1, 0, 2),
+    "prism2": (4, 3, 5, 1, 0, 2, 9, 11, 10, 6, 8, 7, 13, 12, 14),
+    "hex": (5, 4, 7, 6, 1, 0, 3, 2),
+    "hex2": (5, 4, 7, 6, 1, 0, 3, 2, 12, 15, 14, 13, 8, 11, 10, 9, 17, 16, 19, 18),
+}
+
+# nodal fields of the AVS file
+AVS_FIELDS = (
+    ("DISPLACEMENT", 3),
+    ("NodalSTRAIN", 6),
+    ("NodalSTRESS", 6),
+    ("NodalMISES", 1),
+    ("NodalPrincipalSTRESS", 3),
+)
+
+# number of lines formatted at once
+CHUNK_LINES = 65536
+
+
+def avs_order(etype):
+    # node order ABAQUS --> AVS, avs[i] = abaqus[order[i]]
+    to_freecad = AVS_TO_FREECAD[ELEMENT_TYPES[etype][4]]
+    freecad = FREECAD_ORDER[etype]
+    order = [0] * len(freecad)
+    for j, i in enumerate(to_freecad):
+        order[i] = freecad[j]
+    return tuple(order)
+
+
+def element_templates(etype):
+    """Return the nodes of the elements of one cell as offsets on the node grid.
+
+    With midside nodes the node grid has twice the resolution of the cells.
+    Corner lists are reordered where needed to get positive volumes.
+    """
+    corner_sets, edges = ELEMENT_TYPES[etype][:2]
+    scale = 2 if edges else 1
+    templates = []
+    for corners in corner_sets:
+        corners = list(corners)
+        if len(corners) == 4:
+            a, b, c, d = HEX_CORNERS[corners].astype(float)
+            if np.dot(np.cross(b - a, c - a), d - a) < 0:
+                corners[1], corners[2] = corners[2], corners[1]
+        points = [scale * HEX_CORNERS[n] for n in corners]
+        for i, j in edges:
+            points.append((scale * HEX_CORNERS[corners[i]] + scale * HEX_CORNERS[corners[j]]) // 2)
+        templates.append(np.array(points))
+    return np.array(templates), scale
+
+
+class NodeGrid(object):
+    """Numbering of the used points of the structured node grid.
+
+    The grid has scale * cells + 1 points per direction. With midside nodes
+    not all of them are used. Which ones are used depends on the parity of
+    the grid coordinates only, so the numbering is stored per parity of the
+    z layer.
+    """
+
+    def __init__(self, etype, cells, scale):
+        self.shape = tuple(scale * n + 1 for n in cells)
+        nx, ny, nz = self.shape
+        templates = element_templates(etype)[0]
+        offsets = templates.reshape(-1, 3)
+        # parities of the used points
+        used = set(map(tuple, offsets % 2))
+        ix = np.arange(nx)
+        iy = np.arange(ny)
+        self.layer_masks = []
+        self.layer_ranks = []
+        for pz in (0, 1):
+            mask = np.zeros((ny, nx), dtype=bool)
+            for px, py, qz in used:
+                if qz == pz:
+                    mask |= np.logical_and.outer(iy % 2 == py, ix % 2 == px)
+            self.layer_masks.append(mask)
+            self.layer_ranks.append(np.cumsum(mask).reshape(ny, nx) - 1)
+        counts = np.array([self.layer_masks[k % 2].sum() for k in range(nz)], dtype=np.int64)
+        self.layer_offsets = np.concatenate(([0], np.cumsum(counts)))
+        self.n_nodes = int(self.layer_offsets[-1])
+
+    def node_ids(self, i, j, k):
+        """Node ids (1 based) of grid points given by index arrays"""
+        return (
+            self.layer_offsets[k]
+            + np.where(k % 2 == 0, self.layer_ranks[0][j, i], self.layer_ranks[1][j, i])
+            + 1
+        )
+
+    def layers(self, spacing):
+        """Yield node ids and coordinates of the used points per z layer"""
+        nx, ny, nz = self.shape
+        for k in range(nz):
+            jj, ii = np.nonzero(self.layer_masks[k % 2])
+            ids = self.layer_offsets[k] + np.arange(len(ii)) + 1
+            coords = np.column_stack((ii * spacing, jj * spacing, np.full(len(ii), k * spacing)))
+            yield ids, coords
+
+
+def element_layers(etype, cells, grid):
+    """Yield the connectivity in ABAQUS order of the elements per layer of cells"""
+    templates, scale = element_templates(etype)
+    nx, ny, nz = cells
+    cj, ci = np.meshgrid(np.arange(ny), np.arange(nx), indexing="ij")
+    ci = ci.ravel()
+    cj = cj.ravel()
+    for k in range(nz):
+        # elements of a cell are consecutive
+        i = scale * ci[:, None, None] + templates[None, :, :, 0]
+        j = scale * cj[:, None, None] + templates[None, :, :, 1]
+        kk = scale * k + templates[None, :, :, 2]
+        conn = grid.node_ids(i, j, np.broadcast_to(kk, i.shape))
+        yield conn.reshape(-1, templates.shape[1])
+
+
+def nodal_fields(coords, size):
+    """Smooth synthetic displacement, strain and stress fields"""
+    x, y, z = (coords / size).T
+    disp = np.column_stack((
+        1e-3 * x * z, -2e-4 * y * z, -1e-3 * (0.5 * x * x + 0.1 * y * y)
+    ))
+    strain = np.column_stack((
+        1e-3 * z, -2e-4 * z, np.full_like(x, -3e-4),
+        np.zeros_like(x), -2e-4 * y, 1e-3 * (x - x)
+    ))
+    e_mod = 210000.0
+    nu = 0.3
+    lam = e_mod * nu / ((1 + nu) * (1 - 2 * nu))
+    mu = e_mod / (2 * (1 + nu))
+    trace = strain[:, :3].sum(axis=1)
+    stress = np.empty_like(strain)
+    stress[:, :3] = lam * trace[:, None] + 2 * mu * strain[:, :3]
+    stress[:, 3:] = mu * strain[:, 3:]
+    sxx, syy, szz, sxy, syz, szx = stress.T
+    mises = np.sqrt(0.5 * ((sxx - syy) ** 2 + (syy - szz) ** 2 + (szz - sxx) ** 2)
+                    + 3 * (sxy ** 2 + syz ** 2 + szx ** 2))
+    tensor = np.empty((len(x), 3, 3))
+    tensor[:, 0, 0] = sxx
+    tensor[:, 1, 1] = syy
+    tensor[:, 2, 2] = szz
+    tensor[:, 0, 1] = tensor[:, 1, 0] = sxy
+    tensor[:, 1, 2] = tensor[:, 2, 1] = syz
+    tensor[:, 0, 2] = tensor[:, 2, 0] = szx
+    principal = np.linalg.eigvalsh(tensor)[:, ::-1]
+    return np.column_stack((disp, strain, stress, mises, principal))
+
+
+def write_rows(f, fmt, rows):
+    """Write the rows of a 2D array with a printf style row format"""
+    for start in range(0, len(rows), CHUNK_LINES):
+        chunk = rows[start:start + CHUNK_LINES]
+        f.write((fmt * len(chunk)) % tuple(chunk.ravel().tolist()))
+
+
+def write_elements(f, etype, cells, grid, order, row_fmt, max_per_line=None):
+    eid = 0
+    for conn in element_layers(etype, cells, grid):
+        if order is not None:
+            conn = conn[:, order]
+        ids = np.arange(eid + 1, eid + len(conn) + 1)
+        eid += len(conn)
+        write_rows(f, row_fmt, np.column_stack((ids, conn)))
+    return eid
+
+
+def element_row_format(n_nodes, prefix, sep, max_per_line):
+    """printf row format for an element line, wrapped after max_per_line numbers"""
+    fields = ["%d"] * (n_nodes + 1)
+    lines = []
+    for start in range(0, len(fields), max_per_line):
+        lines.append(sep.join(fields[start:start + max_per_line]))
+    return prefix + (sep + "\n").join(lines) + "\n"
+
+
+def write_avs(filename, etype, cells, grid, spacing, size, n_elems):
+    avs_type = ELEMENT_TYPES[etype][4]
+    n_nodes = len(avs_order(etype))
+    with open(filename, "w") as f:
+        f.write("1\ndata\nstep1\n")
+        f.write("{} {}\n".format(grid.n_nodes, n_elems))
+        for ids, coords in grid.layers(spacing):
+            write_rows(f, "%d %.6E %.6E %.6E\n", np.column_stack((ids, coords)))
+        row = "%d 1 {} ".format(avs_type) + " ".join(["%d"] * n_nodes) + "\n"
+        write_elements(f, etype, cells, grid, avs_order(etype), row)
+        n_comp = sum(n for label, n in AVS_FIELDS)
+        f.write("{} 0\n".format(n_comp))
+        f.write("{} {}\n".format(len(AVS_FIELDS), " ".join(str(n) for label, n in AVS_FIELDS)))
+        for label, n in AVS_FIELDS:
+            f.write("{}, unit_unknown\n".format(label))
+        row = "%d" + " %.6E" * n_comp + "\n"
+        for ids, coords in grid.layers(spacing):
+            write_rows(f, row, np.column_stack((ids, nodal_fields(coords, size))))
+
+
+def write_msh(filename, etype, cells, grid, spacing):
+    hecmw_type = ELEMENT_TYPES[etype][3]
+    n_nodes = len(FREECAD_ORDER[etype])
+    with open(filename, "w") as f:
+        f.write("!HEADER\n synthetic {} mesh {}x{}x{}\n".format(etype, *cells))
+        f.write("!NODE\n")
+        for ids, coords in grid.layers(spacing):
+            write_rows(f, "%d, %.6E, %.6E, %.6E\n", np.column_stack((ids, coords)))
+        f.write("!ELEMENT, TYPE={}\n".format(hecmw_type))
+        row = element_row_format(n_nodes, "", ", ", 11)
+        n_elems = write_elements(f, etype, cells, grid, HECMW_ORDER.get(etype), row)
+        f.write("!EGROUP, EGRP=ALL, GENERATE\n 1, {}, 1\n".format(n_elems))
+        f.write("!SECTION, TYPE=SOLID, EGRP=ALL, MATERIAL=M1\n")
+        f.write("!MATERIAL, NAME=M1, ITEM=1\n!ITEM=1, SUBITEM=2\n 210000.0, 0.3\n")
+        f.write("!END\n")
+    return n_elems
+
+
+def write_inp(filename, etype, cells, grid, spacing):
+    abaqus_type = ELEMENT_TYPES[etype][2]
+    n_nodes = len(FREECAD_ORDER[etype])
+    with open(filename, "w") as f:
+        f.write("** written by make_synthetic_mesh.py\n")
+        f.write("** Nodes\n*Node, NSET=Nall\n")
+        for ids, coords in grid.layers(spacing):
+            write_rows(f, "%d, %.6E, %.6E, %.6E\n", np.column_stack((ids, coords)))
+        f.write("** Volume elements\n*Element, TYPE={}, ELSET=Evolumes\n".format(abaqus_type))
+        row = element_row_format(n_nodes, "", ", ", 15)
+        n_elems = write_elements(f, etype, cells, grid, None, row)
+        f.write("** Define element set Eall\n*ELSET, ELSET=Eall\nEvolumes\n")
+    return n_elems
+
+
+def cells_for_nodes(etype, n_nodes):
+    """Smallest cube of cells with at least n_nodes nodes"""
+    scale = element_templates(etype)[1]
+    low, high = 1, 2
+    while NodeGrid(etype, (high,) * 3, scale).n_nodes < n_nodes:
+        low, high = high, 2 * high
+    while low < high:
+        n = (low + high) // 2
+        if NodeGrid(etype, (n,) * 3, scale).n_nodes < n_nodes:
+            low = n + 1
+        else:
+            high = n
+    return (high,) * 3
+
+
+def generate(output, etype, cells, formats=("avs", "msh", "inp"), size=1.0):
+    """Write the requested files, return the number of nodes and elements"""
+    templates, scale = element_templates(etype)
+    grid = NodeGrid(etype, cells, scale)
+    spacing = size / scale
+    n_elems = len(templates) * cells[0] * cells[1] * cells[2]
+    files = []
+    if "inp" in formats:
+        files.append(output + ".inp")
+        write_inp(files[-1], etype, cells, grid, spacing)
+    if "msh" in formats:
+        files.append(output + ".msh")
+        write_msh(files[-1], etype, cells, grid, spacing)
+    if "avs" in formats:
+        files.append(output + "_vis_psf.0001.inp")
+        write_avs(files[-1], etype, cells, grid, spacing, size * max(cells), n_elems)
+    return grid.n_nodes, n_elems, files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic structured meshes and AVS results")
+    parser.add_argument("type", choices=sorted(ELEMENT_TYPES))
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--cells", type=int, nargs=3, metavar=("NX", "NY", "NZ"))
+    group.add_argument("--nodes", type=float, help="approximate number of nodes of a cube")
+    parser.add_argument("--formats", nargs="+", choices=("avs", "msh", "inp"),
+                        default=["avs", "msh", "inp"])
+    parser.add_argument("--size", type=float, default=1.0, help="edge length of a cell")
+    parser.add_argument("--output", help="output file name without extension")
+    args = parser.parse_args()
+
+    cells = tuple(args.cells) if args.cells else cells_for_nodes(args.type, int(args.nodes))
+    output = args.output or "synthetic_{}_{}x{}x{}".format(args.type, *cells)
+    start = time.perf_counter()
+    n_nodes, n_elems, files = generate(output, args.type, cells, args.formats, args.size)
+    print("{} cells, {} nodes, {} elements in {:.1f} s".format(
+        "x".join(map(str, cells)), n_nodes, n_elems, time.perf_counter() - start
+    ))
+    for filename in files:
+        print("  {} ({:.1f} MB)".format(filename, os.path.getsize(filename) / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# Headless benchmark runner for the FrontISTR pipeline
+#
+# Opens the benchmark models (.FCStd) and, for every combination of mesh
+# size, n_process and matrix solver, runs write, partition, solve and result
+# import through FemToolsFISTR without the GUI. This replaces reading
+# Tw/Ts/Tr from the task panel clock as described in the README files.
+# Every run is repeated, the timings of all runs are written as CSV and JSON
+# together with mesh size, node and element count and the max. von Mises
+# stress, so regressions of the pipeline are visible across versions.
+# The named spans of the timing report (see fistrtiming) of every run are
+# added to the JSON output.
+#
+# usage (FreeCAD's lib directory has to be on PYTHONPATH, FEM and this addon
+# importable and FrontISTR set up in the preferences as for the task panel):
+#   python run_benchmarks.py [01_gear/gear.FCStd ...]
+#       [--mesh-sizes 1.0 0.6 0.4] [--n-process 1 4] [--solvers CG/AMG MUMPS]
+#       [--repeat 3] [--output benchmark_results]
+#
+# Without models all *.FCStd files below this directory are run. Without
+# --mesh-sizes the meshes are used as saved. Matrix solvers are given as
+# MatrixSolverType[/MatrixPrecondType].
+
+import argparse
+import csv
+import glob
+import json
+import os
+import platform
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, "..", ".."))
+
+import FreeCAD  # noqa: E402
+import fistrtiming  # noqa: E402
+import fistrtools  # noqa: E402
+from femtools import femutils  # noqa: E402
+
+
+FIELDS = [
+    "model", "mesh_size", "nodes", "elements", "n_process", "solver", "repeat",
+    "Tw", "Tp", "Ts", "Tr", "Tt", "max_mises", "ret_code"
+]
+
+
+def find_solver(doc):
+    for obj in doc.Objects:
+        if femutils.is_of_type(obj, "Fem::SolverFISTRTools"):
+            return obj
+    raise Exception("No FrontISTR tools solver found in {}".format(doc.FileName))
+
+
+def set_mesh_size(mesh_obj, size):
+    """Regenerate the mesh with the given maximum element size."""
+    if hasattr(mesh_obj, "CharacteristicLengthMax"):
+        from femmesh.gmshtools import GmshTools
+        mesh_obj.CharacteristicLengthMax = size
+        error = GmshTools(mesh_obj).create_mesh()
+        if error:
+            raise Exception("Gmsh failed: {}".format(error))
+    elif hasattr(mesh_obj, "MaxSize"):
+        # netgen meshes on recompute
+        mesh_obj.MaxSize = size
+        mesh_obj.recompute()
+    else:
+        raise Exception(
+            "Mesh size of {} can not be set".format(mesh_obj.Name)
+        )
+
+
+def set_matrix_solver(solver_obj, solver):
+    solver_type, _, precond_type = solver.partition("/")
+    solver_obj.MatrixSolverType = solver_type
+    if precond_type:
+        solver_obj.MatrixPrecondType = precond_type
+
+
+def max_mises(analysis):
+    values = None
+    for obj in analysis.Group:
+        if obj.isDerivedFrom("Fem::FemResultObject") and obj.vonMises:
+            values = obj.vonMises
+    return max(values) if values else float("NaN")
+
+
+def run_once(doc, solver_obj):
+    """Run write, partition, solve and import, return timings and the timing report"""
+    fea = fistrtools.FemToolsFISTR(solver=solver_obj)
+    fea.update_objects()
+    fea.setup_working_dir()
+    fea.setup_fistr()
+    message = fea.check_prerequisites()
+    if message:
+        raise Exception("Prerequisites not met: {}".format(message))
+    fea.purge_results()
+
+    timings = {}
+    start = time.perf_counter()
+    fea.write_inp_file()
+    timings["Tw"] = time.perf_counter() - start
+    if not fea.inp_file_name:
+        raise Exception("Writing the input file failed")
+
+    t = time.perf_counter()
+    fea.part_inp_file()
+    timings["Tp"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    timings["ret_code"] = fea.fistr_run()
+    timings["Ts"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    if timings["ret_code"] == 0:
+        fea.load_results()
+    timings["Tr"] = time.perf_counter() - t
+    timings["Tt"] = time.perf_counter() - start
+
+    timings["nodes"] = fea.mesh.FemMesh.NodeCount
+    timings["elements"] = fea.mesh.FemMesh.VolumeCount
+    timings["max_mises"] = max_mises(fea.analysis)
+    spans = list(fistrtiming.report.spans)
+    return timings, spans
+
+
+def write_results(output, rows, spans):
+    with open(output + ".csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    runs = [dict(row, spans=run_spans) for row, run_spans in zip(rows, spans)]
+    with open(output + ".json", "w") as f:
+        json.dump({
+            "freecad": ".".join(FreeCAD.Version()[:3]),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "runs": runs,
+        }, f, indent=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmark of the FrontISTR pipeline")
+    parser.add_argument("models", nargs="*", help="benchmark models (.FCStd)")
+    parser.add_argument("--mesh-sizes", type=float, nargs="+", default=[None])
+    parser.add_argument("--n-process", type=int, nargs="+", default=[None])
+    parser.add_argument("--solvers", nargs="+", default=[None],
+                        help="MatrixSolverType[/MatrixPrecondType], e.g. CG/AMG MUMPS")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default="benchmark_results")
+    args = parser.parse_args()
+
+    models = args.models or sorted(glob.glob(os.path.join(BENCHMARK_DIR, "*", "*.FCStd")))
+    # the spans of every run are collected from the timing report
+    os.environ[fistrtiming.TIMING_ENV] = "1"
+
+    rows = []
+    spans = []
+    for model in models:
+        doc = FreeCAD.openDocument(os.path.abspath(model))
+        solver_obj = find_solver(doc)
+        fea = fistrtools.FemToolsFISTR(solver=solver_obj)
+        fea.update_objects()
+        for mesh_size in args.mesh_sizes:
+            if mesh_size is not None:
+                set_mesh_size(fea.mesh, mesh_size)
+            for n_process in args.n_process:
+                if n_process is not None:
+                    solver_obj.n_process = n_process
+                for solver in args.solvers:
+                    if solver is not None:
+                        set_matrix_solver(solver_obj, solver)
+                    for repeat in range(args.repeat):
+                        row = {
+                            "model": os.path.basename(model),
+                            "mesh_size": mesh_size,
+                            "n_process": solver_obj.n_process,
+                            "solver": "{}/{}".format(
+                                solver_obj.MatrixSolverType, solver_obj.MatrixPrecondType
+                            ),
+                            "repeat": repeat,
+                        }
+                        timings, run_spans = run_once(doc, solver_obj)
+                        row.update(timings)
+                        rows.append(row)
+                        spans.append(run_spans)
+                        print(
+                            "{model} size={mesh_size} n_process={n_process} {solver} "
+                            "#{repeat}: Tw={Tw:.2f} Tp={Tp:.2f} Ts={Ts:.2f} Tr={Tr:.2f} "
+                            "Tt={Tt:.2f}".format(**row)
+                        )
+                        # written after every run, partial results survive a failure
+                        write_results(args.output, rows, spans)
+        FreeCAD.closeDocument(doc.Name)
+
+
+if __name__ == "__main__":
+    main()
@@ -43,6 +43,8 @@ import FreeCADGui
 
 import FemGui
 
+import fistrtiming
+
 if sys.version_info.major >= 3:
     def unicode(text, *args):
         return str(text)
@@ -272,6 +274,7 @@ class _TaskPanel:
 
         # Restore previous cwd
         QtCore.QDir.setCurrent(self.cwd)
+        fistrtiming.stop("solve")
 
         self.Timer.stop()
 
@@ -303,16 +306,9 @@ class _TaskPanel:
         if self.fea.solver.AnalysisType != "check":
             try:
                 FreeCAD.Console.PrintMessage("OutputFileFormat: {}\n".format(self.fea.solver.OutputFileFormat))
-                if self.fea.solver.OutputFileFormat == "AVS": #AVS
-                    self.fea.load_results()
-                    self.femConsoleMessage("Done loading result sets.\n")
-                else: # 1.VTK, 2.Binary VTK
-                    message = (
-                        "VTK or Binary VTK is specified for output file format. "
-                        "The result file will not be read by FreeCAD FEM.\n"
-                        "Open a *.pvtu file with paraview and you can view the result.\n"
-                    )
-                    FreeCAD.Console.PrintMessage(message)
+                # AVS, VTK and Binary VTK
+                self.fea.load_results()
+                self.femConsoleMessage("Done loading result sets.\n")
             except Exception as err:
                 FreeCAD.Console.PrintError("loading results failed: {}\n".format(err))
 
@@ -338,30 +334,7 @@ class _TaskPanel:
                 self.form.pb_run_fistr.setEnabled(True)
 
                 # partitioner
-                if self.fea.solver.n_process > 1:
-                    os.environ["OMP_NUM_THREADS"] = str(self.fea.solver.n_process)
-                import subprocess
-                from platform import system
-                startup_info = None
-                if system() == "Windows":
-                    # Windows workaround to avoid blinking terminal window
-                    startup_info = subprocess.STARTUPINFO()
-                    startup_info.dwFlags = subprocess.STARTF_USESHOWWINDOW
-                    cmd = [self.fea.partitioner_binary]
-                    shellcmd = False
-                elif system() in ("Linux", "Darwin"):
-                    cmd = "unset LD_LIBRARY_PATH; "+self.fea.partitioner_binary
-                    shellcmd = True
-
-                p = subprocess.Popen(
-                    cmd,
-                    cwd=self.fea.working_dir,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    shell=shellcmd,
-                    startupinfo=startup_info
-                )
-                part_stdout, part_stderr = p.communicate()                
+                self.fea.part_inp_file()
                 self.femConsoleMessage("Writing .inp file and partitioning completed.")
             else:
                 self.femConsoleMessage("Writing .inp file failed!", "#FF0000")
@@ -462,6 +435,7 @@ class _TaskPanel:
         os.environ.pop('LD_LIBRARY_PATH', None)
         self.FrontISTR.setStandardOutputFile(self.logfile)
         self.FrontISTR.setStandardErrorFile(self.logfile)
+        fistrtiming.start("solve", n_process=self.fea.solver.n_process)
         self.FrontISTR.start(self.fea.mpiexec_binary,["-n",n_pe,self.fea.fistr_binary])
         # self.FrontISTR.start('mpirun',["-n",n_pe,self.fea.fistr_binary])
         